@@ -0,0 +1,118 @@
+"""
+Benchmark /driver/status write throughput with and without the SQLite tuning profile
+
+Every simulated driver posts location updates concurrently, which is the pattern
+that used to end in "database is locked" errors on the default rollback journal.
+
+Usage:
+    python benchmark_driver_status.py
+    python benchmark_driver_status.py --drivers 32 --updates 25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_worker(drivers: int, updates: int) -> dict:
+    """Run one profile in this process (settings come from the environment)"""
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from database import engine, Base, SessionLocal
+    from models import User
+    from utils.helpers import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    phones = [f"+99890{i:07d}" for i in range(drivers)]
+    for i, phone in enumerate(phones):
+        db.add(User(
+            phone=phone,
+            password="x",
+            full_name=f"Bench Driver {i}",
+            is_driver=True,
+            is_approved=True,
+        ))
+    db.commit()
+    db.close()
+
+    client = TestClient(app, raise_server_exceptions=False)
+    tokens = [create_access_token(data={"sub": phone}) for phone in phones]
+
+    def drive(index: int) -> tuple:
+        headers = {"Authorization": f"Bearer {tokens[index]}"}
+        ok = failed = 0
+        for step in range(updates):
+            r = client.post("/api/v1/driver/status", json={
+                "is_on_duty": True,
+                "lat": 40.78 + step * 0.0001,
+                "lng": 72.33 + index * 0.0001,
+                "city": "Andijon",
+            }, headers=headers)
+            if r.status_code == 200:
+                ok += 1
+            else:
+                failed += 1
+        return ok, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=drivers) as pool:
+        results = list(pool.map(drive, range(drivers)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    return {
+        "requests": ok + failed,
+        "ok": ok,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "writes_per_second": round(ok / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def run_profile(tuning: bool, drivers: int, updates: int, workdir: str) -> dict:
+    db_path = os.path.join(workdir, f"bench_{'tuned' if tuning else 'default'}.db")
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "TESTING": "false",
+        "SQLITE_TUNING_ENABLED": "true" if tuning else "false",
+    })
+    out = subprocess.run(
+        [sys.executable, __file__, "--worker", "--drivers", str(drivers), "--updates", str(updates)],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    # Worker prints its result as the last line; app startup chatter comes before it
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.drivers, args.updates)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        before = run_profile(False, args.drivers, args.updates, workdir)
+        after = run_profile(True, args.drivers, args.updates, workdir)
+
+    print(f"/driver/status: {args.drivers} drivers x {args.updates} updates")
+    print(f"{'profile':<10} {'ok':>6} {'failed':>7} {'seconds':>9} {'writes/s':>10}")
+    for name, r in (("default", before), ("tuned", after)):
+        print(f"{name:<10} {r['ok']:>6} {r['failed']:>7} {r['seconds']:>9} {r['writes_per_second']:>10}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -16,6 +16,27 @@ TESTING: bool = os.getenv("TESTING", "false").lower() == "true"
 if TESTING:
     DATABASE_URL = "sqlite:///./instance/test_royaltaxi.db"
 
+# Connection pool (QueuePool: Postgres, and file-based SQLite with the tuning profile)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 disables recycling
+# true: ping on every checkout (pessimistic); false: rely on pool_recycle and reconnect on error
+DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_SLOW_CHECKOUT_MS: int = int(os.getenv("DB_SLOW_CHECKOUT_MS", "100"))
+
+# /metrics/*: admins, or scrapers sending this value in the X-Metrics-Token header (unset = admins only)
+METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN") or None
+
+# SQLite tuning profile (applied on every new connection; ignored for other backends)
+SQLITE_TUNING_ENABLED: bool = os.getenv("SQLITE_TUNING_ENABLED", "true").lower() == "true"
+SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 256MB
+SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB, i.e. 64MB
+SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY").upper()
+
 # Security settings
 SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM: str = "HS256"
@@ -75,6 +96,66 @@ VEHICLE_TYPES: dict = {
     }
 }
 
+# How long a worker trusts its cached driver duty state before re-reading DriverStatus
+DRIVER_STATE_TTL_SECONDS: int = int(os.getenv("DRIVER_STATE_TTL_SECONDS", "30"))
+
+# Max seconds a worker serves cached SystemConfig before re-checking its version
+CONFIG_CACHE_CHECK_SECONDS: float = float(os.getenv("CONFIG_CACHE_CHECK_SECONDS", "5"))
+
+# Dispatcher quote cache: coordinates are rounded to QUOTE_CACHE_PRECISION decimals (3 ~ 110 m)
+QUOTE_CACHE_SIZE: int = int(os.getenv("QUOTE_CACHE_SIZE", "10000"))
+QUOTE_CACHE_TTL_SECONDS: int = int(os.getenv("QUOTE_CACHE_TTL_SECONDS", "600"))
+QUOTE_CACHE_PRECISION: int = int(os.getenv("QUOTE_CACHE_PRECISION", "3"))
+
+# Automatic supply/demand surge per hexagonal cell (off unless enabled).
+# Driver/pickup positions are tracked and re-seeded every SURGE_RESYNC_SECONDS
+# either way, since the dispatcher heatmap reads them. One worker per tick
+# computes the multipliers and stores them in the surge_auto_state
+# system_config row; the other workers adopt them, so every worker prices a
+# trip the same way. Clocks of the workers must be in sync.
+SURGE_AUTO_ENABLED: bool = os.getenv("SURGE_AUTO_ENABLED", "false").lower() == "true"
+SURGE_TICK_SECONDS: float = float(os.getenv("SURGE_TICK_SECONDS", "15"))
+SURGE_RESYNC_SECONDS: float = float(os.getenv("SURGE_RESYNC_SECONDS", "600"))
+SURGE_HEX_SIZE_KM: float = float(os.getenv("SURGE_HEX_SIZE_KM", "0.5"))
+SURGE_EWMA_ALPHA: float = float(os.getenv("SURGE_EWMA_ALPHA", "0.3"))
+SURGE_DEMAND_THRESHOLD: float = float(os.getenv("SURGE_DEMAND_THRESHOLD", "1.0"))
+SURGE_SENSITIVITY: float = float(os.getenv("SURGE_SENSITIVITY", "0.5"))
+SURGE_MAX_MULTIPLIER: float = float(os.getenv("SURGE_MAX_MULTIPLIER", "2.5"))
+
+# Promo codes: active-code cache lifetime and buffered usage row writes
+PROMO_CACHE_TTL_SECONDS: float = float(os.getenv("PROMO_CACHE_TTL_SECONDS", "60"))
+PROMO_USAGE_BATCH_SIZE: int = int(os.getenv("PROMO_USAGE_BATCH_SIZE", "200"))
+PROMO_USAGE_FLUSH_SECONDS: float = float(os.getenv("PROMO_USAGE_FLUSH_SECONDS", "2"))
+
+# Admin dashboard: background analytics jobs and how often their snapshots refresh
+ANALYTICS_JOBS_ENABLED: bool = os.getenv("ANALYTICS_JOBS_ENABLED", "true").lower() == "true"
+ANALYTICS_REFRESH_SECONDS: float = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+
+# Driver leaderboards: full rebuild from rides (also merges other workers' completions)
+LEADERBOARD_RESYNC_SECONDS: float = float(os.getenv("LEADERBOARD_RESYNC_SECONDS", "300"))
+
+# Demand forecast per zone: hex zone size, weekly smoothing and how often new days are trained
+FORECAST_ZONE_KM: float = float(os.getenv("FORECAST_ZONE_KM", "1.0"))
+FORECAST_ALPHA: float = float(os.getenv("FORECAST_ALPHA", "0.2"))
+FORECAST_RETRAIN_SECONDS: float = float(os.getenv("FORECAST_RETRAIN_SECONDS", "3600"))
+
+# Dispatcher heatmap: max age of the position snapshot, cached views per snapshot
+HEATMAP_TICK_SECONDS: float = float(os.getenv("HEATMAP_TICK_SECONDS", "5"))
+HEATMAP_CACHE_SIZE: int = int(os.getenv("HEATMAP_CACHE_SIZE", "256"))
+
+# MapService (OSRM / Nominatim): shared HTTP session pool, DNS cache, timeouts, in-flight cap
+MAP_HTTP_MAX_CONNECTIONS: int = int(os.getenv("MAP_HTTP_MAX_CONNECTIONS", "100"))
+MAP_HTTP_PER_HOST: int = int(os.getenv("MAP_HTTP_PER_HOST", "20"))
+MAP_HTTP_KEEPALIVE_SECONDS: float = float(os.getenv("MAP_HTTP_KEEPALIVE_SECONDS", "30"))
+MAP_HTTP_DNS_TTL_SECONDS: int = int(os.getenv("MAP_HTTP_DNS_TTL_SECONDS", "300"))
+MAP_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("MAP_HTTP_CONNECT_TIMEOUT", "2"))
+MAP_HTTP_READ_TIMEOUT: float = float(os.getenv("MAP_HTTP_READ_TIMEOUT", "5"))
+MAP_HTTP_TOTAL_TIMEOUT: float = float(os.getenv("MAP_HTTP_TOTAL_TIMEOUT", "8"))
+MAP_HTTP_CONCURRENCY: int = int(os.getenv("MAP_HTTP_CONCURRENCY", "50"))
+
+# Admin exports: rows fetched per server-side cursor batch / CSV chunk
+EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
 # Payment methods
 PAYMENT_METHODS: list = ["card", "wallet", "cash"]
 
@@ -98,6 +179,20 @@ class Settings:
     def __init__(self):
         self.database_url: str = DATABASE_URL
         self.testing: bool = TESTING
+        self.db_pool_size: int = DB_POOL_SIZE
+        self.db_max_overflow: int = DB_MAX_OVERFLOW
+        self.db_pool_timeout: int = DB_POOL_TIMEOUT
+        self.db_pool_recycle: int = DB_POOL_RECYCLE
+        self.db_pool_pre_ping: bool = DB_POOL_PRE_PING
+        self.db_slow_checkout_ms: int = DB_SLOW_CHECKOUT_MS
+        self.metrics_token: Optional[str] = METRICS_TOKEN
+        self.sqlite_tuning_enabled: bool = SQLITE_TUNING_ENABLED
+        self.sqlite_journal_mode: str = SQLITE_JOURNAL_MODE
+        self.sqlite_synchronous: str = SQLITE_SYNCHRONOUS
+        self.sqlite_busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS
+        self.sqlite_mmap_size: int = SQLITE_MMAP_SIZE
+        self.sqlite_cache_size: int = SQLITE_CACHE_SIZE
+        self.sqlite_temp_store: str = SQLITE_TEMP_STORE
         self.secret_key: str = SECRET_KEY
         self.algorithm: str = ALGORITHM
         self.access_token_expire_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES
@@ -114,6 +209,39 @@ class Settings:
         self.cors_origins: list = CORS_ORIGINS
         self.commission_rate: float = COMMISSION_RATE
         self.vehicle_types: dict = VEHICLE_TYPES
+        self.driver_state_ttl_seconds: int = DRIVER_STATE_TTL_SECONDS
+        self.config_cache_check_seconds: float = CONFIG_CACHE_CHECK_SECONDS
+        self.quote_cache_size: int = QUOTE_CACHE_SIZE
+        self.quote_cache_ttl_seconds: int = QUOTE_CACHE_TTL_SECONDS
+        self.quote_cache_precision: int = QUOTE_CACHE_PRECISION
+        self.surge_auto_enabled: bool = SURGE_AUTO_ENABLED
+        self.surge_tick_seconds: float = SURGE_TICK_SECONDS
+        self.surge_resync_seconds: float = SURGE_RESYNC_SECONDS
+        self.surge_hex_size_km: float = SURGE_HEX_SIZE_KM
+        self.surge_ewma_alpha: float = SURGE_EWMA_ALPHA
+        self.surge_demand_threshold: float = SURGE_DEMAND_THRESHOLD
+        self.surge_sensitivity: float = SURGE_SENSITIVITY
+        self.surge_max_multiplier: float = SURGE_MAX_MULTIPLIER
+        self.promo_cache_ttl_seconds: float = PROMO_CACHE_TTL_SECONDS
+        self.promo_usage_batch_size: int = PROMO_USAGE_BATCH_SIZE
+        self.promo_usage_flush_seconds: float = PROMO_USAGE_FLUSH_SECONDS
+        self.analytics_jobs_enabled: bool = ANALYTICS_JOBS_ENABLED
+        self.analytics_refresh_seconds: float = ANALYTICS_REFRESH_SECONDS
+        self.export_batch_size: int = EXPORT_BATCH_SIZE
+        self.leaderboard_resync_seconds: float = LEADERBOARD_RESYNC_SECONDS
+        self.forecast_zone_km: float = FORECAST_ZONE_KM
+        self.forecast_alpha: float = FORECAST_ALPHA
+        self.forecast_retrain_seconds: float = FORECAST_RETRAIN_SECONDS
+        self.heatmap_tick_seconds: float = HEATMAP_TICK_SECONDS
+        self.heatmap_cache_size: int = HEATMAP_CACHE_SIZE
+        self.map_http_max_connections: int = MAP_HTTP_MAX_CONNECTIONS
+        self.map_http_per_host: int = MAP_HTTP_PER_HOST
+        self.map_http_keepalive_seconds: float = MAP_HTTP_KEEPALIVE_SECONDS
+        self.map_http_dns_ttl_seconds: int = MAP_HTTP_DNS_TTL_SECONDS
+        self.map_http_connect_timeout: float = MAP_HTTP_CONNECT_TIMEOUT
+        self.map_http_read_timeout: float = MAP_HTTP_READ_TIMEOUT
+        self.map_http_total_timeout: float = MAP_HTTP_TOTAL_TIMEOUT
+        self.map_http_concurrency: int = MAP_HTTP_CONCURRENCY
         self.payment_methods: list = PAYMENT_METHODS
         self.supported_languages: list = SUPPORTED_LANGUAGES
         self.default_page_size: int = DEFAULT_PAGE_SIZE
@@ -1,9 +1,10 @@
 import pytest
 import os
+from fastapi import Depends
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import QueuePool, StaticPool
 import sys
 
 # Add the current directory to Python path for imports
@@ -15,9 +16,10 @@ os.environ["TESTING"] = "true"
 # Import only models and config, not the full main app to avoid FastAPI initialization issues
 from models import Base
 from config import SECRET_KEY, ALGORITHM
+from database import apply_sqlite_pragmas, get_db
 
 # Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test_royaltaxi.db"
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -135,3 +137,69 @@ def admin_auth_headers(test_admin):
 
     token = create_access_token(data={"sub": test_admin.email})
     return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory on a fresh file-backed SQLite database, pooled and tuned like the app.
+
+    Unlike ``db``, every session gets its own connection and commits for real,
+    so it suits concurrency tests and API tests.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=20,
+    )
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def api_client(session_factory):
+    """Test client whose get_db sessions come from ``session_factory``; server errors come back as 500s."""
+    from main import app
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app, raise_server_exceptions=False)
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(overrides)
+
+@pytest.fixture
+def login(api_client):
+    """``login(user)`` makes ``api_client`` requests run as ``user`` (loaded in the request's session)."""
+    from main import app
+    from models import User
+    from routers.auth import get_current_user
+
+    def _login(user):
+        user_id = user.id
+
+        def current_user(db=Depends(get_db)):
+            return db.get(User, user_id)
+
+        app.dependency_overrides[get_current_user] = current_user
+
+    return _login
+
+@pytest.fixture
+def dispatcher_user(session_factory):
+    """A committed dispatcher account in the ``session_factory`` database."""
+    from models import User
+
+    db = session_factory()
+    user = User(phone="+998900000009", password="x", full_name="Dispatcher", is_dispatcher=True, is_approved=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.close()
+    return user
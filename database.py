@@ -2,24 +2,182 @@
 Database connection and session management
 """
 import os
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from collections import deque
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import declarative_base, sessionmaker
 from config import settings
 
+logger = logging.getLogger(__name__)
+
 # Database URL for SQLAlchemy
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
+# Allowed PRAGMA values (interpolated into SQL, so never pass env strings through unchecked)
+_SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SQLITE_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_SQLITE_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """Apply the SQLite tuning profile from settings to a fresh DBAPI connection.
+
+    WAL lets location writes and reads proceed concurrently, ``synchronous=NORMAL``
+    is durable under WAL except for power loss, and ``busy_timeout`` makes writers
+    wait for the lock instead of failing with ``database is locked``.
+    """
+    journal_mode = settings.sqlite_journal_mode
+    synchronous = settings.sqlite_synchronous
+    temp_store = settings.sqlite_temp_store
+    if journal_mode not in _SQLITE_JOURNAL_MODES:
+        logger.warning(f"Unknown SQLITE_JOURNAL_MODE={journal_mode}, using WAL")
+        journal_mode = "WAL"
+    if synchronous not in _SQLITE_SYNCHRONOUS_MODES:
+        logger.warning(f"Unknown SQLITE_SYNCHRONOUS={synchronous}, using NORMAL")
+        synchronous = "NORMAL"
+    if temp_store not in _SQLITE_TEMP_STORES:
+        logger.warning(f"Unknown SQLITE_TEMP_STORE={temp_store}, using MEMORY")
+        temp_store = "MEMORY"
+
+    cursor = dbapi_connection.cursor()
+    try:
+        # busy_timeout first so switching the journal mode also waits for the lock
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cursor.execute(f"PRAGMA temp_store={temp_store}")
+    finally:
+        cursor.close()
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection checkouts (wait time, timeouts, slow waits)"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent_waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent_waits.append(seconds)
+            if seconds * 1000 >= settings.db_slow_checkout_ms:
+                self.slow_checkouts += 1
+                slow = True
+            else:
+                slow = False
+        if slow:
+            logger.warning(f"Slow DB connection checkout: waited {seconds * 1000:.1f} ms ({pool_status_line()})")
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+        logger.error(f"DB connection checkout timed out after {settings.db_pool_timeout}s ({pool_status_line()})")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            checkouts = self.checkouts
+            data = {
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "avg_wait_ms": round(self.total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+        if recent:
+            data["p50_wait_ms"] = round(recent[len(recent) // 2] * 1000, 3)
+            data["p99_wait_ms"] = round(recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000, 3)
+        else:
+            data["p50_wait_ms"] = data["p99_wait_ms"] = 0.0
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_wait(time.perf_counter() - started)
+        return conn
+
+
 # Create SQLAlchemy engine (handle SQLite vs. other drivers)
-engine_kwargs = {"pool_pre_ping": True}
+engine_kwargs = {"pool_pre_ping": settings.db_pool_pre_ping}
+queue_pool_kwargs = {
+    "poolclass": InstrumentedQueuePool,
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout,
+    "pool_recycle": settings.db_pool_recycle,
+}
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+if is_sqlite:
     engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if settings.sqlite_tuning_enabled and ":memory:" not in SQLALCHEMY_DATABASE_URL:
+        # Keep file connections open: cache_size and mmap_size are per connection and
+        # would be thrown away by the default NullPool after every request
+        engine_kwargs.update(queue_pool_kwargs)
+else:
+    engine_kwargs.update(queue_pool_kwargs)
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     **engine_kwargs
 )
 
+if is_sqlite and settings.sqlite_tuning_enabled:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+
+def pool_status() -> dict:
+    """Current pool occupancy plus checkout wait metrics (for the metrics endpoint)"""
+    pool = engine.pool
+    data = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update({
+            "pool_size": pool.size(),
+            "max_overflow": settings.db_max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # QueuePool.overflow() starts at -pool_size; clamp to "connections beyond pool_size"
+            "overflow": max(pool.overflow(), 0),
+            "timeout_seconds": settings.db_pool_timeout,
+            "recycle_seconds": settings.db_pool_recycle,
+            "pre_ping": settings.db_pool_pre_ping,
+        })
+    data.update(pool_metrics.snapshot())
+    return data
+
+
+def pool_status_line() -> str:
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        return f"in_use={pool.checkedout()} overflow={max(pool.overflow(), 0)} size={pool.size()}"
+    return type(pool).__name__
+
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
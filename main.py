@@ -2,6 +2,7 @@
 Royal Taxi API - Main application file
 Clean, organized FastAPI application with proper structure
 """
+import asyncio
 from contextlib import asynccontextmanager
 import sqlite3
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
@@ -22,7 +23,14 @@ from starlette.middleware.trustedhost import TrustedHostMiddleware
 import os
 
 from config import settings
-from database import engine, Base
+from database import engine, Base, SessionLocal
+from services.config_cache import config_cache
+from services.demand_surge import demand_surge, run_demand_surge
+from services.promo import promo_service, run_promo_flush
+from services.analytics_jobs import run_analytics_jobs
+from services.leaderboard import run_leaderboard_resync
+from services.demand_forecast import run_demand_forecast
+from services.map_service import MapService
 
 from websocket import manager  # Import WebSocket manager
 from swagger_config import setup_swagger_ui  # Import Swagger setup
@@ -37,6 +45,8 @@ from routers.dispatcher import router as dispatcher_router
 from routers.driver import router as driver_router
 from routers.rider import router as rider_router  # Rider tracking router
 from routers.services import router as services_router  # Additional services
+from routers.pricing import router as pricing_router  # Batch fare quotes
+from routers.metrics import router as metrics_router  # Internal metrics (admin/token only)
 
 # Import models for table creation
 from models import *  # noqa
@@ -93,6 +103,10 @@ async def lifespan(app: FastAPI):
         print(f"⚠️ Redis connection failed: {e}")
         redis_client = None
 
+    # Cross-worker SystemConfig invalidation (falls back to version polling)
+    if config_cache.start_listener(settings.redis_url):
+        print("✅ Config cache listening for version bumps")
+
     # Initialize Firebase if credentials available
     try:
         if credentials and hasattr(settings, 'firebase_credentials_path') and settings.firebase_credentials_path:
@@ -105,9 +119,50 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Firebase initialization failed: {e}")
 
+    # Shared pooled HTTP session for OSRM / Nominatim
+    await MapService.startup()
+
+    # Live driver/pickup positions (dispatcher heatmap) and, with SURGE_AUTO_ENABLED, automatic surge
+    surge_task = asyncio.create_task(
+        run_demand_surge(SessionLocal, settings.surge_tick_seconds, settings.surge_resync_seconds)
+    )
+    if demand_surge.enabled:
+        print(f"✅ Demand surge running every {settings.surge_tick_seconds}s")
+
+    # Bulk-write buffered promo code usage rows
+    promo_task = asyncio.create_task(run_promo_flush(SessionLocal, settings.promo_usage_flush_seconds))
+
+    # Driver leaderboards: seed now, then periodic rebuild from rides
+    leaderboard_task = asyncio.create_task(
+        run_leaderboard_resync(SessionLocal, settings.leaderboard_resync_seconds)
+    )
+
+    # Demand forecast: load the stored profile and train any new complete days
+    forecast_task = asyncio.create_task(
+        run_demand_forecast(SessionLocal, settings.forecast_retrain_seconds)
+    )
+
+    # Precompute admin dashboard snapshots off the request path
+    analytics_task = None
+    if settings.analytics_jobs_enabled:
+        analytics_task = asyncio.create_task(run_analytics_jobs(settings.analytics_refresh_seconds))
+        print(f"✅ Analytics jobs refreshing every {settings.analytics_refresh_seconds}s")
+
     yield
 
     # Cleanup (if needed)
+    surge_task.cancel()
+    if analytics_task:
+        analytics_task.cancel()
+    leaderboard_task.cancel()
+    forecast_task.cancel()
+    promo_task.cancel()
+    await MapService.shutdown()
+    db = SessionLocal()
+    try:
+        promo_service.flush(db)
+    finally:
+        db.close()
     print(" Application shutting down...")
 
 # Create FastAPI application
@@ -160,7 +215,9 @@ app.include_router(files, prefix="/api/v1")
 app.include_router(dispatcher_router, prefix="/api/v1")
 app.include_router(driver_router, prefix="/api/v1")
 app.include_router(rider_router, prefix="/api/v1")  # Rider tracking APIs
+app.include_router(pricing_router, prefix="/api/v1")  # Batch fare quotes
 app.include_router(services_router)  # Additional services (already has /api/v1 prefix)
+app.include_router(metrics_router)  # /metrics/* (admin or X-Metrics-Token)
 
 @app.get("/", tags=["Health"])
 async def root():
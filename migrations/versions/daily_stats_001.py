@@ -0,0 +1,181 @@
+"""Add daily_stats rollup table and stored ride city/distance
+
+Existing rides get their city and straight-line distance from the stored
+JSON locations, and daily_stats is filled from rides and users with one
+grouped INSERT ... SELECT (same buckets as services.rollups.rebuild).
+
+Revision ID: daily_stats_001
+Revises: promo_release_001
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import json
+import math
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'daily_stats_001'
+down_revision: Union[str, Sequence[str], None] = 'promo_release_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rides', sa.Column('city', sa.String(), nullable=True))
+    op.add_column('rides', sa.Column('distance_km', sa.Float(), nullable=True))
+    op.create_table(
+        'daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('city', sa.String(), nullable=False, server_default=''),
+        sa.Column('vehicle_type', sa.String(), nullable=False, server_default=''),
+        sa.Column('rides_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rides_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rides_cancelled', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('commission', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('distance_km', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('new_users', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('driver_approvals', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'city', 'vehicle_type', name='uq_daily_stats_day_city_vehicle_type'),
+    )
+    op.create_index('ix_daily_stats_id', 'daily_stats', ['id'], unique=False)
+    op.create_index('ix_daily_stats_day', 'daily_stats', ['day'], unique=False)
+
+    # Backfill, so the dashboards are right as soon as the app starts on the new schema
+    bind = op.get_bind()
+    _backfill_rides(bind)
+    _backfill_daily_stats(bind)
+
+
+rides = sa.table(
+    'rides',
+    sa.column('id', sa.Integer), sa.column('pickup_location', sa.String), sa.column('dropoff_location', sa.String),
+    sa.column('city', sa.String), sa.column('distance_km', sa.Float), sa.column('fare', sa.Float),
+    sa.column('vehicle_type', sa.String), sa.column('status', sa.String),
+    sa.column('created_at', sa.DateTime), sa.column('completed_at', sa.DateTime),
+)
+users = sa.table(
+    'users',
+    sa.column('id', sa.Integer), sa.column('city', sa.String), sa.column('is_approved', sa.Boolean),
+    sa.column('created_at', sa.DateTime), sa.column('approved_at', sa.DateTime),
+)
+system_config = sa.table('system_config', sa.column('key', sa.String), sa.column('value', sa.String))
+
+COUNTERS = (
+    'rides_created', 'rides_completed', 'rides_cancelled', 'revenue',
+    'commission', 'distance_km', 'new_users', 'driver_approvals',
+)
+daily_stats = sa.table(
+    'daily_stats', sa.column('day', sa.Date), sa.column('city', sa.String), sa.column('vehicle_type', sa.String),
+    *[sa.column(name) for name in COUNTERS],
+)
+
+
+def _location(raw) -> dict:
+    try:
+        loc = json.loads(raw) if raw else {}
+        return loc if isinstance(loc, dict) else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def _distance_km(pickup: dict, dropoff: dict) -> Optional[float]:
+    """Haversine km, like utils.helpers.calculate_distance"""
+    try:
+        lat1, lng1, lat2, lng2 = map(math.radians, (
+            float(pickup['lat']), float(pickup['lng']), float(dropoff['lat']), float(dropoff['lng'])
+        ))
+    except (KeyError, TypeError, ValueError):
+        return None
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return round(6371 * 2 * math.asin(math.sqrt(a)), 3)
+
+
+def _backfill_rides(bind, batch_size: int = 1000) -> None:
+    """Fill rides.city / rides.distance_km from the JSON locations, in id order batches"""
+    update = rides.update().where(rides.c.id == sa.bindparam('ride_id')).values(
+        city=sa.bindparam('ride_city'), distance_km=sa.bindparam('ride_distance_km')
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(rides.c.id, rides.c.pickup_location, rides.c.dropoff_location)
+            .where(rides.c.id > last_id).order_by(rides.c.id).limit(batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        updates = []
+        for ride_id, pickup, dropoff in rows:
+            p, d = _location(pickup), _location(dropoff)
+            updates.append({'ride_id': ride_id, 'ride_city': p.get('city') or None, 'ride_distance_km': _distance_km(p, d)})
+        bind.execute(update, updates)
+        last_id = rows[-1][0]
+
+
+def _commission_rate(bind) -> float:
+    value = bind.execute(sa.select(system_config.c.value).where(system_config.c.key == 'commission_rate')).scalar()
+    try:
+        return float(value) if value is not None else settings.commission_rate
+    except (TypeError, ValueError):
+        return settings.commission_rate
+
+
+def _backfill_daily_stats(bind) -> None:
+    """One row per (day, city, vehicle_type) from every ride and user event so far"""
+    zero, zero_float = sa.literal(0), sa.literal(0.0)
+
+    def event(day, city, vehicle_type, **values):
+        columns = [day.label('day'), sa.func.coalesce(city, '').label('city'), vehicle_type.label('vehicle_type')]
+        for name in COUNTERS:
+            default = zero_float if name in ('revenue', 'commission', 'distance_km') else zero
+            columns.append(values.get(name, default).label(name))
+        return sa.select(*columns)
+
+    done_at = sa.func.coalesce(rides.c.completed_at, rides.c.created_at)
+    vehicle_type = sa.func.coalesce(rides.c.vehicle_type, '')
+    events = sa.union_all(
+        event(sa.func.date(rides.c.created_at), rides.c.city, vehicle_type,
+              rides_created=sa.literal(1),
+              rides_cancelled=sa.case((rides.c.status == 'cancelled', 1), else_=0))
+        .where(rides.c.created_at.isnot(None)),
+        event(sa.func.date(done_at), rides.c.city, vehicle_type,
+              rides_completed=sa.literal(1),
+              revenue=sa.func.coalesce(rides.c.fare, 0.0),
+              distance_km=sa.func.coalesce(rides.c.distance_km, 0.0))
+        .where(rides.c.status == 'completed', done_at.isnot(None)),
+        event(sa.func.date(users.c.created_at), users.c.city, sa.literal(''), new_users=sa.literal(1))
+        .where(users.c.created_at.isnot(None)),
+        event(sa.func.date(users.c.approved_at), users.c.city, sa.literal(''), driver_approvals=sa.literal(1))
+        .where(users.c.is_approved == sa.true(), users.c.approved_at.isnot(None)),
+    ).subquery()
+
+    # Historical commission is not stored per ride: use the current rate, like rebuild does
+    rate = _commission_rate(bind)
+    sums = [
+        sa.func.round(sa.cast(sa.func.sum(events.c.revenue) * rate, sa.Numeric), 2) if name == 'commission'
+        else sa.func.sum(events.c[name])
+        for name in COUNTERS
+    ]
+    bind.execute(daily_stats.insert().from_select(
+        ['day', 'city', 'vehicle_type', *COUNTERS],
+        sa.select(events.c.day, events.c.city, events.c.vehicle_type, *sums)
+        .group_by(events.c.day, events.c.city, events.c.vehicle_type)
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_stats_day', table_name='daily_stats')
+    op.drop_index('ix_daily_stats_id', table_name='daily_stats')
+    op.drop_table('daily_stats')
+    op.drop_column('rides', 'distance_km')
+    op.drop_column('rides', 'city')
@@ -0,0 +1,40 @@
+"""Add demand_profiles table for the per-zone demand forecast
+
+Revision ID: demand_profiles_001
+Revises: ride_latency_001
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'demand_profiles_001'
+down_revision: Union[str, Sequence[str], None] = 'ride_latency_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'demand_profiles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('zone_q', sa.Integer(), nullable=False),
+        sa.Column('zone_r', sa.Integer(), nullable=False),
+        sa.Column('hour_of_week', sa.Integer(), nullable=False),
+        sa.Column('expected', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('samples', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('zone_q', 'zone_r', 'hour_of_week', name='uq_demand_profiles_zone_hour'),
+    )
+    op.create_index('ix_demand_profiles_id', 'demand_profiles', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_demand_profiles_id', table_name='demand_profiles')
+    op.drop_table('demand_profiles')
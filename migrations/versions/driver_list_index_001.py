@@ -0,0 +1,28 @@
+"""Add users (city, id) index for the dispatcher driver list
+
+Revision ID: driver_list_index_001
+Revises: demand_profiles_001
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'driver_list_index_001'
+down_revision: Union[str, Sequence[str], None] = 'demand_profiles_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_city_id', 'users', ['city', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_city_id', table_name='users')
@@ -0,0 +1,77 @@
+"""Add driver_totals running-totals table
+
+Filled from rides with the grouped INSERT ... SELECT that
+services.rollups.rebuild_driver_totals runs.
+
+Revision ID: driver_totals_001
+Revises: daily_stats_001
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'driver_totals_001'
+down_revision: Union[str, Sequence[str], None] = 'daily_stats_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'driver_totals',
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('rides_accepted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rides_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('commission', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('distance_km', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['driver_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('driver_id'),
+    )
+
+    # Backfill, so /driver/stats is right as soon as the app starts on the new schema
+    bind = op.get_bind()
+    rides = sa.table(
+        'rides', sa.column('driver_id', sa.Integer), sa.column('status', sa.String),
+        sa.column('fare', sa.Float), sa.column('distance_km', sa.Float),
+    )
+    system_config = sa.table('system_config', sa.column('key', sa.String), sa.column('value', sa.String))
+    driver_totals = sa.table(
+        'driver_totals', sa.column('driver_id'), sa.column('rides_accepted'), sa.column('rides_completed'),
+        sa.column('revenue'), sa.column('commission'), sa.column('distance_km'), sa.column('updated_at'),
+    )
+
+    rate = bind.execute(sa.select(system_config.c.value).where(system_config.c.key == 'commission_rate')).scalar()
+    try:
+        rate = float(rate) if rate is not None else settings.commission_rate
+    except (TypeError, ValueError):
+        rate = settings.commission_rate
+
+    completed = rides.c.status == 'completed'
+    revenue = sa.func.coalesce(sa.func.sum(sa.case((completed, rides.c.fare), else_=0)), 0)
+    bind.execute(driver_totals.insert().from_select(
+        ['driver_id', 'rides_accepted', 'rides_completed', 'revenue', 'commission', 'distance_km', 'updated_at'],
+        sa.select(
+            rides.c.driver_id,
+            sa.func.count(),
+            sa.func.sum(sa.case((completed, 1), else_=0)),
+            revenue,
+            sa.func.round(sa.cast(revenue * rate, sa.Numeric), 2),
+            sa.func.coalesce(sa.func.sum(sa.case((completed, rides.c.distance_km), else_=0)), 0),
+            sa.func.current_timestamp(),
+        ).where(rides.c.driver_id.isnot(None)).group_by(rides.c.driver_id)
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('driver_totals')
@@ -0,0 +1,30 @@
+"""Add indexes for keyset pagination of driver and rider ride history
+
+Revision ID: history_keyset_indexes_001
+Revises: hot_query_indexes_001
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'history_keyset_indexes_001'
+down_revision: Union[str, Sequence[str], None] = 'hot_query_indexes_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_rides_driver_id_created_at', 'rides', ['driver_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_rides_rider_id_created_at', 'rides', ['rider_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rides_rider_id_created_at', table_name='rides')
+    op.drop_index('ix_rides_driver_id_created_at', table_name='rides')
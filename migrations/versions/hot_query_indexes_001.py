@@ -0,0 +1,44 @@
+"""Add indexes for hot ride, payment, notification, OTP and driver status queries
+
+Revision ID: hot_query_indexes_001
+Revises: otp_verification_001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'hot_query_indexes_001'
+down_revision: Union[str, Sequence[str], None] = 'otp_verification_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - names match models.py so create_all and migrations agree
+INDEXES = [
+    ('ix_rides_status', 'rides', ['status']),
+    ('ix_rides_driver_id_status', 'rides', ['driver_id', 'status']),
+    ('ix_rides_rider_id_status', 'rides', ['rider_id', 'status']),
+    ('ix_rides_created_at', 'rides', ['created_at']),
+    ('ix_payments_status_created_at', 'payments', ['status', 'created_at']),
+    ('ix_payments_ride_id', 'payments', ['ride_id']),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', 'created_at']),
+    ('ix_otp_verifications_phone_verified_created', 'otp_verifications', ['phone', 'is_verified', 'created_at']),
+    ('ix_driver_statuses_is_on_duty', 'driver_statuses', ['is_on_duty']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""Add index for leaderboard resync over recently completed rides
+
+Revision ID: leaderboard_index_001
+Revises: driver_totals_001
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'leaderboard_index_001'
+down_revision: Union[str, Sequence[str], None] = 'driver_totals_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_rides_status_completed_at', 'rides', ['status', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rides_status_completed_at', table_name='rides')
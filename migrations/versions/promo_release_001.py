@@ -0,0 +1,32 @@
+"""Link rides to their promo code and record the customer on promo usages
+
+Revision ID: promo_release_001
+Revises: history_keyset_indexes_001
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'promo_release_001'
+down_revision: Union[str, Sequence[str], None] = 'history_keyset_indexes_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rides', sa.Column('promo_code_id', sa.Integer(), sa.ForeignKey('promo_codes.id'), nullable=True))
+    op.add_column('promo_code_usages', sa.Column('customer_id', sa.Integer(), sa.ForeignKey('customers.id'), nullable=True))
+    op.create_index('ix_promo_code_usages_customer_id', 'promo_code_usages', ['customer_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_promo_code_usages_customer_id', table_name='promo_code_usages')
+    op.drop_column('promo_code_usages', 'customer_id')
+    op.drop_column('rides', 'promo_code_id')
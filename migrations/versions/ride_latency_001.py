@@ -0,0 +1,51 @@
+"""Add ride lifecycle timestamps and ride_latency_buckets histogram table
+
+Revision ID: ride_latency_001
+Revises: leaderboard_index_001
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ride_latency_001'
+down_revision: Union[str, Sequence[str], None] = 'leaderboard_index_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rides', sa.Column('accepted_at', sa.DateTime(), nullable=True))
+    op.add_column('rides', sa.Column('arrived_at', sa.DateTime(), nullable=True))
+    op.add_column('rides', sa.Column('started_at', sa.DateTime(), nullable=True))
+    op.add_column('rides', sa.Column('cancelled_at', sa.DateTime(), nullable=True))
+    op.create_table(
+        'ride_latency_buckets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), nullable=False),
+        sa.Column('city', sa.String(), nullable=False, server_default=''),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'hour', 'city', 'metric', 'bucket', name='uq_ride_latency_buckets_key'),
+    )
+    op.create_index('ix_ride_latency_buckets_id', 'ride_latency_buckets', ['id'], unique=False)
+    op.create_index('ix_ride_latency_buckets_day', 'ride_latency_buckets', ['day'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ride_latency_buckets_day', table_name='ride_latency_buckets')
+    op.drop_index('ix_ride_latency_buckets_id', table_name='ride_latency_buckets')
+    op.drop_table('ride_latency_buckets')
+    op.drop_column('rides', 'cancelled_at')
+    op.drop_column('rides', 'started_at')
+    op.drop_column('rides', 'arrived_at')
+    op.drop_column('rides', 'accepted_at')
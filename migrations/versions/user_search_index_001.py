@@ -0,0 +1,35 @@
+"""Add index for admin user search by name prefix
+
+Revision ID: user_search_index_001
+Revises: driver_list_index_001
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'user_search_index_001'
+down_revision: Union[str, Sequence[str], None] = 'driver_list_index_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_full_name_lower', 'users', [sa.text('lower(full_name)')], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # LIKE 'prefix%' can only use a btree built with pattern ops outside the C locale
+        op.execute('CREATE INDEX ix_users_phone_pattern ON users (phone varchar_pattern_ops)')
+        op.execute('CREATE INDEX ix_users_full_name_lower_pattern ON users (lower(full_name) varchar_pattern_ops)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX ix_users_full_name_lower_pattern')
+        op.execute('DROP INDEX ix_users_phone_pattern')
+    op.drop_index('ix_users_full_name_lower', table_name='users')
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Date, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey, Date, JSON, Index, UniqueConstraint
+from sqlalchemy import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -9,6 +10,10 @@ class TimestampMixin(object):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Dispatcher driver list: city filter walked in id (cursor) order
+        Index("ix_users_city_id", "city", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, nullable=True)
     phone = Column(String, unique=True, index=True, nullable=False)
@@ -64,6 +69,10 @@ class User(Base):
     vehicles = relationship("Vehicle", back_populates="driver")
     reviews_given = relationship("Review", back_populates="reviewer", foreign_keys="Review.reviewer_id")
     reviews_received = relationship("Review", back_populates="reviewee", foreign_keys="Review.reviewee_id")
+
+# Admin user search: case-insensitive full_name prefix (phone prefixes use the unique phone index)
+Index("ix_users_full_name_lower", func.lower(User.full_name))
+
 class Customer(Base):
     __tablename__ = "customers"
     
@@ -80,6 +89,15 @@ class Customer(Base):
 
 class Ride(Base):
     __tablename__ = "rides"
+    __table_args__ = (
+        Index("ix_rides_driver_id_status", "driver_id", "status"),
+        Index("ix_rides_rider_id_status", "rider_id", "status"),
+        # Newest-first history pages (keyset on created_at, id)
+        Index("ix_rides_driver_id_created_at", "driver_id", "created_at", "id"),
+        Index("ix_rides_rider_id_created_at", "rider_id", "created_at", "id"),
+        # Leaderboard resync: completed rides of the current day/week/month
+        Index("ix_rides_status_completed_at", "status", "completed_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
@@ -92,9 +110,17 @@ class Ride(Base):
     fare = Column(Float, nullable=True)
     duration = Column(Integer, nullable=True)  # in minutes
     vehicle_type = Column(String, default="economy")
-    status = Column(String, default="pending")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    status = Column(String, default="pending", index=True)
+    city = Column(String, nullable=True)  # Pickup city, copied from pickup_location
+    distance_km = Column(Float, nullable=True)  # Route distance, so reports never re-parse JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Lifecycle timestamps (UTC), stamped by the driver/dispatcher/rider endpoints
+    accepted_at = Column(DateTime, nullable=True)
+    arrived_at = Column(DateTime, nullable=True)  # Driver reached the pickup point
+    started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    cancelled_at = Column(DateTime, nullable=True)
+    promo_code_id = Column(Integer, ForeignKey("promo_codes.id"), nullable=True)  # Reserved use, given back on cancel
     
     # Relationships
     customer = relationship("Customer", back_populates="rides")
@@ -109,9 +135,12 @@ class Ride(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_status_created_at", "status", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    ride_id = Column(Integer, ForeignKey("rides.id"))
+    ride_id = Column(Integer, ForeignKey("rides.id"), index=True)
     amount = Column(Float)
     currency = Column(String, default="UZS")
     status = Column(String, default="pending")  # pending, completed, failed, refunded
@@ -282,6 +311,7 @@ class PromoCodeUsage(Base):
     id = Column(Integer, primary_key=True, index=True)
     promo_code_id = Column(Integer, ForeignKey("promo_codes.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True, index=True)  # Dispatcher orders
     ride_id = Column(Integer, ForeignKey("rides.id"), nullable=True)
     discount_amount = Column(Float)
     used_at = Column(DateTime, default=datetime.utcnow)
@@ -293,6 +323,9 @@ class PromoCodeUsage(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -344,7 +377,7 @@ class DriverStatus(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     driver_id = Column(Integer, ForeignKey("users.id"), unique=True, index=True)
-    is_on_duty = Column(Boolean, default=False)  # True: accepts orders; False: resting
+    is_on_duty = Column(Boolean, default=False, index=True)  # True: accepts orders; False: resting
     last_lat = Column(Float, nullable=True)
     last_lng = Column(Float, nullable=True)
     city = Column(String, nullable=True)
@@ -362,8 +395,90 @@ class SystemConfig(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class DailyStat(Base):
+    """Kunlik yig'ma statistika (shahar va transport turi bo'yicha)
+
+    Ride counters are maintained incrementally by services.rollups; user
+    counters (new_users, driver_approvals) are stored with vehicle_type "".
+    """
+    __tablename__ = "daily_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "city", "vehicle_type", name="uq_daily_stats_day_city_vehicle_type"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    city = Column(String, nullable=False, default="")
+    vehicle_type = Column(String, nullable=False, default="")
+    rides_created = Column(Integer, nullable=False, default=0)
+    rides_completed = Column(Integer, nullable=False, default=0)
+    rides_cancelled = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    commission = Column(Float, nullable=False, default=0.0)
+    distance_km = Column(Float, nullable=False, default=0.0)
+    new_users = Column(Integer, nullable=False, default=0)
+    driver_approvals = Column(Integer, nullable=False, default=0)
+
+class DriverTotal(Base):
+    """Haydovchi bo'yicha jamlanma ko'rsatkichlar (running totals)
+
+    Updated in the same transaction as accept/complete, so /driver/stats is a
+    primary-key lookup instead of a scan of the driver's rides and payments.
+    """
+    __tablename__ = "driver_totals"
+
+    driver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    rides_accepted = Column(Integer, nullable=False, default=0)
+    rides_completed = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    commission = Column(Float, nullable=False, default=0.0)
+    distance_km = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RideLatencyBucket(Base):
+    """Buyurtma bosqichlari davomiyligi gistogrammasi (shahar va soat bo'yicha)
+
+    One row per (day, hour, city, metric, bucket) holding how many rides fell
+    into that latency bucket; day/hour are those of the ride's created_at.
+    Maintained by services.rollups, so percentiles never scan rides.
+    """
+    __tablename__ = "ride_latency_buckets"
+    __table_args__ = (
+        UniqueConstraint("day", "hour", "city", "metric", "bucket", name="uq_ride_latency_buckets_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    hour = Column(Integer, nullable=False)  # 0-23, UTC
+    city = Column(String, nullable=False, default="")
+    metric = Column(String, nullable=False)  # accept, pickup, trip
+    bucket = Column(Integer, nullable=False)  # index into rollups.LATENCY_BUCKETS
+    count = Column(Integer, nullable=False, default=0)
+
+class DemandProfile(Base):
+    """Hudud va hafta soati bo'yicha kutilayotgan buyurtmalar soni
+
+    Seasonal profile of services.demand_forecast: the smoothed number of
+    pickups in one hexagonal zone during one hour of the week (0 = Monday
+    00:00 UTC), and how many days of history it has absorbed.
+    """
+    __tablename__ = "demand_profiles"
+    __table_args__ = (
+        UniqueConstraint("zone_q", "zone_r", "hour_of_week", name="uq_demand_profiles_zone_hour"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    zone_q = Column(Integer, nullable=False)
+    zone_r = Column(Integer, nullable=False)
+    hour_of_week = Column(Integer, nullable=False)  # 0-167
+    expected = Column(Float, nullable=False, default=0.0)
+    samples = Column(Integer, nullable=False, default=0)
+
 class OTPVerification(Base):
     __tablename__ = "otp_verifications"
+    __table_args__ = (
+        Index("ix_otp_verifications_phone_verified_created", "phone", "is_verified", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     phone = Column(String, index=True, nullable=False)
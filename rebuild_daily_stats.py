@@ -0,0 +1,59 @@
+"""
+Rebuild the daily_stats rollup, driver_totals and ride_latency_buckets from rides and users
+
+The daily_stats/driver_totals migrations backfill history themselves; run
+this for any range whose counters are in doubt (manual SQL edits, restored
+backups). daily_stats rows in the range are replaced; days outside it are left
+untouched. ride_latency_buckets is rebuilt for rides created in the same range;
+driver_totals is always recomputed in full.
+
+Usage:
+    python rebuild_daily_stats.py                      # everything
+    python rebuild_daily_stats.py --start 2026-10-01 --end 2026-10-19
+"""
+import argparse
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+
+def _day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--start", type=_day, help="first day, YYYY-MM-DD (default: first ride/user)")
+    parser.add_argument("--end", type=_day, help="last day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--skip-backfill", action="store_true",
+                        help="do not fill rides.city / rides.distance_km from the JSON locations")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+    from models import Ride, User
+    from services.config_cache import config_cache
+    from services.rollups import rollups
+
+    db = SessionLocal()
+    try:
+        if not args.skip_backfill:
+            print(f"Backfilled {rollups.backfill_rides(db)} rides")
+
+        start = args.start
+        if start is None:
+            first = [v for v in (db.query(func.min(Ride.created_at)).scalar(),
+                                 db.query(func.min(User.created_at)).scalar()) if v]
+            start = min(first).date() if first else date.today()
+        end = args.end or datetime.utcnow().date()
+
+        rate = config_cache.get(db).commission_rate
+        count = rollups.rebuild(db, start, end, commission_rate=rate)
+        print(f"daily_stats {start}..{end}: {count} rows (commission rate {rate})")
+        print(f"driver_totals: {rollups.rebuild_driver_totals(db, commission_rate=rate)} drivers")
+        print(f"ride_latency_buckets {start}..{end}: {rollups.rebuild_latency(db, start, end)} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
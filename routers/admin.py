@@ -2,25 +2,35 @@
 Admin router - Administrative functionality for Royal Taxi API
 """
 import calendar
-from datetime import datetime, timedelta
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
-from sqlalchemy import func, extract, and_
+from sqlalchemy import and_, func
 import json
-from utils.helpers import calculate_distance
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import User, Ride, Payment, SystemConfig, Notification, AdditionalService
+from models import User, Ride, Payment, Notification, AdditionalService, SurgeArea, SurgePricing, PromoCode
 from schemas import (
-    UserResponse, SystemStats, DailyAnalytics, WeeklyAnalytics, 
+    SystemStats, DailyAnalytics, WeeklyAnalytics, 
     MonthlyAnalytics, YearlyAnalytics, IncomeStats, AdminNotifyRequest,
     VehicleTypePrice, PricingConfigResponse, AdditionalServiceCreate,
-    AdditionalServiceUpdate, AdditionalServiceResponse, AdditionalServiceToggle
+    AdditionalServiceUpdate, AdditionalServiceResponse, AdditionalServiceToggle,
+    SurgeAreaCreate, SurgeAreaResponse, SurgePricingCreate, SurgePricingUpdate, SurgePricingResponse,
+    PromoCodeCreate, PromoCodeResponse
 )
 from routers.auth import get_current_user
-from config import settings
+from utils.helpers import encode_id_cursor, decode_id_cursor, cached_count
+from services.config_cache import config_cache
+from services.response_cache import response_cache
+from services.pricing_engine import pricing_engine
+from services.promo import promo_service, normalize_code
+from services.rollups import rollups, latency_percentiles, LATENCY_METRICS
+from services.analytics_jobs import analytics_jobs
+from services.leaderboard import leaderboard
+from services.exports import export_service, ExportFilters, DATASETS, XLSX_MEDIA_TYPE
 
 router = APIRouter(
     prefix="/admin",
@@ -29,55 +39,126 @@ router = APIRouter(
 )
 
 
-@router.get("/users", response_model=List[UserResponse])
+# Columns read for the user listing; rows are built as plain dicts
+USER_LIST_COLUMNS = (
+    User.id, User.phone, User.full_name, User.profile_photo, User.is_driver, User.is_dispatcher,
+    User.is_admin, User.is_active, User.language, User.emergency_contact, User.vehicle_type,
+    User.vehicle_model, User.vehicle_color, User.vehicle_number, User.license_number, User.rating,
+    User.total_rides, User.current_balance, User.required_deposit, User.is_approved, User.approved_by,
+    User.approved_at, User.current_location, User.city, User.created_at,
+)
+USER_LIST_KEYS = tuple(column.key for column in USER_LIST_COLUMNS)
+USER_ROLES = {"admin": User.is_admin, "dispatcher": User.is_dispatcher, "driver": User.is_driver}
+
+
+def _user_row(row) -> dict:
+    """Column row -> response dict with the legacy null handling, no ORM object touched"""
+    user = dict(zip(USER_LIST_KEYS, row))
+    for flag in ("is_driver", "is_dispatcher", "is_admin", "is_approved"):
+        user[flag] = bool(user[flag])
+    user["is_active"] = user["is_active"] is not False
+    try:
+        user["current_location"] = json.loads(user["current_location"]) if user["current_location"] else None
+    except (TypeError, ValueError):
+        user["current_location"] = None
+    return user
+
+
+def _prefix_range(column, prefix: str):
+    """Index range for a prefix search plus LIKE for exactness under any collation"""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper, column.like(escaped + "%", escape="\\"))
+
+
+def _user_search(search: str):
+    """Phone prefix for digits (+998 added when missing), otherwise full_name prefix"""
+    term = search.strip()
+    digits = term.replace(" ", "").replace("-", "")
+    if digits.lstrip("+").isdigit():
+        phone = digits if digits.startswith("+") else ("+" + digits if digits.startswith("998") else "+998" + digits)
+        return _prefix_range(User.phone, phone)
+    return _prefix_range(func.lower(User.full_name), term.lower())
+
+
+@router.get("/users")
 async def get_all_users(
+    search: Optional[str] = None,
+    role: Optional[str] = None,
+    approved: Optional[bool] = None,
+    active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all users (admin only)"""
+    """
+    Foydalanuvchilar ro'yxati (Admin)
+
+    **Query Parameters:**
+    - search: Telefon raqami boshi (masalan `+99890`, `90123`) yoki ism boshi
+    - role: admin, dispatcher, driver
+    - approved, active: true/false
+    - cursor: Kursor rejimi - bo'sh qiymat birinchi sahifa, keyingilari uchun `next_cursor`
+    - limit: Kursor rejimida sahifa hajmi (default: 50, max: 200)
+    - include_total: Kursor rejimida taxminiy (keshlangan) umumiy sonni qaytarish
+
+    **Returns:**
+    - Kursor rejimida: `users` (eng yangidan), `next_cursor`, `has_more`
+    - Kursorsiz: barcha mos foydalanuvchilar ro'yxati (eski format)
+    """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    users = db.query(User).all()
-    # Convert None boolean values to False for each user
-    for user in users:
-        if user.is_admin is None:
-            user.is_admin = False
-        if user.is_dispatcher is None:
-            user.is_dispatcher = False
-        if user.is_driver is None:
-            user.is_driver = False
-        if user.is_active is None:
-            user.is_active = True
-        if user.is_approved is None:
-            user.is_approved = False
-        # Normalize current_location (string JSON -> dict) for response validation
-        try:
-            if isinstance(user.current_location, str) and user.current_location:
-                user.current_location = json.loads(user.current_location)
-        except Exception:
-            user.current_location = None
-        # Ensure created_at present (direct SQL inserts might leave it NULL)
-        if user.created_at is None:
-            user.created_at = datetime.utcnow()
+    query = db.query(*USER_LIST_COLUMNS)
+    if search and search.strip():
+        query = query.filter(_user_search(search))
+    if role is not None:
+        if role not in USER_ROLES:
+            raise HTTPException(status_code=400, detail=f"role must be one of: {', '.join(USER_ROLES)}")
+        query = query.filter(USER_ROLES[role] == True)
+    if approved is not None:
+        query = query.filter(User.is_approved == approved)
+    if active is not None:
+        query = query.filter(User.is_active == active)
+
+    if cursor is not None:
+        limit = max(1, min(limit, 200))
+        page = query
+        if cursor:
+            page = page.filter(User.id < decode_id_cursor(cursor))
+        rows = page.order_by(User.id.desc()).limit(limit + 1).all()
+        next_cursor = encode_id_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        response = {
+            "users": [_user_row(row) for row in rows[:limit]],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
+        if include_total:
+            key = f"admin_users:{search}:{role}:{approved}:{active}"
+            response["total"] = cached_count(key, query.with_entities(User.id))
+        return response
+
+    # Legacy list: same fields as UserResponse, still without per-row validation
+    users = []
+    for row in query.order_by(User.id).all():
+        user = _user_row(row)
+        user.update(
+            gender=None, date_of_birth=None, vehicle_make=None, license_plate=None,
+            tech_passport=None, position=None,
+        )
+        del user["vehicle_number"]
+        users.append(user)
     return users
 
 
-@router.get("/stats")
-async def get_system_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get system statistics (admin only)"""
-    if not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
-        )
-
+@analytics_jobs.register("system_stats")
+def _system_stats(db: Session) -> dict:
     total_users = db.query(User).count()
     total_drivers = db.query(User).filter(User.is_driver == True).count()
     total_rides = db.query(Ride).count()
@@ -95,69 +176,112 @@ async def get_system_stats(
     }
 
 
+@router.get("/stats")
+async def get_system_stats(
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get system statistics (admin only)
+
+    Served from the latest background snapshot (`as_of`); `?fresh=1` also
+    schedules a recompute.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    return analytics_jobs.serve("system_stats", db, fresh)
+
+
+def _daily_analytics(db: Session, day, city: Optional[str] = None, vehicle_type: Optional[str] = None) -> dict:
+    # One indexed read of the pre-aggregated rows for that day
+    t = rollups.totals(db, day, day, city=city, vehicle_type=vehicle_type)
+    completed = t["rides_completed"]
+
+    return {
+        "date": day.isoformat(),
+        "total_rides": t["rides_created"],
+        "completed_rides": completed,
+        "cancelled_rides": t["rides_cancelled"],
+        "total_revenue": t["revenue"],
+        "total_commission": t["commission"],
+        "total_distance_km": t["distance_km"],
+        "new_users": t["new_users"],
+        "driver_approvals": t["driver_approvals"],
+        "average_ride_distance": t["distance_km"] / completed if completed else 0,
+        "average_ride_fare": t["revenue"] / completed if completed else 0
+    }
+
+
+@analytics_jobs.register("daily_analytics")
+def _today_analytics(db: Session) -> dict:
+    return _daily_analytics(db, datetime.now().date())
+
+
 @router.get("/analytics/daily")
 async def get_daily_analytics(
     date: str = None,  # YYYY-MM-DD format
+    city: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get daily analytics (admin only)"""
+    """Get daily analytics (admin only)
+
+    **Query Parameters:**
+    - `date`: YYYY-MM-DD (default: bugun)
+    - `city`, `vehicle_type`: daily_stats bo'yicha filtr (ixtiyoriy)
+    - `fresh`: 1 bo'lsa bugungi snapshot fonda qayta hisoblanadi
+    """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    if not date:
-        today = datetime.now().date()
-        date = today.isoformat()
-
-    # Daily ride statistics
-    daily_rides = db.query(Ride).filter(
-        func.date(Ride.created_at) == date
-    ).all()
-
-    completed_rides = [r for r in daily_rides if r.status == "completed"]
-    total_revenue = sum(r.fare for r in completed_rides if r.fare)
+    today = datetime.now().date()
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else today
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-    def _ride_distance(ride: Ride) -> float:
-        try:
-            p = json.loads(ride.pickup_location) if isinstance(ride.pickup_location, str) else ride.pickup_location
-            d = json.loads(ride.dropoff_location) if isinstance(ride.dropoff_location, str) else ride.dropoff_location
-            if p and d and all(k in p for k in ("lat", "lng")) and all(k in d for k in ("lat", "lng")):
-                return calculate_distance(float(p["lat"]), float(p["lng"]), float(d["lat"]), float(d["lng"]))
-        except Exception:
-            pass
-        return 0.0
+    # Today's unfiltered view is the precomputed one; other views read the rollup directly
+    if day == today and city is None and vehicle_type is None:
+        return analytics_jobs.serve("daily_analytics", db, fresh, expect=("date", today.isoformat()))
+    return _daily_analytics(db, day, city, vehicle_type)
 
-    distances = [_ride_distance(r) for r in completed_rides]
 
-    # Daily user registrations
-    daily_users = db.query(User).filter(
-        func.date(User.created_at) == date
-    ).count()
+def _weekly_analytics(db: Session, city: Optional[str] = None, vehicle_type: Optional[str] = None) -> dict:
+    today = datetime.now().date()
+    week_ago = today - timedelta(days=7)
 
-    # Daily driver approvals
-    daily_approvals = db.query(User).filter(
-        func.date(User.approved_at) == date,
-        User.is_approved == True
-    ).count()
+    days = rollups.by_day(db, week_ago, today, city=city, vehicle_type=vehicle_type)
+    daily_breakdown = {
+        day.isoformat(): {"rides": c["rides_created"], "revenue": c["revenue"]}
+        for day, c in days.items() if c["rides_created"] or c["revenue"]
+    }
 
     return {
-        "date": date,
-        "total_rides": len(daily_rides),
-        "completed_rides": len(completed_rides),
-        "cancelled_rides": len([r for r in daily_rides if r.status == "cancelled"]),
-        "total_revenue": total_revenue,
-        "new_users": daily_users,
-        "driver_approvals": daily_approvals,
-        "average_ride_distance": (sum(distances) / len(distances)) if distances else 0,
-        "average_ride_fare": total_revenue / len(completed_rides) if completed_rides else 0
+        "date": today.isoformat(),
+        "total_rides": sum(c["rides_created"] for c in days.values()),
+        "completed_rides": sum(c["rides_completed"] for c in days.values()),
+        "total_revenue": sum(c["revenue"] for c in days.values()),
+        "daily_breakdown": daily_breakdown
     }
 
 
+analytics_jobs.register("weekly_analytics")(_weekly_analytics)
+
+
 @router.get("/analytics/weekly")
 async def get_weekly_analytics(
+    city: Optional[str] = None,
+    vehicle_type: Optional[str] = None,
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -168,33 +292,66 @@ async def get_weekly_analytics(
             detail="Admin access required"
         )
 
-    today = datetime.now().date()
-    week_ago = today - timedelta(days=7)
+    if city is None and vehicle_type is None:
+        today = datetime.now().date()
+        return analytics_jobs.serve("weekly_analytics", db, fresh, expect=("date", today.isoformat()))
+    return _weekly_analytics(db, city, vehicle_type)
 
-    weekly_rides = db.query(Ride).filter(
-        Ride.created_at >= week_ago
-    ).all()
 
-    completed_rides = [r for r in weekly_rides if r.status == "completed"]
-    total_revenue = sum(r.fare for r in completed_rides if r.fare)
+@router.get("/analytics/latency")
+async def get_latency_analytics(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    city: Optional[str] = None,
+    metric: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Buyurtma bosqichlari kechikishi: p50/p90/p99 (soniya), shahar va soat bo'yicha (Admin)
 
-    # Group by day
-    daily_breakdown = {}
-    for ride in weekly_rides:
-        day = ride.created_at.date().isoformat()
-        if day not in daily_breakdown:
-            daily_breakdown[day] = {"rides": 0, "revenue": 0}
+    **Query Parameters:**
+    - date_from, date_to: YYYY-MM-DD, ikkalasi ham kiradi (default: oxirgi 7 kun)
+    - city: Shahar bo'yicha filtr (ixtiyoriy)
+    - metric: accept (qabul qilish), pickup (yetib kelish), trip (safar) (default: hammasi)
 
-        daily_breakdown[day]["rides"] += 1
-        if ride.status == "completed":
-            daily_breakdown[day]["revenue"] += ride.fare or 0
+    **Returns:** har bir metric uchun shahar bo'yicha jami va (shahar, soat) qatorlari.
+    Soat - buyurtma yaratilgan soat (UTC).
+    """
+    _require_admin(current_user)
+    if metric is not None and metric not in LATENCY_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(LATENCY_METRICS)}")
+    today = datetime.utcnow().date()
+    try:
+        end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else today
+        start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else end - timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+
+    histograms = rollups.latency_histograms(db, start, end, city=city, metric=metric)
+    result = {}
+    for name in ([metric] if metric else LATENCY_METRICS):
+        by_city = {}
+        by_hour = []
+        for (m, ride_city, hour), counts in sorted(histograms.items()):
+            if m != name:
+                continue
+            merged = by_city.setdefault(ride_city, {})
+            for bucket, count in counts.items():
+                merged[bucket] = merged.get(bucket, 0) + count
+            by_hour.append({"city": ride_city, "hour": hour, "count": sum(counts.values()),
+                            **latency_percentiles(counts)})
+        result[name] = {
+            "by_city": [
+                {"city": ride_city, "count": sum(counts.values()), **latency_percentiles(counts)}
+                for ride_city, counts in by_city.items()
+            ],
+            "by_city_hour": by_hour,
+        }
 
-    return {
-        "total_rides": len(weekly_rides),
-        "completed_rides": len(completed_rides),
-        "total_revenue": total_revenue,
-        "daily_breakdown": daily_breakdown
-    }
+    return {"date_from": start.isoformat(), "date_to": end.isoformat(), "unit": "seconds", "metrics": result}
 
 
 @router.put("/users/{user_id}/deactivate")
@@ -240,9 +397,13 @@ async def approve_user(
             detail="User not found"
         )
 
+    if user.is_approved:
+        # Re-approval moves the approval to today
+        rollups.approval_changed(db, user, -1)
     user.is_approved = True
     user.approved_at = datetime.utcnow()
     user.approved_by = current_user.id
+    rollups.approval_changed(db, user, 1)
     db.commit()
 
     return {"message": "User approved", "user_id": user.id}
@@ -266,6 +427,8 @@ async def unapprove_user(
             detail="User not found"
         )
 
+    if user.is_approved:
+        rollups.approval_changed(db, user, -1)
     user.is_approved = False
     db.commit()
 
@@ -379,122 +542,41 @@ async def activate_user(
     db.commit()
 
 
-@router.get("/income/stats")
-async def get_income_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get comprehensive income statistics (admin only)"""
-    if not current_user.is_admin:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
-        )
-
-    # Get today's date
+@analytics_jobs.register("income_stats")
+def _income_stats(db: Session) -> dict:
     today = datetime.utcnow().date()
-    current_month = today.replace(day=1)
-    current_year = today.replace(month=1, day=1)
-
-    # Calculate total revenue
-    total_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        Payment.status == "completed"
-    ).scalar()
-    total_revenue = float(total_revenue_result) if total_revenue_result else 0.0
-
-    # Calculate today's revenue
-    today_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            func.date(Payment.created_at) == today
-        )
-    ).scalar()
-    today_revenue = float(today_revenue_result) if today_revenue_result else 0.0
-
-    # Calculate current month's revenue
-    month_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == current_month.year,
-            extract('month', Payment.created_at) == current_month.month
-        )
-    ).scalar()
-    month_revenue = float(month_revenue_result) if month_revenue_result else 0.0
-
-    # Calculate current year's revenue
-    year_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == current_year.year
-        )
-    ).scalar()
-    year_revenue = float(year_revenue_result) if year_revenue_result else 0.0
-
-    # Calculate average daily revenue (last 30 days)
     thirty_days_ago = today - timedelta(days=30)
-    daily_sums = db.query(
-        func.sum(Payment.amount).label('daily_sum')
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            Payment.created_at >= thirty_days_ago
-        )
-    ).group_by(func.date(Payment.created_at)).all()
-    
-    # Calculate average in Python
-    if daily_sums:
-        total_daily = sum(float(daily[0]) for daily in daily_sums if daily[0] is not None)
-        average_daily_revenue = total_daily / len(daily_sums)
-    else:
-        average_daily_revenue = 0.0
-
-    # Calculate average monthly revenue (last 12 months)
-    twelve_months_ago = today.replace(year=today.year - 1)
-    avg_monthly_query = db.query(
-        func.avg(month_revenue_result)
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            Payment.created_at >= twelve_months_ago
-        )
-    ).scalar()
-    average_monthly_revenue = float(avg_monthly_query) if avg_monthly_query else 0.0
-
-    # Get top earning days (last 30 days)
-    top_days_query = db.query(
-        func.date(Payment.created_at).label('date'),
-        func.sum(Payment.amount).label('revenue')
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            Payment.created_at >= thirty_days_ago
-        )
-    ).group_by(func.date(Payment.created_at)).order_by(
-        func.sum(Payment.amount).desc()
-    ).limit(10).all()
-
-    top_earning_days = [
-        {"date": str(day[0]), "revenue": float(day[1] or 0)}
-        for day in top_days_query
-    ]
-
-    # Get revenue trend (last 30 days)
-    trend_query = db.query(
-        func.date(Payment.created_at).label('date'),
-        func.sum(Payment.amount).label('revenue')
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            Payment.created_at >= thirty_days_ago
-        )
-    ).group_by(func.date(Payment.created_at)).order_by(func.date(Payment.created_at)).all()
-
-    revenue_trend = [
-        {"date": str(day[0]), "revenue": float(day[1] or 0)}
-        for day in trend_query
-    ]
-
-    return IncomeStats(
+    first_month = today.year * 12 + today.month - 12  # current month plus the 11 before it
+    twelve_months_ago = today.replace(year=first_month // 12, month=first_month % 12 + 1, day=1)
+
+    # One grouped read of the daily rollup; every figure below is derived from it
+    revenue_by_day = rollups.daily_revenue(db)
+
+    total_revenue = today_revenue = month_revenue = year_revenue = 0.0
+    recent_days = []
+    monthly_totals = {}
+    for day, revenue in revenue_by_day.items():
+        total_revenue += revenue
+        if day.year == today.year:
+            year_revenue += revenue
+            if day.month == today.month:
+                month_revenue += revenue
+                if day == today:
+                    today_revenue += revenue
+        if day >= thirty_days_ago and revenue:
+            recent_days.append({"date": str(day), "revenue": revenue})
+        if twelve_months_ago <= day and revenue:
+            key = (day.year, day.month)
+            monthly_totals[key] = monthly_totals.get(key, 0.0) + revenue
+
+    # Averages over the days/months that had revenue (last 30 days / 12 months)
+    average_daily_revenue = sum(d["revenue"] for d in recent_days) / len(recent_days) if recent_days else 0.0
+    average_monthly_revenue = sum(monthly_totals.values()) / len(monthly_totals) if monthly_totals else 0.0
+
+    revenue_trend = sorted(recent_days, key=lambda d: d["date"])
+    top_earning_days = sorted(recent_days, key=lambda d: d["revenue"], reverse=True)[:10]
+
+    stats = IncomeStats(
         total_revenue=total_revenue,
         today_revenue=today_revenue,
         month_revenue=month_revenue,
@@ -503,82 +585,49 @@ async def get_income_stats(
         average_monthly_revenue=average_monthly_revenue,
         top_earning_days=top_earning_days,
         revenue_trend=revenue_trend
-    )
+    ).model_dump()
+    # Day the figures were computed for, so a snapshot from yesterday is not served
+    stats["date"] = today.isoformat()
+    return stats
 
-@router.get("/income/monthly/{year}/{month}")
-async def get_monthly_income(
-    year: int,
-    month: int,
+
+@router.get("/income/stats")
+async def get_income_stats(
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get monthly income breakdown (admin only)"""
+    """Get comprehensive income statistics (admin only)
+
+    Figures come from the daily_stats rollup (revenue by completion day) and
+    are served from the latest background snapshot (`as_of`); `?fresh=1`
+    also schedules a recompute.
+    """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    # Validate month
-    if not (1 <= month <= 12):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid month. Must be between 1 and 12"
-        )
+    today = datetime.utcnow().date()
+    return analytics_jobs.serve("income_stats", db, fresh, expect=("date", today.isoformat()))
 
-    # Calculate revenue for the month
-    month_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == year,
-            extract('month', Payment.created_at) == month
-        )
-    ).scalar()
-    total_revenue = float(month_revenue_result) if month_revenue_result else 0.0
-
-    # Get daily breakdown
-    daily_query = db.query(
-        func.date(Payment.created_at).label('date'),
-        func.sum(Payment.amount).label('revenue'),
-        func.count(Payment.id).label('rides')
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == year,
-            extract('month', Payment.created_at) == month
-        )
-    ).group_by(func.date(Payment.created_at)).order_by(func.date(Payment.created_at)).all()
+def _monthly_income(db: Session, year: int, month: int) -> dict:
+    # Daily rollup rows for the month (O(days), no payment scan)
+    first_day = datetime(year, month, 1).date()
+    last_day = first_day.replace(day=calendar.monthrange(year, month)[1])
+    days = rollups.by_day(db, first_day, last_day)
 
-    # Convert to dictionary with dates as keys
     daily_breakdown = {
-        str(day[0]): {
-            "revenue": float(day[1] or 0),
-            "rides": day[2] or 0
-        }
-        for day in daily_query
+        str(day): {"revenue": float(c["revenue"] or 0), "rides": c["rides_completed"] or 0}
+        for day, c in days.items() if c["rides_completed"] or c["revenue"]
     }
-
-    # Calculate additional metrics
-    total_rides = sum(day[2] or 0 for day in daily_query)
-    completed_rides = total_rides  # Since we're only looking at completed payments
-    average_daily_revenue = total_revenue / len(daily_query) if daily_query else 0.0
-
-    # Get new users and driver approvals for the month
-    new_users = db.query(User).filter(
-        and_(
-            extract('year', User.created_at) == year,
-            extract('month', User.created_at) == month
-        )
-    ).count()
-
-    driver_approvals = db.query(User).filter(
-        and_(
-            User.is_driver == True,
-            User.is_approved == True,
-            extract('year', User.approved_at) == year,
-            extract('month', User.approved_at) == month
-        )
-    ).count()
+    total_revenue = sum(v["revenue"] for v in daily_breakdown.values())
+    total_rides = sum(v["rides"] for v in daily_breakdown.values())
+    completed_rides = total_rides  # Revenue rows come from completed rides
+    average_daily_revenue = total_revenue / len(daily_breakdown) if daily_breakdown else 0.0
+    new_users = sum(c["new_users"] or 0 for c in days.values())
+    driver_approvals = sum(c["driver_approvals"] or 0 for c in days.values())
 
     return MonthlyAnalytics(
         month=f"{year}-{month:02d}",
@@ -589,66 +638,68 @@ async def get_monthly_income(
         new_users=new_users,
         driver_approvals=driver_approvals,
         daily_breakdown=daily_breakdown
-    )
+    ).model_dump()
 
-@router.get("/income/yearly/{year}")
-async def get_yearly_income(
+
+@analytics_jobs.register("monthly_income")
+def _current_month_income(db: Session) -> dict:
+    today = datetime.utcnow().date()
+    return _monthly_income(db, today.year, today.month)
+
+
+@router.get("/income/monthly/{year}/{month}")
+async def get_monthly_income(
     year: int,
+    month: int,
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get yearly income breakdown (admin only)"""
+    """Get monthly income breakdown (admin only)
+
+    The current month is served from the background snapshot (`as_of`).
+    """
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
-    # Calculate total revenue for the year
-    year_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == year
-        )
-    ).scalar()
-    total_revenue = float(year_revenue_result) if year_revenue_result else 0.0
-
-    # Get monthly breakdown
-    monthly_query = db.query(
-        extract('month', Payment.created_at).label('month'),
-        func.sum(Payment.amount).label('revenue'),
-        func.count(Payment.id).label('rides')
-    ).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == year
+    # Validate month
+    if not (1 <= month <= 12):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid month. Must be between 1 and 12"
         )
-    ).group_by(extract('month', Payment.created_at)).order_by(
-        extract('month', Payment.created_at)
-    ).all()
+
+    today = datetime.utcnow().date()
+    if (year, month) == (today.year, today.month):
+        return analytics_jobs.serve("monthly_income", db, fresh, expect=("month", f"{year}-{month:02d}"))
+    return _monthly_income(db, year, month)
+
+def _yearly_income(db: Session, year: int) -> dict:
+    days = rollups.by_day(db, datetime(year - 1, 1, 1).date(), datetime(year, 12, 31).date())
 
     monthly_breakdown = {}
+    total_revenue = prev_year_revenue = 0.0
     total_rides = 0
-    for month_data in monthly_query:
-        month_name = calendar.month_name[month_data.month]
-        monthly_breakdown[month_name] = {
-            "revenue": float(month_data.revenue),
-            "rides": month_data.rides
-        }
-        total_rides += month_data.rides
+    for day, c in days.items():
+        revenue = float(c["revenue"] or 0)
+        if day.year != year:
+            prev_year_revenue += revenue
+            continue
+        if not (c["rides_completed"] or revenue):
+            continue
+        entry = monthly_breakdown.setdefault(calendar.month_name[day.month], {"revenue": 0.0, "rides": 0})
+        entry["revenue"] += revenue
+        entry["rides"] += c["rides_completed"] or 0
+        total_revenue += revenue
+        total_rides += c["rides_completed"] or 0
 
     completed_rides = total_rides
     average_monthly_revenue = total_revenue / 12 if total_revenue > 0 else 0.0
 
-    # Calculate growth rate (compared to previous year)
-    prev_year_revenue_result = db.query(func.sum(Payment.amount)).filter(
-        and_(
-            Payment.status == "completed",
-            extract('year', Payment.created_at) == year - 1
-        )
-    ).scalar()
-    prev_year_revenue = float(prev_year_revenue_result) if prev_year_revenue_result else 0.0
-
+    # Growth rate compared to the previous year
     if prev_year_revenue > 0:
         growth_rate = ((total_revenue - prev_year_revenue) / prev_year_revenue) * 100
     else:
@@ -662,7 +713,61 @@ async def get_yearly_income(
         average_monthly_revenue=average_monthly_revenue,
         monthly_breakdown=monthly_breakdown,
         growth_rate=growth_rate
-    )
+    ).model_dump()
+
+
+@analytics_jobs.register("yearly_income")
+def _current_year_income(db: Session) -> dict:
+    return _yearly_income(db, datetime.utcnow().year)
+
+
+@router.get("/income/yearly/{year}")
+async def get_yearly_income(
+    year: int,
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get yearly income breakdown (admin only)
+
+    The current year is served from the background snapshot (`as_of`).
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    if year == datetime.utcnow().year:
+        return analytics_jobs.serve("yearly_income", db, fresh, expect=("year", str(year)))
+    return _yearly_income(db, year)
+
+
+@router.get("/leaderboard")
+async def get_driver_leaderboard(
+    period: str = "daily",
+    metric: str = "rides",
+    limit: int = 20,
+    driver_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Haydovchilar reytingi (Admin)
+
+    **Query Parameters:**
+    - period: daily, weekly, monthly (default: daily)
+    - metric: rides, revenue, km, rating (default: rides)
+    - limit: Top nechta (default: 20, max: 100)
+    - driver_id: Berilgan haydovchining o'rni (ixtiyoriy)
+    """
+    _require_admin(current_user)
+    limit = leaderboard.validate(period, metric, limit)
+
+    board = leaderboard.with_names(db, leaderboard.top(period, metric, limit))
+    if driver_id is not None:
+        board["driver"] = leaderboard.rank(period, metric, driver_id)
+    return board
 
 
 # --- Config management ---
@@ -673,9 +778,7 @@ async def get_commission_rate(
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
-    cfg = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    value = float(cfg.value) if cfg else 0.10
-    return {"commission_rate": value}
+    return {"commission_rate": config_cache.get(db).commission_rate}
 
 
 @router.put("/config/commission-rate")
@@ -688,13 +791,7 @@ async def set_commission_rate(
         raise HTTPException(status_code=403, detail="Admin access required")
     if rate < 0 or rate > 1:
         raise HTTPException(status_code=400, detail="Rate must be between 0 and 1 (e.g., 0.10 for 10%)")
-    cfg = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    if not cfg:
-        cfg = SystemConfig(key="commission_rate", value=str(rate))
-        db.add(cfg)
-    else:
-        cfg.value = str(rate)
-    db.commit()
+    config_cache.set_value(db, "commission_rate", str(rate))
     return {"message": "Commission rate updated", "commission_rate": rate}
 
 
@@ -736,6 +833,7 @@ async def notify_driver(
 # --- Pricing Management ---
 @router.get("/pricing", response_model=PricingConfigResponse)
 async def get_pricing_config(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -746,20 +844,19 @@ async def get_pricing_config(
     - Economy (Oddiy)
     - Comfort (Qulay)
     - Business (Biznes)
+    
+    ETag: If-None-Match mos kelsa 304 qaytadi
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin huquqi kerak")
     
-    # Get commission rate from database
-    commission_cfg = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    commission_rate = float(commission_cfg.value) if commission_cfg else settings.commission_rate
-    
-    return {
-        "economy": settings.vehicle_types["economy"],
-        "comfort": settings.vehicle_types["comfort"],
-        "business": settings.vehicle_types["business"],
-        "commission_rate": commission_rate
-    }
+    config = config_cache.get(db)
+    return response_cache.respond(request, "admin:pricing", config.version, lambda: {
+        "economy": config.pricing_for("economy"),
+        "comfort": config.pricing_for("comfort"),
+        "business": config.pricing_for("business"),
+        "commission_rate": config.commission_rate
+    })
 
 
 @router.put("/pricing/{vehicle_type}")
@@ -802,19 +899,8 @@ async def update_vehicle_pricing(
     }
     
     import json
-    cfg = db.query(SystemConfig).filter(SystemConfig.key == config_key).first()
-    if not cfg:
-        cfg = SystemConfig(key=config_key, value=json.dumps(config_value))
-        db.add(cfg)
-    else:
-        cfg.value = json.dumps(config_value)
-    
-    db.commit()
-    
-    # Update in-memory settings (for current session)
-    settings.vehicle_types[vehicle_type]["base_fare"] = pricing.base_fare
-    settings.vehicle_types[vehicle_type]["per_km_rate"] = pricing.per_km_rate
-    settings.vehicle_types[vehicle_type]["per_minute_rate"] = pricing.per_minute_rate
+    # Bumps the config version so every worker picks up the new tariff
+    config_cache.set_value(db, config_key, json.dumps(config_value))
     
     return {
         "message": f"{vehicle_type.capitalize()} narxlari yangilandi",
@@ -828,6 +914,8 @@ async def calculate_fare_preview(
     distance: float,
     duration: int,
     vehicle_type: str = "economy",
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -838,6 +926,7 @@ async def calculate_fare_preview(
     - distance: Masofa (km)
     - duration: Vaqt (daqiqa)
     - vehicle_type: economy, comfort, yoki business
+    - lat, lng: Olib ketish nuqtasi (ixtiyoriy, surge uchun)
     
     Misol:
     - distance=10, duration=20, vehicle_type=economy
@@ -852,45 +941,8 @@ async def calculate_fare_preview(
             detail="Noto'g'ri mashina turi. Faqat: economy, comfort, business"
         )
     
-    # Get pricing from database or settings
-    config_key = f"pricing_{vehicle_type}"
-    cfg = db.query(SystemConfig).filter(SystemConfig.key == config_key).first()
-    
-    if cfg:
-        import json
-        pricing = json.loads(cfg.value)
-    else:
-        pricing = settings.vehicle_types[vehicle_type]
-    
-    base_fare = pricing["base_fare"]
-    per_km_rate = pricing["per_km_rate"]
-    per_minute_rate = pricing["per_minute_rate"]
-    
-    distance_cost = distance * per_km_rate
-    time_cost = duration * per_minute_rate
-    total_fare = base_fare + distance_cost + time_cost
-    
-    # Get commission
-    commission_cfg = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    commission_rate = float(commission_cfg.value) if commission_cfg else settings.commission_rate
-    commission_amount = total_fare * commission_rate
-    driver_earnings = total_fare - commission_amount
-    
-    return {
-        "vehicle_type": vehicle_type,
-        "distance_km": distance,
-        "duration_minutes": duration,
-        "breakdown": {
-            "base_fare": base_fare,
-            "distance_cost": distance_cost,
-            "time_cost": time_cost
-        },
-        "total_fare": round(total_fare, 2),
-        "commission_rate": commission_rate,
-        "commission_amount": round(commission_amount, 2),
-        "driver_earnings": round(driver_earnings, 2),
-        "formula": f"{base_fare} + ({distance} × {per_km_rate}) + ({duration} × {per_minute_rate}) = {round(total_fare, 2)} so'm"
-    }
+    quote = pricing_engine.quote(db, distance, duration, vehicle_type, lat=lat, lng=lng)
+    return quote.as_dict()
 
 # ============= QOSHIMCHA XIZMATLAR (ADDITIONAL SERVICES) =============
 
@@ -959,7 +1011,8 @@ async def create_service(
     # Create new service
     new_service = AdditionalService(**service.dict())
     db.add(new_service)
-    db.commit()
+    # Commits and bumps the config version so quotes see the new service prices
+    config_cache.bump_version(db)
     db.refresh(new_service)
     
     return new_service
@@ -1007,7 +1060,7 @@ async def update_service(
     for field, value in update_data.items():
         setattr(service, field, value)
     
-    db.commit()
+    config_cache.bump_version(db)
     db.refresh(service)
     
     return service
@@ -1041,7 +1094,7 @@ async def delete_service(
         raise HTTPException(status_code=404, detail="Service not found")
     
     db.delete(service)
-    db.commit()
+    config_cache.bump_version(db)
     
     return {"message": "Service deleted successfully", "service_id": service_id}
 
@@ -1078,7 +1131,275 @@ async def toggle_service(
         raise HTTPException(status_code=404, detail="Service not found")
     
     service.is_active = toggle.is_active
-    db.commit()
+    config_cache.bump_version(db)
     db.refresh(service)
     
     return service
+
+# ============= SURGE PRICING =============
+
+def _require_admin(user: User) -> None:
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+
+def _naive_utc(value):
+    """Surge windows are compared with datetime.utcnow(), so store naive UTC"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _check_window(start_time, end_time) -> None:
+    if start_time and end_time and end_time <= start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+
+
+@router.get("/surge/areas", response_model=List[SurgeAreaResponse])
+async def get_surge_areas(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Surge hududlari ro'yxati (Admin)"""
+    _require_admin(current_user)
+    return db.query(SurgeArea).order_by(SurgeArea.id).all()
+
+
+@router.post("/surge/areas", response_model=SurgeAreaResponse, status_code=status.HTTP_201_CREATED)
+async def create_surge_area(
+    area: SurgeAreaCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Yangi surge hududi yaratish (Admin)
+    
+    **Request Body:**
+    - name: Hudud nomi (SurgePricing.area_name shu nomga bog'lanadi)
+    - center_lat, center_lng: Markaz koordinatalari
+    - radius_km: Radius (km)
+    """
+    _require_admin(current_user)
+    new_area = SurgeArea(**area.dict())
+    db.add(new_area)
+    # Commits and bumps the config version so the surge index is rebuilt
+    config_cache.bump_version(db)
+    db.refresh(new_area)
+    return new_area
+
+
+@router.delete("/surge/areas/{area_id}")
+async def delete_surge_area(
+    area_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Surge hududini o'chirish (Admin)"""
+    _require_admin(current_user)
+    area = db.query(SurgeArea).filter(SurgeArea.id == area_id).first()
+    if not area:
+        raise HTTPException(status_code=404, detail="Surge area not found")
+    db.delete(area)
+    config_cache.bump_version(db)
+    return {"message": "Surge area deleted", "area_id": area_id}
+
+
+@router.get("/surge/pricing", response_model=List[SurgePricingResponse])
+async def get_surge_pricing(
+    active_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Surge koeffitsientlari ro'yxati (Admin)
+    
+    **Query Parameters:**
+    - active_only: Faqat faol koeffitsientlar
+    """
+    _require_admin(current_user)
+    query = db.query(SurgePricing)
+    if active_only:
+        query = query.filter(SurgePricing.is_active == True)
+    return query.order_by(SurgePricing.id).all()
+
+
+@router.post("/surge/pricing", response_model=SurgePricingResponse, status_code=status.HTTP_201_CREATED)
+async def create_surge_pricing(
+    surge: SurgePricingCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Surge koeffitsienti qo'shish (Admin)
+    
+    **Request Body:**
+    - area_name: SurgeArea nomi (bo'sh bo'lsa - butun shahar)
+    - multiplier: Koeffitsient (1.0 - 5.0)
+    - start_time, end_time: Amal qilish oralig'i (UTC, optional)
+    """
+    _require_admin(current_user)
+    if surge.area_name and not db.query(SurgeArea.id).filter(SurgeArea.name == surge.area_name).first():
+        raise HTTPException(status_code=404, detail="Surge area not found")
+    data = surge.dict()
+    data["start_time"] = _naive_utc(data["start_time"])
+    data["end_time"] = _naive_utc(data["end_time"])
+    _check_window(data["start_time"], data["end_time"])
+    new_surge = SurgePricing(**data, created_by=current_user.id)
+    db.add(new_surge)
+    config_cache.bump_version(db)
+    db.refresh(new_surge)
+    return new_surge
+
+
+@router.put("/surge/pricing/{surge_id}", response_model=SurgePricingResponse)
+async def update_surge_pricing(
+    surge_id: int,
+    surge_update: SurgePricingUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Surge koeffitsientini yangilash yoki o'chirib qo'yish (Admin)"""
+    _require_admin(current_user)
+    surge = db.query(SurgePricing).filter(SurgePricing.id == surge_id).first()
+    if not surge:
+        raise HTTPException(status_code=404, detail="Surge pricing not found")
+    for field, value in surge_update.dict(exclude_unset=True).items():
+        setattr(surge, field, _naive_utc(value) if field in ("start_time", "end_time") else value)
+    _check_window(surge.start_time, surge.end_time)
+    config_cache.bump_version(db)
+    db.refresh(surge)
+    return surge
+
+
+@router.delete("/surge/pricing/{surge_id}")
+async def delete_surge_pricing(
+    surge_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Surge koeffitsientini o'chirish (Admin)"""
+    _require_admin(current_user)
+    surge = db.query(SurgePricing).filter(SurgePricing.id == surge_id).first()
+    if not surge:
+        raise HTTPException(status_code=404, detail="Surge pricing not found")
+    db.delete(surge)
+    config_cache.bump_version(db)
+    return {"message": "Surge pricing deleted", "surge_id": surge_id}
+
+
+# ============= PROMO CODES =============
+
+@router.get("/promo-codes", response_model=List[PromoCodeResponse])
+async def get_promo_codes(
+    active_only: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Promo kodlar ro'yxati (Admin)"""
+    _require_admin(current_user)
+    query = db.query(PromoCode)
+    if active_only:
+        query = query.filter(PromoCode.is_active == True)
+    return query.order_by(PromoCode.id.desc()).all()
+
+
+@router.post("/promo-codes", response_model=PromoCodeResponse, status_code=status.HTTP_201_CREATED)
+async def create_promo_code(
+    promo: PromoCodeCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Yangi promo kod yaratish (Admin)
+    
+    **Request Body:**
+    - code: Kod (katta harflarda saqlanadi)
+    - discount_type: percentage yoki fixed
+    - discount_value: 10 (10%) yoki 5000 (so'm)
+    - max_uses: Necha marta ishlatish mumkin
+    - valid_from, valid_until: Amal qilish muddati (UTC, optional)
+    """
+    _require_admin(current_user)
+    if promo.discount_type == "percentage" and promo.discount_value > 100:
+        raise HTTPException(status_code=400, detail="Percentage discount cannot exceed 100")
+    data = promo.dict()
+    data["code"] = normalize_code(data["code"])
+    data["valid_from"] = _naive_utc(data["valid_from"])
+    data["valid_until"] = _naive_utc(data["valid_until"])
+    _check_window(data["valid_from"], data["valid_until"])
+    if db.query(PromoCode.id).filter(PromoCode.code == data["code"]).first():
+        raise HTTPException(status_code=400, detail="Promo code already exists")
+    new_promo = PromoCode(**data, used_count=0, is_active=True, created_by=current_user.id)
+    db.add(new_promo)
+    db.commit()
+    db.refresh(new_promo)
+    promo_service.invalidate()
+    return new_promo
+
+
+@router.put("/promo-codes/{promo_id}/deactivate", response_model=PromoCodeResponse)
+async def deactivate_promo_code(
+    promo_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Promo kodni o'chirib qo'yish (Admin)"""
+    _require_admin(current_user)
+    promo = db.query(PromoCode).filter(PromoCode.id == promo_id).first()
+    if not promo:
+        raise HTTPException(status_code=404, detail="Promo code not found")
+    promo.is_active = False
+    db.commit()
+    db.refresh(promo)
+    promo_service.invalidate()
+    return promo
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = "csv",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    city: Optional[str] = None,
+    driver_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Safarlar, to'lovlar yoki tranzaksiyalarni yuklab olish (Admin)
+
+    **Path:**
+    - dataset: rides, payments, transactions
+
+    **Query Parameters:**
+    - format: csv (default) yoki xlsx
+    - date_from, date_to: YYYY-MM-DD (ikkalasi ham kiritiladi)
+    - city: Shahar bo'yicha filtr
+    - driver_id: Haydovchi bo'yicha filtr (transactions uchun user_id)
+
+    **Returns:**
+    - Fayl oqim (stream) ko'rinishida; qatorlar xotiraga to'liq yuklanmaydi
+    """
+    _require_admin(current_user)
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset. Use one of: {', '.join(DATASETS)}")
+    if format not in ("csv", "xlsx"):
+        raise HTTPException(status_code=400, detail="format must be csv or xlsx")
+
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d") if date_from else None
+        end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1) if date_to else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+
+    filters = ExportFilters(date_from=start, date_to=end, city=city, driver_id=driver_id)
+    filename = "_".join(part for part in (dataset, date_from, date_to) if part) + f".{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "xlsx":
+        return StreamingResponse(export_service.xlsx(dataset, filters), media_type=XLSX_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(export_service.csv(dataset, filters), media_type="text/csv; charset=utf-8", headers=headers)
@@ -27,6 +27,7 @@ from utils.helpers import (
 )
 from config import settings
 from services.sms_service import sms_service
+from services.rollups import rollups
 
 router = APIRouter(
     prefix="/auth",
@@ -141,10 +142,12 @@ async def register(user_data: UserRegister, response: Response, db: Session = De
         current_balance=0.0,
         required_deposit=0.0,
         rating=5.0,
-        total_rides=0
+        total_rides=0,
+        created_at=datetime.utcnow()
     )
     
     db.add(user)
+    rollups.user_registered(db, user)
     db.commit()
     db.refresh(user)
     
@@ -542,9 +545,11 @@ async def complete_profile(request: CompleteProfileRequest, db: Session = Depend
             current_balance=0.0,
             required_deposit=0.0,
             rating=5.0,
-            total_rides=0
+            total_rides=0,
+            created_at=datetime.utcnow()
         )
         db.add(user)
+        rollups.user_registered(db, user)
         db.commit()
         db.refresh(user)
     
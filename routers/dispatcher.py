@@ -1,23 +1,32 @@
 """
 Dispatcher router - Implements dispatcher-first order flow
 """
+from datetime import datetime
 from typing import List, Optional, Tuple
 import json
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, load_only
 
 from database import get_db
 from models import User, Ride, Customer, Transaction, Notification, DriverStatus
 from schemas import (
     DispatchOrderCreate, DispatchOrderResponse, RideResponse,
-    DepositRequest, BroadcastRequest
+    DepositRequest, BroadcastRequest, PromoCodeCheck
 )
 from routers.auth import get_current_user
 from utils.helpers import (
-    calculate_distance, estimate_duration, calculate_fare
+    calculate_distance, estimate_duration, encode_id_cursor, decode_id_cursor
 )
+from services.demand_surge import demand_surge
+from services.demand_forecast import demand_forecast
+from services.live_map import live_map
+from services.pricing_engine import pricing_engine
+from services.promo import promo_service
+from services.quote_cache import quote_cache, CachedQuote
+from services.rollups import rollups
 from services.map_service import MapService  # OSRM xizmatini qo'shish
 from config import settings
 
@@ -49,6 +58,19 @@ def _get_or_create_customer(db: Session, phone: str, name: Optional[str]) -> Cus
     return cust
 
 
+def _parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """"min_lng,min_lat,max_lng,max_lat" -> tuple; 400 on malformed input"""
+    if not bbox:
+        return None
+    try:
+        box = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        box = ()
+    if len(box) != 4 or box[0] > box[2] or box[1] > box[3]:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+    return box
+
+
 def _broadcast_to_nearby_drivers(
     db: Session,
     pickup_lat: float,
@@ -110,57 +132,105 @@ async def create_order(
     # Ensure customer exists
     customer = _get_or_create_customer(db, order.customer_phone, order.customer_name)
 
-    # Calculate estimate using OSRM for accurate routing
-    route_geometry = None
-    try:
-        route_data = await MapService.get_route(
-            order.pickup_location.lng, order.pickup_location.lat,
-            order.dropoff_location.lng, order.dropoff_location.lat
-        )
-        distance = route_data.get('distance', 0) / 1000  # Convert meters to km
-        # Convert seconds to minutes and cast to int minutes for schema
-        duration_min = int(round((route_data.get('duration', 0) or 0) / 60))
-        route_geometry = route_data.get('geometry')
-    except Exception as e:
-        # Fallback to simple calculation if OSRM fails
-        logger.warning(f"OSRM failed, using fallback calculation: {str(e)}")
-        distance = calculate_distance(
-            order.pickup_location.lat, order.pickup_location.lng,
-            order.dropoff_location.lat, order.dropoff_location.lng
-        )
-        duration_min = estimate_duration(distance)
-    
-    fare = calculate_fare(distance, duration_min, order.vehicle_type.value)
+    pickup, dropoff = order.pickup_location, order.dropoff_location
+    vehicle_type = order.vehicle_type.value
+    pricing = pricing_engine.snapshot(db)
+    surge_multiplier = pricing.surge_multiplier(pickup.lat, pickup.lng)
+    cache_key = quote_cache.key(
+        pickup.lat, pickup.lng, dropoff.lat, dropoff.lng,
+        vehicle_type, pricing.version, surge_multiplier
+    )
+    cached = quote_cache.get(cache_key, pricing.version)
+    if cached:
+        distance = cached.distance_km
+        duration_min = cached.duration_min
+        route_geometry = cached.route_geometry
+        fare = cached.fare
+    else:
+        # Calculate estimate using OSRM for accurate routing
+        route_geometry = None
+        try:
+            route_data = await MapService.get_route(
+                pickup.lng, pickup.lat,
+                dropoff.lng, dropoff.lat
+            )
+        except Exception as e:
+            route_data = {"error": str(e)}
+        # MapService reports failures as {"error": ...} instead of raising
+        if "error" not in route_data and route_data.get('distance'):
+            distance = route_data['distance'] / 1000  # Convert meters to km
+            # Convert seconds to minutes and cast to int minutes for schema
+            duration_min = int(round((route_data.get('duration', 0) or 0) / 60))
+            route_geometry = route_data.get('geometry')
+            cacheable = True
+        else:
+            # Fallback to simple calculation if OSRM fails
+            logger.warning(f"OSRM failed, using fallback calculation: {route_data.get('error')}")
+            distance = calculate_distance(
+                pickup.lat, pickup.lng,
+                dropoff.lat, dropoff.lng
+            )
+            duration_min = estimate_duration(distance)
+            # Don't pin the straight-line estimate for the whole TTL
+            cacheable = False
+
+        fare = pricing.quote(
+            distance, duration_min, vehicle_type, surge_multiplier=surge_multiplier
+        ).total_fare
+        if cacheable:
+            quote_cache.put(cache_key, pricing.version, CachedQuote(distance, duration_min, fare, route_geometry))
+
+    # Reserve the promo code before the ride exists so a sold-out code rejects the order
+    redemption = None
+    if order.promo_code:
+        redemption = promo_service.redeem(db, order.promo_code, customer.id, fare)
+        fare = round(fare - redemption.discount, 2)
 
-    # Reverse geocode if address/city not provided
     try:
-        if not order.pickup_location.address:
-            info = await MapService.reverse_geocode(order.pickup_location.lat, order.pickup_location.lng)
-            if info:
-                order.pickup_location.address = info.get("display_name") or order.pickup_location.address
-                order.pickup_location.city = order.pickup_location.city or info.get("city")
-        if not order.dropoff_location.address:
-            info2 = await MapService.reverse_geocode(order.dropoff_location.lat, order.dropoff_location.lng)
-            if info2:
-                order.dropoff_location.address = info2.get("display_name") or order.dropoff_location.address
-                order.dropoff_location.city = order.dropoff_location.city or info2.get("city")
+        # Reverse geocode if address/city not provided
+        try:
+            if not order.pickup_location.address:
+                info = await MapService.reverse_geocode(order.pickup_location.lat, order.pickup_location.lng)
+                if info:
+                    order.pickup_location.address = info.get("display_name") or order.pickup_location.address
+                    order.pickup_location.city = order.pickup_location.city or info.get("city")
+            if not order.dropoff_location.address:
+                info2 = await MapService.reverse_geocode(order.dropoff_location.lat, order.dropoff_location.lng)
+                if info2:
+                    order.dropoff_location.address = info2.get("display_name") or order.dropoff_location.address
+                    order.dropoff_location.city = order.dropoff_location.city or info2.get("city")
+        except Exception:
+            pass
+
+        # Create ride
+        ride = Ride(
+            customer_id=customer.id,
+            rider_id=current_user.id,
+            pickup_location=json.dumps(order.pickup_location.dict()),
+            dropoff_location=json.dumps(order.dropoff_location.dict()),
+            status="pending",
+            fare=fare,
+            duration=duration_min,
+            vehicle_type=order.vehicle_type.value,
+            city=order.pickup_location.city,
+            distance_km=round(distance, 3),
+            promo_code_id=redemption.promo_code_id if redemption else None,
+            created_at=datetime.utcnow(),
+        )
+        db.add(ride)
+        rollups.ride_created(db, ride)
+        db.commit()
     except Exception:
-        pass
-
-    # Create ride
-    ride = Ride(
-        customer_id=customer.id,
-        rider_id=current_user.id,
-        pickup_location=json.dumps(order.pickup_location.dict()),
-        dropoff_location=json.dumps(order.dropoff_location.dict()),
-        status="pending",
-        fare=fare,
-        duration=duration_min,
-        vehicle_type=order.vehicle_type.value,
-    )
-    db.add(ride)
-    db.commit()
+        db.rollback()
+        if redemption:
+            # The order failed before its ride was stored; don't burn the reserved use
+            promo_service.release(db, redemption.promo_code_id)
+            db.commit()
+        raise
     db.refresh(ride)
+    demand_surge.ride_opened(ride.id, pickup.lat, pickup.lng)
+    if redemption:
+        promo_service.record_usage(db, redemption, ride.id)
 
     # Broadcast to nearby drivers
     driver_ids = _broadcast_to_nearby_drivers(
@@ -195,6 +265,25 @@ async def create_order(
     return resp
 
 
+@router.post("/promo/check")
+async def check_promo_code(
+    payload: PromoCodeCheck,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Promo kodni tekshirish va chegirmani ko'rish (ishlatilmaydi)"""
+    require_dispatcher(current_user)
+    entry = promo_service.validate(db, payload.code)
+    discount = entry.discount_for(payload.fare)
+    return {
+        "code": entry.code,
+        "discount_type": entry.discount_type,
+        "discount_value": entry.discount_value,
+        "discount": discount,
+        "fare_after_discount": round(payload.fare - discount, 2)
+    }
+
+
 @router.post("/order/{ride_id}/broadcast")
 async def broadcast_order(
     ride_id: int,
@@ -279,13 +368,88 @@ async def unblock_driver(
     return {"message": "Driver unblocked"}
 
 
+# Column order of the compact /dispatcher/drivers rows
+DRIVER_LIST_COLUMNS = [
+    "id", "full_name", "phone", "vehicle_number", "vehicle_model", "city",
+    "is_active", "is_approved", "current_balance", "is_on_duty", "lat", "lng",
+]
+
+
+@router.get("/drivers")
+async def list_drivers(
+    city: Optional[str] = None,
+    on_duty: Optional[bool] = None,
+    approved: Optional[bool] = None,
+    balance_below: Optional[float] = None,
+    bbox: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Haydovchilar ro'yxati (filtr va sahifalash bilan)
+
+    **Query Parameters:**
+    - city: Shahar
+    - on_duty: true/false - navbatchilikda yoki yo'q
+    - approved: true/false - tasdiqlangan yoki yo'q
+    - balance_below: Balansi shu summadan kam haydovchilar
+    - bbox: min_lng,min_lat,max_lng,max_lat - oxirgi joylashuv shu hudud ichida
+    - cursor: Oldingi javobdagi `next_cursor`
+    - limit: Sahifa hajmi (default: 100, max: 500)
+
+    **Returns:** `columns` tartibidagi `drivers` qatorlari va `next_cursor`
+    (keyingi sahifa bo'lmasa null).
+    """
+    require_dispatcher(current_user)
+    limit = max(1, min(limit, 500))
+    box = _parse_bbox(bbox)
+
+    # Plain column rows from users + driver_statuses; no ORM objects, no JSON parsing
+    query = db.query(
+        User.id, User.full_name, User.phone, User.vehicle_number, User.vehicle_model, User.city,
+        User.is_active, User.is_approved, User.current_balance,
+        DriverStatus.is_on_duty, DriverStatus.last_lat, DriverStatus.last_lng,
+    ).outerjoin(DriverStatus, DriverStatus.driver_id == User.id).filter(User.is_driver == True)
+    if city:
+        query = query.filter(User.city == city)
+    if on_duty is True:
+        query = query.filter(DriverStatus.is_on_duty == True)
+    elif on_duty is False:
+        query = query.filter(or_(DriverStatus.is_on_duty == False, DriverStatus.is_on_duty == None))  # noqa: E711
+    if approved is not None:
+        query = query.filter(User.is_approved == approved)
+    if balance_below is not None:
+        query = query.filter(func.coalesce(User.current_balance, 0) < balance_below)
+    if box:
+        min_lng, min_lat, max_lng, max_lat = box
+        query = query.filter(
+            DriverStatus.last_lat.between(min_lat, max_lat),
+            DriverStatus.last_lng.between(min_lng, max_lng),
+        )
+    if cursor:
+        query = query.filter(User.id > decode_id_cursor(cursor))
+
+    rows = query.order_by(User.id).limit(limit + 1).all()
+    next_cursor = encode_id_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return {
+        "columns": DRIVER_LIST_COLUMNS,
+        "drivers": [list(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
+
+
 @router.get("/drivers/locations")
 async def list_driver_locations(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     require_dispatcher(current_user)
-    drivers = db.query(User).filter(User.is_driver == True).all()
+    drivers = db.query(User).options(load_only(
+        User.id, User.full_name, User.phone, User.vehicle_number, User.vehicle_model,
+        User.is_active, User.is_approved, User.current_balance, User.current_location,
+    )).filter(User.is_driver == True).all()
     items = []
     for d in drivers:
         loc = None
@@ -308,6 +472,50 @@ async def list_driver_locations(
     return {"drivers": items}
 
 
+@router.get("/heatmap")
+async def get_heatmap(
+    zoom: int = 12,
+    bbox: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Haydovchilar va kutilayotgan buyurtmalar zichligi (xarita uchun)
+
+    **Query Parameters:**
+    - zoom: Xarita zoom darajasi, 1-19 (default: 12); har bir tile 8x8 katakka bo'linadi
+    - bbox: min_lng,min_lat,max_lng,max_lat (ixtiyoriy, ko'rinib turgan hudud)
+
+    **Returns:** `columns` tartibidagi `cells` qatorlari: [x, y, lat, lng, drivers, pickups].
+    Ma'lumot xotiradagi indeksdan olinadi va har tick'da yangilanadi.
+    """
+    require_dispatcher(current_user)
+    if not 1 <= zoom <= 19:
+        raise HTTPException(status_code=400, detail="zoom must be between 1 and 19")
+    return live_map.heatmap(zoom, _parse_bbox(bbox))
+
+
+@router.get("/forecast")
+async def get_demand_forecast(
+    hours: int = 3,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Hududlar bo'yicha kutilayotgan buyurtmalar soni (soatma-soat prognoz)
+
+    **Query Parameters:**
+    - hours: Joriy soatdan boshlab nechta soat (default: 3, max: 24)
+    - limit: Eng band hududlardan nechtasi (default: 50, max: 500)
+
+    **Returns:** har bir hudud markazi (lat, lng), soatlar bo'yicha `expected` va `total`.
+    Soatlar UTC da.
+    """
+    require_dispatcher(current_user)
+    if not 1 <= hours <= 24:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 24")
+    return demand_forecast.forecast(hours, max(1, min(limit, 500)))
+
+
 @router.post("/cancel/{ride_id}")
 async def cancel_order(
     ride_id: int,
@@ -320,6 +528,12 @@ async def cancel_order(
         raise HTTPException(status_code=404, detail="Ride not found")
     if ride.status in ("completed",):
         raise HTTPException(status_code=400, detail="Cannot cancel completed ride")
+    if ride.status != "cancelled":
+        rollups.ride_cancelled(db, ride)
+        ride.cancelled_at = datetime.utcnow()
+        if ride.promo_code_id:
+            promo_service.release(db, ride.promo_code_id, ride.id)
     ride.status = "cancelled"
     db.commit()
+    demand_surge.ride_closed(ride.id)
     return {"message": "Order cancelled"}
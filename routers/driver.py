@@ -5,16 +5,23 @@ from typing import Optional, Dict, Any
 import json
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import User, Ride, Transaction, Payment, SystemConfig, DriverStatus, Notification
+from models import User, Ride, Transaction, Payment, DriverStatus, Notification
 from schemas import DriverStatusUpdate, CompleteRideRequest, PricingConfigResponse
 from routers.auth import get_current_user
-from utils.helpers import calculate_distance
-from sqlalchemy import func, extract
+from utils.helpers import calculate_distance, keyset_paginate, encode_cursor, cached_count
+from sqlalchemy import func, case
 from websocket import manager  # WebSocket manager import
+from services.driver_state import driver_state
+from services.config_cache import config_cache
+from services.response_cache import response_cache
+from services.demand_surge import demand_surge
+from services.pricing_engine import pricing_engine
+from services.rollups import rollups, ride_distance as straight_line_km
+from services.leaderboard import leaderboard
 
 router = APIRouter(prefix="/driver", tags=["Driver"])
 
@@ -26,14 +33,7 @@ def require_driver(user: User) -> User:
 
 
 def get_commission_rate(db: Session) -> float:
-    cfg = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    if cfg:
-        try:
-            return float(cfg.value)
-        except Exception:
-            pass
-    # default fallback (10%)
-    return 0.10
+    return config_cache.get(db).commission_rate
 
 
 def ensure_can_accept(user: User, db: Session) -> None:
@@ -41,15 +41,39 @@ def ensure_can_accept(user: User, db: Session) -> None:
         raise HTTPException(status_code=403, detail="User is inactive")
     if not user.is_approved:
         raise HTTPException(status_code=403, detail="Driver not approved")
-    # Must be on-duty
-    ds = db.query(DriverStatus).filter(DriverStatus.driver_id == user.id).first()
-    if not ds or not ds.is_on_duty:
+    # Must be on-duty (served from the driver state cache; DriverStatus only on a miss)
+    state = driver_state.get(db, user.id)
+    if not state or not state.is_on_duty:
         raise HTTPException(status_code=403, detail="Driver is not on-duty")
     # Must have positive deposit
     if (user.current_balance or 0) <= 0:
         raise HTTPException(status_code=403, detail="Insufficient deposit. Ask dispatcher to top up.")
 
 
+def claim_ride(db: Session, ride_id: int, driver_id: int) -> bool:
+    """Assign a pending ride to the driver in one conditional UPDATE.
+
+    The status check lives in the WHERE clause, so of several concurrent
+    accepts exactly one matches a row; the rest see rowcount 0.
+    """
+    accepted_at = datetime.utcnow()
+    claimed = db.query(Ride).filter(
+        Ride.id == ride_id,
+        Ride.status == "pending"
+    ).update(
+        {Ride.driver_id: driver_id, Ride.status: "accepted", Ride.accepted_at: accepted_at},
+        synchronize_session=False
+    )
+    if claimed == 1:
+        rollups.ride_accepted(db, driver_id)
+        ride = db.query(Ride.created_at, Ride.city).filter(Ride.id == ride_id).one()
+        rollups.ride_latency(db, ride, "accept", ride.created_at, accepted_at)
+    db.commit()
+    if claimed == 1:
+        demand_surge.ride_closed(ride_id)
+    return claimed == 1
+
+
 @router.post("/status")
 async def update_status(
     payload: DriverStatusUpdate,
@@ -71,6 +95,8 @@ async def update_status(
         ds.city = payload.city
         current_user.city = payload.city
     db.commit()
+    driver_state.update(current_user.id, bool(ds.is_on_duty), ds.last_lat, ds.last_lng, ds.city)
+    demand_surge.driver_update(current_user.id, bool(ds.is_on_duty), ds.last_lat, ds.last_lng)
 
     # Broadcast location update to dispatchers via WebSocket
     if payload.lat is not None and payload.lng is not None:
@@ -213,16 +239,48 @@ async def accept_ride(
     require_driver(current_user)
     ensure_can_accept(current_user, db)
 
-    ride = db.query(Ride).filter(Ride.id == ride_id).first()
+    if not claim_ride(db, ride_id, current_user.id):
+        # Lost the race or the ride is gone; only the failure path reads the ride
+        row = db.query(Ride.status).filter(Ride.id == ride_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Ride not found")
+        raise HTTPException(status_code=400, detail=f"Ride not accept-able (status={row.status})")
+    return {"message": "Ride accepted"}
+
+
+@router.post("/rides/{ride_id}/arrive")
+async def arrive_ride(
+    ride_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Haydovchi yo'lovchi oldiga yetib keldi (pickup wait ends here)"""
+    require_driver(current_user)
+
+    ride = db.query(Ride).filter(Ride.id == ride_id, Ride.driver_id == current_user.id).first()
     if not ride:
-        raise HTTPException(status_code=404, detail="Ride not found")
-    if ride.status not in ("pending",):
-        raise HTTPException(status_code=400, detail=f"Ride not accept-able (status={ride.status})")
+        raise HTTPException(status_code=404, detail="Ride not found or not assigned to you")
+    if ride.status not in ("accepted",):
+        raise HTTPException(status_code=400, detail=f"Cannot arrive for ride in status={ride.status}")
+    if ride.arrived_at:
+        return {"message": "Arrival already recorded", "arrived_at": ride.arrived_at.isoformat()}
 
-    ride.driver_id = current_user.id
-    ride.status = "accepted"
+    ride.arrived_at = datetime.utcnow()
+    rollups.ride_latency(db, ride, "pickup", ride.accepted_at, ride.arrived_at)
     db.commit()
-    return {"message": "Ride accepted"}
+
+    # Notify rider via WebSocket
+    rider_update = {
+        "type": "ride_status_update",
+        "ride_id": ride_id,
+        "old_status": "accepted",
+        "new_status": "accepted",
+        "message": "Haydovchi yetib keldi",
+        "timestamp": ride.arrived_at.isoformat()
+    }
+    await manager.broadcast(json.dumps(rider_update), "riders")
+
+    return {"message": "Arrival recorded", "arrived_at": ride.arrived_at.isoformat()}
 
 
 @router.post("/rides/{ride_id}/start")
@@ -240,6 +298,10 @@ async def start_ride(
         raise HTTPException(status_code=400, detail=f"Cannot start ride in status={ride.status}")
 
     ride.status = "in_progress"
+    ride.started_at = datetime.utcnow()
+    if not ride.arrived_at:
+        # No arrive call: the pickup span ends when the trip starts
+        rollups.ride_latency(db, ride, "pickup", ride.accepted_at, ride.started_at)
     db.commit()
 
     # Notify rider via WebSocket
@@ -274,10 +336,13 @@ async def complete_ride(
     # Optional override of dropoff and fare
     if payload.dropoff_location:
         ride.dropoff_location = json.dumps(payload.dropoff_location.dict())
+        ride.distance_km = straight_line_km(ride.pickup_location, ride.dropoff_location)
     if payload.final_fare is not None:
         ride.fare = float(payload.final_fare)
 
     ride.status = "completed"
+    ride.completed_at = datetime.utcnow()
+    rollups.ride_latency(db, ride, "trip", ride.started_at, ride.completed_at)
 
     # Payment (cash) and commission deduction
     final_fare = float(ride.fare or 0)
@@ -294,7 +359,11 @@ async def complete_ride(
         transaction_id=None,
     )
     db.add(pay)
+    rollups.ride_completed(db, ride, commission)
     db.commit()
+    leaderboard.ride_completed(
+        current_user.id, final_fare, ride.distance_km, current_user.rating, ride.completed_at
+    )
 
     remaining = float(current_user.current_balance or 0)
 
@@ -322,40 +391,50 @@ async def driver_stats(
 ):
     require_driver(current_user)
 
-    # Aggregate simple stats
-    total_completed = db.query(Ride).filter(Ride.driver_id == current_user.id, Ride.status == "completed").count()
-    total_accepted = db.query(Ride).filter(Ride.driver_id == current_user.id).count()
-
-    # Earnings are cash paid to driver; we consider commission deducted separately
-    payments = db.query(Payment).join(Ride, Payment.ride_id == Ride.id).filter(
-        Ride.driver_id == current_user.id,
-        Payment.status == "completed"
-    ).all()
-    total_revenue = sum(p.amount or 0 for p in payments)
-
-    # Distance sum from rides (derive from pickup/dropoff JSON)
-    completed = db.query(Ride).filter(Ride.driver_id == current_user.id, Ride.status == "completed").all()
-    total_km = 0.0
-    for r in completed:
-        try:
-            p = json.loads(r.pickup_location) if r.pickup_location else None
-            d = json.loads(r.dropoff_location) if r.dropoff_location else None
-            if p and d and all(k in p for k in ("lat", "lng")) and all(k in d for k in ("lat", "lng")):
-                total_km += calculate_distance(float(p["lat"]), float(p["lng"]), float(d["lat"]), float(d["lng"]))
-        except Exception:
-            continue
+    # Running totals maintained on accept/complete: one primary-key lookup
+    totals = rollups.driver_totals(db, current_user.id)
 
     return {
-        "total_completed": total_completed,
-        "total_accepted": total_accepted,
-        "total_revenue": total_revenue,
-        "total_km": total_km,
+        "total_completed": totals["rides_completed"],
+        "total_accepted": totals["rides_accepted"],
+        "total_revenue": float(totals["revenue"]),
+        "total_km": float(totals["distance_km"]),
         "current_balance": float(current_user.current_balance or 0),
     }
 
 
+@router.get("/stats/leaderboard")
+async def driver_leaderboard(
+    period: str = "weekly",
+    metric: str = "rides",
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Haydovchilar reytingi va o'z o'rningiz
+
+    **Query Parameters:**
+    - period: daily, weekly, monthly (default: weekly)
+    - metric: rides, revenue, km, rating (default: rides)
+    - limit: Top nechta (default: 10, max: 100)
+
+    **Returns:**
+    - top: Eng yaxshi haydovchilar
+    - me: Sizning o'rningiz va ko'rsatkichingiz
+    """
+    require_driver(current_user)
+    limit = leaderboard.validate(period, metric, limit)
+
+    board = leaderboard.with_names(db, leaderboard.top(period, metric, limit))
+    me = leaderboard.rank(period, metric, current_user.id)
+    board["me"] = {"rank": me["rank"], "score": me["score"]}
+    return board
+
+
 @router.get("/pricing", response_model=PricingConfigResponse)
 async def get_driver_pricing(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -365,58 +444,25 @@ async def get_driver_pricing(
     **Returns:**
     - Barcha transport turlari uchun narxlar
     - Komissiya stavkasi
+    - ETag: If-None-Match mos kelsa 304 qaytadi
     """
     require_driver(current_user)
     
-    # Get all pricing configs
-    economy_config = db.query(SystemConfig).filter(SystemConfig.key == "pricing_economy").first()
-    comfort_config = db.query(SystemConfig).filter(SystemConfig.key == "pricing_comfort").first()
-    business_config = db.query(SystemConfig).filter(SystemConfig.key == "pricing_business").first()
-    commission_config = db.query(SystemConfig).filter(SystemConfig.key == "commission_rate").first()
-    
-    # Default values
-    economy = {"base_fare": 10000, "per_km_rate": 2000, "per_minute_rate": 500}
-    comfort = {"base_fare": 15000, "per_km_rate": 3000, "per_minute_rate": 750}
-    business = {"base_fare": 25000, "per_km_rate": 5000, "per_minute_rate": 1000}
-    commission_rate = 0.10
-    
-    # Parse from DB if exists
-    if economy_config:
-        try:
-            economy = json.loads(economy_config.value)
-        except:
-            pass
-    
-    if comfort_config:
-        try:
-            comfort = json.loads(comfort_config.value)
-        except:
-            pass
-    
-    if business_config:
-        try:
-            business = json.loads(business_config.value)
-        except:
-            pass
-    
-    if commission_config:
-        try:
-            commission_rate = float(commission_config.value)
-        except:
-            pass
-    
-    return {
-        "economy": economy,
-        "comfort": comfort,
-        "business": business,
-        "commission_rate": commission_rate
-    }
+    config = config_cache.get(db)
+    return response_cache.respond(request, "driver:pricing", config.version, lambda: {
+        "economy": config.pricing_for("economy"),
+        "comfort": config.pricing_for("comfort"),
+        "business": config.pricing_for("business"),
+        "commission_rate": config.commission_rate
+    })
 
 
 @router.get("/rides/history")
 async def get_driver_ride_history(
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -426,6 +472,8 @@ async def get_driver_ride_history(
     **Query Parameters:**
     - page: Sahifa raqami (default: 1)
     - limit: Har sahifada nechta (default: 20, max: 100)
+    - cursor: Kursor rejimi - bo'sh qiymat birinchi sahifa, keyingilari uchun `next_cursor`
+    - include_total: Kursor rejimida taxminiy (keshlangan) umumiy sonni qaytarish
     
     **Returns:**
     - Haydovchi barcha safarlari ro'yxati (eng yangidan eskilariga)
@@ -435,49 +483,37 @@ async def get_driver_ride_history(
     # Validate and limit
     if limit > 100:
         limit = 100
+    if limit < 1:
+        limit = 1
     if page < 1:
         page = 1
     
+    base_query = db.query(Ride).filter(Ride.driver_id == current_user.id)
+
+    # Keyset mode: constant cost per page, no count() unless asked for
+    if cursor is not None:
+        rides, next_cursor = keyset_paginate(base_query, Ride, cursor, limit)
+        response = {
+            "rides": [_history_item(ride) for ride in rides],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+        if include_total:
+            response["total"] = cached_count(f"driver_rides:{current_user.id}", base_query)
+        return response
+
     offset = (page - 1) * limit
     
     # Get total count
-    total = db.query(Ride).filter(Ride.driver_id == current_user.id).count()
+    total = base_query.count()
     
     # Get rides with pagination (newest first)
-    rides = db.query(Ride).filter(
-        Ride.driver_id == current_user.id
-    ).order_by(Ride.created_at.desc()).offset(offset).limit(limit).all()
-    
-    # Format rides
-    rides_list = []
-    for ride in rides:
-        pickup = None
-        dropoff = None
-        
-        try:
-            if ride.pickup_location:
-                pickup = json.loads(ride.pickup_location)
-        except:
-            pass
-        
-        try:
-            if ride.dropoff_location:
-                dropoff = json.loads(ride.dropoff_location)
-        except:
-            pass
-        
-        rides_list.append({
-            "id": ride.id,
-            "customer_id": ride.customer_id,
-            "status": ride.status,
-            "fare": ride.fare,
-            "duration": ride.duration,
-            "vehicle_type": ride.vehicle_type,
-            "pickup_location": pickup,
-            "dropoff_location": dropoff,
-            "created_at": ride.created_at.isoformat() if ride.created_at else None,
-            "completed_at": ride.completed_at.isoformat() if ride.completed_at else None
-        })
+    rides = base_query.order_by(
+        Ride.created_at.desc(), Ride.id.desc()
+    ).offset(offset).limit(limit).all()
+    
+    rides_list = [_history_item(ride) for ride in rides]
     
     pages = (total + limit - 1) // limit  # Ceiling division
     
@@ -486,7 +522,9 @@ async def get_driver_ride_history(
         "total": total,
         "page": page,
         "limit": limit,
-        "pages": pages
+        "pages": pages,
+        # Lets offset clients switch to cursor mode from any page
+        "next_cursor": encode_cursor(rides[-1].created_at, rides[-1].id) if rides and page < pages else None
     }
 
 
@@ -495,6 +533,8 @@ async def calculate_fare(
     distance: float,
     duration: int,
     vehicle_type: str = "economy",
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -505,64 +545,55 @@ async def calculate_fare(
     - distance: Masofa (km)
     - duration: Vaqt (daqiqa)
     - vehicle_type: economy, comfort, yoki business (default: economy)
+    - lat, lng: Olib ketish nuqtasi (ixtiyoriy, surge uchun)
     
     **Returns:**
     - Hisoblangan narx, komissiya, va haydovchi daromadi
     """
     require_driver(current_user)
     
-    # Get pricing config
-    config_key = f"pricing_{vehicle_type}"
-    pricing_config = db.query(SystemConfig).filter(SystemConfig.key == config_key).first()
-    
-    # Default values
-    base_fare = 10000
-    per_km_rate = 2000
-    per_minute_rate = 500
-    
-    if vehicle_type == "comfort":
-        base_fare = 15000
-        per_km_rate = 3000
-        per_minute_rate = 750
-    elif vehicle_type == "business":
-        base_fare = 25000
-        per_km_rate = 5000
-        per_minute_rate = 1000
-    
-    # Override with DB config if exists
-    if pricing_config:
-        try:
-            config_data = json.loads(pricing_config.value)
-            base_fare = config_data.get("base_fare", base_fare)
-            per_km_rate = config_data.get("per_km_rate", per_km_rate)
-            per_minute_rate = config_data.get("per_minute_rate", per_minute_rate)
-        except:
-            pass
-    
-    # Calculate fare
-    distance_cost = distance * per_km_rate
-    time_cost = duration * per_minute_rate
-    total_fare = base_fare + distance_cost + time_cost
-    
-    # Get commission rate
-    commission_rate = get_commission_rate(db)
-    commission_amount = round(total_fare * commission_rate, 2)
-    driver_earnings = round(total_fare - commission_amount, 2)
-    
+    quote = pricing_engine.quote(db, distance, duration, vehicle_type, lat=lat, lng=lng)
+    return quote.as_dict()
+
+
+def _history_item(ride: Ride) -> Dict[str, Any]:
+    pickup = None
+    dropoff = None
+
+    try:
+        if ride.pickup_location:
+            pickup = json.loads(ride.pickup_location)
+    except:
+        pass
+
+    try:
+        if ride.dropoff_location:
+            dropoff = json.loads(ride.dropoff_location)
+    except:
+        pass
+
     return {
-        "vehicle_type": vehicle_type,
-        "distance_km": distance,
-        "duration_minutes": duration,
-        "breakdown": {
-            "base_fare": base_fare,
-            "distance_cost": distance_cost,
-            "time_cost": time_cost
-        },
-        "total_fare": round(total_fare, 2),
-        "commission_rate": commission_rate,
-        "commission_amount": commission_amount,
-        "driver_earnings": driver_earnings,
-        "formula": f"{base_fare} + ({distance} × {per_km_rate}) + ({duration} × {per_minute_rate}) = {round(total_fare, 2)} so'm"
+        "id": ride.id,
+        "customer_id": ride.customer_id,
+        "status": ride.status,
+        "fare": ride.fare,
+        "duration": ride.duration,
+        "vehicle_type": ride.vehicle_type,
+        "pickup_location": pickup,
+        "dropoff_location": dropoff,
+        "created_at": ride.created_at.isoformat() if ride.created_at else None,
+        "completed_at": ride.completed_at.isoformat() if ride.completed_at else None
+    }
+
+
+def _notification_item(notif: Notification) -> Dict[str, Any]:
+    return {
+        "id": notif.id,
+        "title": notif.title,
+        "body": notif.body,
+        "notification_type": notif.notification_type,
+        "is_read": notif.is_read,
+        "created_at": notif.created_at.isoformat() if notif.created_at else None
     }
 
 
@@ -570,6 +601,8 @@ async def calculate_fare(
 async def get_driver_notifications(
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -579,6 +612,8 @@ async def get_driver_notifications(
     **Query Parameters:**
     - page: Sahifa raqami (default: 1)
     - limit: Har sahifada nechta (default: 20, max: 100)
+    - cursor: Kursor rejimi - bo'sh qiymat birinchi sahifa, keyingilari uchun `next_cursor`
+    - include_total: Kursor rejimida taxminiy (keshlangan) umumiy sonni qaytarish
     
     **Returns:**
     - Haydovchiga yuborilgan barcha xabarlar (eng yangidan eskilariga)
@@ -588,32 +623,36 @@ async def get_driver_notifications(
     # Validate and limit
     if limit > 100:
         limit = 100
+    if limit < 1:
+        limit = 1
     if page < 1:
         page = 1
     
+    base_query = db.query(Notification).filter(Notification.user_id == current_user.id)
+
+    if cursor is not None:
+        notifications, next_cursor = keyset_paginate(base_query, Notification, cursor, limit)
+        response = {
+            "notifications": [_notification_item(n) for n in notifications],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+        if include_total:
+            response["total"] = cached_count(f"driver_notifications:{current_user.id}", base_query)
+        return response
+
     offset = (page - 1) * limit
     
     # Get total count
-    total = db.query(Notification).filter(
-        Notification.user_id == current_user.id
-    ).count()
+    total = base_query.count()
     
     # Get notifications with pagination (newest first)
-    notifications = db.query(Notification).filter(
-        Notification.user_id == current_user.id
-    ).order_by(Notification.created_at.desc()).offset(offset).limit(limit).all()
-    
-    # Format notifications
-    notifications_list = []
-    for notif in notifications:
-        notifications_list.append({
-            "id": notif.id,
-            "title": notif.title,
-            "body": notif.body,
-            "notification_type": notif.notification_type,
-            "is_read": notif.is_read,
-            "created_at": notif.created_at.isoformat() if notif.created_at else None
-        })
+    notifications = base_query.order_by(
+        Notification.created_at.desc(), Notification.id.desc()
+    ).offset(offset).limit(limit).all()
+    
+    notifications_list = [_notification_item(n) for n in notifications]
     
     pages = (total + limit - 1) // limit
     
@@ -622,7 +661,11 @@ async def get_driver_notifications(
         "total": total,
         "page": page,
         "limit": limit,
-        "pages": pages
+        "pages": pages,
+        "next_cursor": (
+            encode_cursor(notifications[-1].created_at, notifications[-1].id)
+            if notifications and page < pages else None
+        )
     }
 
 
@@ -645,62 +688,42 @@ async def driver_stats_detailed(
     """
     require_driver(current_user)
     
-    query = db.query(Ride).filter(Ride.driver_id == current_user.id)
-    
-    # Apply period filter
-    if period == "daily" and date:
-        try:
-            target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(func.date(Ride.created_at) == target_date)
-        except:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    
-    elif period == "weekly" and date:
+    # Period -> half-open created_at range (ix_rides_driver_id_created_at)
+    start = end = None
+    if period in ("daily", "weekly", "monthly") and date:
         try:
             target_date = datetime.strptime(date, "%Y-%m-%d")
-            # Get week start (Monday)
-            week_start = target_date - timedelta(days=target_date.weekday())
-            week_end = week_start + timedelta(days=7)
-            query = query.filter(Ride.created_at >= week_start, Ride.created_at < week_end)
-        except:
+        except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    
-    elif period == "monthly" and date:
-        try:
-            target_date = datetime.strptime(date, "%Y-%m-%d")
-            query = query.filter(
-                extract('year', Ride.created_at) == target_date.year,
-                extract('month', Ride.created_at) == target_date.month
-            )
-        except:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    
-    # Calculate stats
-    total_rides = query.count()
-    completed_rides = query.filter(Ride.status == "completed").count()
-    cancelled_rides = query.filter(Ride.status == "cancelled").count()
-    
-    # Get payments
-    completed = query.filter(Ride.status == "completed").all()
-    total_revenue = 0.0
-    total_km = 0.0
-    total_commission = 0.0
-    
+        if period == "daily":
+            start, end = target_date, target_date + timedelta(days=1)
+        elif period == "weekly":
+            # Week starts on Monday
+            start = target_date - timedelta(days=target_date.weekday())
+            end = start + timedelta(days=7)
+        else:
+            start = target_date.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1)
+
+    # One grouped aggregate instead of three count()s plus loading completed rides
+    completed = Ride.status == "completed"
+    query = db.query(
+        func.count(Ride.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((Ride.status == "cancelled", 1), else_=0)),
+        func.sum(case((completed, Ride.fare), else_=0)),
+        func.sum(case((completed, Ride.distance_km), else_=0)),
+    ).filter(Ride.driver_id == current_user.id)
+    if start is not None:
+        query = query.filter(Ride.created_at >= start, Ride.created_at < end)
+    total_rides, completed_rides, cancelled_rides, total_revenue, total_km = query.one()
+
+    completed_rides = completed_rides or 0
+    cancelled_rides = cancelled_rides or 0
+    total_revenue = float(total_revenue or 0)
+    total_km = float(total_km or 0)
     commission_rate = get_commission_rate(db)
-    
-    for ride in completed:
-        fare = float(ride.fare or 0)
-        total_revenue += fare
-        total_commission += round(fare * commission_rate, 2)
-        
-        # Calculate distance
-        try:
-            p = json.loads(ride.pickup_location) if ride.pickup_location else None
-            d = json.loads(ride.dropoff_location) if ride.dropoff_location else None
-            if p and d and all(k in p for k in ("lat", "lng")) and all(k in d for k in ("lat", "lng")):
-                total_km += calculate_distance(float(p["lat"]), float(p["lng"]), float(d["lat"]), float(d["lng"]))
-        except Exception:
-            continue
+    total_commission = total_revenue * commission_rate
     
     driver_earnings = total_revenue - total_commission
     
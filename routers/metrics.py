@@ -0,0 +1,68 @@
+"""
+Metrics router - Internal load, cache and fleet counters (admins or a scraper token)
+"""
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import get_db, pool_status
+from routers.auth import get_current_user
+from services.quote_cache import quote_cache
+from services.demand_surge import demand_surge
+from services.analytics_jobs import analytics_jobs
+from services.demand_forecast import demand_forecast
+from services.live_map import live_map
+
+
+def require_metrics_access(request: Request, db: Session = Depends(get_db)) -> None:
+    """Allow the configured X-Metrics-Token, otherwise require an admin user"""
+    token = request.headers.get("X-Metrics-Token")
+    if token and settings.metrics_token and secrets.compare_digest(token, settings.metrics_token):
+        return
+    user = get_current_user(request, db)
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+
+router = APIRouter(prefix="/metrics", tags=["Health"], dependencies=[Depends(require_metrics_access)])
+
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """Connection pool metrics: in-use/overflow counts and checkout wait times"""
+    return pool_status()
+
+
+@router.get("/quote-cache")
+async def quote_cache_metrics():
+    """Dispatcher quote cache: size, hit/miss counters and invalidations"""
+    return quote_cache.stats()
+
+
+@router.get("/surge")
+async def surge_metrics():
+    """Automatic surge: tracked drivers/rides, active and surging cells"""
+    return demand_surge.stats()
+
+
+@router.get("/analytics-jobs")
+async def analytics_jobs_metrics():
+    """Admin dashboard jobs: registered jobs, in-flight refreshes, snapshot versions"""
+    return analytics_jobs.stats()
+
+
+@router.get("/demand-forecast")
+async def demand_forecast_metrics():
+    """Demand forecast: zones in the profile and last trained day"""
+    return demand_forecast.stats()
+
+
+@router.get("/live-map")
+async def live_map_metrics():
+    """Dispatcher heatmap: snapshot ticks, frozen drivers/pickups and cached views"""
+    return live_map.stats()
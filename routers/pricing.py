@@ -0,0 +1,86 @@
+"""
+Pricing router - batch fare quotes for dispatchers and partner integrations
+"""
+import json
+from typing import Iterator
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import User
+from schemas import QuoteBatchRequest
+from routers.auth import get_current_user
+from services.pricing_engine import pricing_engine
+
+router = APIRouter(
+    prefix="/pricing",
+    tags=["Pricing"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Rows per streamed chunk
+QUOTE_CHUNK_ROWS = 1000
+
+
+def _stream_quotes(header: dict, columns: list) -> Iterator[str]:
+    """Stream ``{...header, "quotes": [[...], ...]}`` without building the whole body"""
+    yield json.dumps(header)[:-1] + ', "quotes": ['
+    rows = np.column_stack(columns).tolist()
+    for start in range(0, len(rows), QUOTE_CHUNK_ROWS):
+        chunk = ",".join(json.dumps(row) for row in rows[start:start + QUOTE_CHUNK_ROWS])
+        yield ("," if start else "") + chunk
+    yield "]}"
+
+
+@router.post("/quotes")
+async def batch_quotes(
+    payload: QuoteBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Ko'plab safarlar uchun narxni bir so'rovda hisoblash (Dispatcher/Admin)
+
+    **Request Body:**
+    - trips: [[pickup_lat, pickup_lng, dropoff_lat, dropoff_lng], ...]
+    - vehicle_types: Mashina turlari (default: ["economy"])
+    - service_ids: Qo'shimcha xizmatlar (optional)
+
+    **Returns:**
+    - columns: Ustun nomlari
+    - quotes: Har bir safar uchun bitta qator, trips tartibida
+      [distance_km, duration_min, surge_multiplier, fare_<vehicle_type>...]
+    """
+    if not (current_user.is_dispatcher or current_user.is_admin):
+        raise HTTPException(status_code=403, detail="Dispatcher access required")
+
+    try:
+        trips = np.asarray(payload.trips, dtype=np.float64)
+    except ValueError:
+        trips = None  # ragged rows
+    if trips is None or trips.ndim != 2 or trips.shape[1] != 4:
+        raise HTTPException(status_code=400, detail="Each trip must be [pickup_lat, pickup_lng, dropoff_lat, dropoff_lng]")
+    lats, lngs = trips[:, [0, 2]], trips[:, [1, 3]]
+    if not (np.all(np.abs(lats) <= 90) and np.all(np.abs(lngs) <= 180)):
+        raise HTTPException(status_code=400, detail="Coordinates out of range")
+
+    vehicle_types = [vt.value for vt in payload.vehicle_types]
+    snapshot = pricing_engine.snapshot(db)
+    result = snapshot.quote_batch(trips, vehicle_types, service_ids=payload.service_ids)
+
+    header = {
+        "version": snapshot.version,
+        "count": len(trips),
+        "currency": "UZS",
+        "columns": ["distance_km", "duration_min", "surge_multiplier"] + [f"fare_{vt}" for vt in vehicle_types],
+    }
+    columns = [
+        np.round(result["distance_km"], 3),
+        result["duration_min"],
+        result["surge_multiplier"],
+        result["fares"],
+    ]
+    return StreamingResponse(_stream_quotes(header, columns), media_type="application/json")
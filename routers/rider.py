@@ -12,7 +12,10 @@ from database import get_db
 from models import User, Ride, DriverStatus
 from schemas import RideResponse
 from routers.auth import get_current_user
-from utils.helpers import calculate_distance
+from utils.helpers import calculate_distance, keyset_paginate, encode_cursor, cached_count
+from services.demand_surge import demand_surge
+from services.promo import promo_service
+from services.rollups import rollups
 
 router = APIRouter(prefix="/rider", tags=["Rider"])
 
@@ -62,7 +65,11 @@ def _ride_to_response(ride: Ride) -> RideResponse:
         duration=int(ride.duration or 0),
         vehicle_type=ride.vehicle_type,
         created_at=ride.created_at,
+        accepted_at=ride.accepted_at,
+        arrived_at=ride.arrived_at,
+        started_at=ride.started_at,
         completed_at=ride.completed_at,
+        cancelled_at=ride.cancelled_at,
     )
 
 
@@ -220,26 +227,49 @@ async def get_driver_location(
 async def get_ride_history(
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get ride history for the rider"""
+    """Get ride history for the rider.
+
+    Pass ``cursor`` (empty for the first page, then ``next_cursor``) for keyset
+    pagination; ``page`` based offset pagination is kept for older clients.
+    """
     require_rider(current_user)
 
+    limit = max(1, min(limit, 100))
+    base_query = db.query(Ride).filter(Ride.rider_id == current_user.id)
+
+    if cursor is not None:
+        rides, next_cursor = keyset_paginate(base_query, Ride, cursor, limit)
+        response = {
+            "rides": [_ride_to_response(ride) for ride in rides],
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }
+        if include_total:
+            response["total"] = cached_count(f"rider_rides:{current_user.id}", base_query)
+        return response
+
     offset = (page - 1) * limit
 
-    rides = db.query(Ride).filter(
-        Ride.rider_id == current_user.id
-    ).order_by(Ride.created_at.desc()).offset(offset).limit(limit).all()
+    rides = base_query.order_by(
+        Ride.created_at.desc(), Ride.id.desc()
+    ).offset(offset).limit(limit).all()
 
-    total_rides = db.query(Ride).filter(Ride.rider_id == current_user.id).count()
+    total_rides = base_query.count()
+    pages = (total_rides + limit - 1) // limit
 
     return {
         "rides": rides,
         "total": total_rides,
         "page": page,
         "limit": limit,
-        "pages": (total_rides + limit - 1) // limit
+        "pages": pages,
+        "next_cursor": encode_cursor(rides[-1].created_at, rides[-1].id) if rides and page < pages else None
     }
 
 
@@ -264,6 +294,11 @@ async def cancel_ride(
         raise HTTPException(status_code=400, detail="Cannot cancel ride in current status")
 
     ride.status = "cancelled"
+    ride.cancelled_at = datetime.utcnow()
+    rollups.ride_cancelled(db, ride)
+    if ride.promo_code_id:
+        promo_service.release(db, ride.promo_code_id, ride.id)
     db.commit()
+    demand_surge.ride_closed(ride.id)
 
     return {"message": "Ride cancelled successfully", "ride_id": ride_id}
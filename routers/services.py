@@ -2,20 +2,31 @@
 Qo'shimcha xizmatlar (Additional Services) API endpoint'lari
 Barcha foydalanuvchilar uchun ochiq
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import AdditionalService
 from schemas import AdditionalServiceResponse
+from services.config_cache import config_cache
+from services.response_cache import response_cache
 
 router = APIRouter(
     prefix="/api/v1/services",
     tags=["Services"]
 )
 
+def _service_list(db: Session, active_only: bool) -> list:
+    query = db.query(AdditionalService)
+    if active_only:
+        query = query.filter(AdditionalService.is_active == True)
+    services = query.order_by(AdditionalService.display_order).all()
+    return [AdditionalServiceResponse.model_validate(s).model_dump(mode="json") for s in services]
+
+
 @router.get("/available", response_model=List[AdditionalServiceResponse])
 def get_available_services(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -25,15 +36,14 @@ def get_available_services(
     
     **Returns:**
     - Faol xizmatlar ro'yxati (display_order bo'yicha tartiblangan)
+    - ETag: If-None-Match mos kelsa 304 qaytadi
     """
-    services = db.query(AdditionalService).filter(
-        AdditionalService.is_active == True
-    ).order_by(AdditionalService.display_order).all()
-    
-    return services
+    version = config_cache.get(db).version
+    return response_cache.respond(request, "services:available", version, lambda: _service_list(db, True))
 
 @router.get("/all", response_model=List[AdditionalServiceResponse])
 def get_all_services(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -43,12 +53,10 @@ def get_all_services(
     
     **Returns:**
     - Barcha xizmatlar ro'yxati
+    - ETag: If-None-Match mos kelsa 304 qaytadi
     """
-    services = db.query(AdditionalService).order_by(
-        AdditionalService.display_order
-    ).all()
-    
-    return services
+    version = config_cache.get(db).version
+    return response_cache.respond(request, "services:all", version, lambda: _service_list(db, False))
 
 @router.get("/{service_id}", response_model=AdditionalServiceResponse)
 def get_service(
@@ -271,7 +271,11 @@ class RideResponse(BaseModel):
     vehicle_type: str
     route_geometry: Optional[Dict[str, Any]] = None
     created_at: datetime
+    accepted_at: Optional[datetime] = None
+    arrived_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime]
+    cancelled_at: Optional[datetime] = None
 
 # Payment schemas
 class PaymentCreate(BaseModel):
@@ -349,6 +353,7 @@ class DispatchOrderCreate(BaseModel):
     pickup_location: Location
     dropoff_location: Location
     vehicle_type: VehicleType = VehicleType.ECONOMY
+    promo_code: Optional[str] = Field(None, max_length=32)
 
 class DispatchOrderResponse(BaseModel):
     ride: RideResponse
@@ -394,6 +399,24 @@ class PricingConfigResponse(BaseModel):
     business: Dict[str, Any]
     commission_rate: float
 
+class QuoteBatchRequest(BaseModel):
+    """Batch fare quotes: every trip is priced for every requested vehicle type"""
+    trips: List[List[float]] = Field(
+        ..., min_length=1, max_length=10000,
+        description="[pickup_lat, pickup_lng, dropoff_lat, dropoff_lng] har bir safar uchun"
+    )
+    vehicle_types: List[VehicleType] = Field(default_factory=lambda: [VehicleType.ECONOMY], min_length=1)
+    service_ids: List[int] = Field(default_factory=list, description="Qo'shimcha xizmatlar (har bir safarga qo'shiladi)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "trips": [[40.7821, 72.3442, 40.7589, 72.3667], [40.7821, 72.3442, 40.8154, 72.2837]],
+                "vehicle_types": ["economy", "comfort"],
+                "service_ids": []
+            }
+        }
+
 # Authentication schemas
 class UserLogin(BaseModel):
     """Schema for user login"""
@@ -469,6 +492,15 @@ class FCMTokenResponse(BaseModel):
     message: str
 
 # Promo code schemas
+class PromoCodeCreate(BaseModel):
+    code: str = Field(..., min_length=3, max_length=32, pattern=r"^[A-Za-z0-9_-]+$", example="NAVRUZ2026")
+    discount_type: str = Field(..., pattern=r"^(percentage|fixed)$", description="percentage yoki fixed")
+    discount_value: float = Field(..., gt=0, description="10 (10%) yoki 5000 (so'm)")
+    max_uses: int = Field(1, ge=1)
+    valid_from: Optional[datetime] = None
+    valid_until: Optional[datetime] = None
+    description: Optional[str] = Field(None, max_length=200)
+
 class PromoCodeResponse(BaseModel):
     id: int
     code: str
@@ -476,12 +508,19 @@ class PromoCodeResponse(BaseModel):
     discount_value: float
     max_uses: int
     used_count: int
-    valid_from: datetime
-    valid_until: datetime
+    valid_from: Optional[datetime]
+    valid_until: Optional[datetime]
     is_active: bool
     description: Optional[str]
     created_at: datetime
 
+    class Config:
+        from_attributes = True
+
+class PromoCodeCheck(BaseModel):
+    code: str = Field(..., min_length=1, max_length=32)
+    fare: float = Field(..., ge=0)
+
 # Vehicle schemas
 class VehicleResponse(BaseModel):
     id: int
@@ -702,3 +741,52 @@ class AdditionalServiceResponse(BaseModel):
 class AdditionalServiceToggle(BaseModel):
     """Xizmatni faollashtirish/o'chirish"""
     is_active: bool = Field(..., description="Faol/Faol emas")
+
+# ============= SURGE PRICING =============
+
+class SurgeAreaCreate(BaseModel):
+    """Surge hududi (markaz + radius)"""
+    name: str = Field(..., min_length=1, max_length=100, example="Andijon bozori")
+    center_lat: float = Field(..., ge=-90, le=90)
+    center_lng: float = Field(..., ge=-180, le=180)
+    radius_km: float = Field(5.0, gt=0, le=100, description="Radius (km)")
+    is_active: bool = True
+
+class SurgeAreaResponse(BaseModel):
+    id: int
+    name: str
+    center_lat: float
+    center_lng: float
+    radius_km: float
+    is_active: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SurgePricingCreate(BaseModel):
+    """Surge koeffitsienti (area_name bo'sh bo'lsa - butun shahar uchun)"""
+    area_name: Optional[str] = Field(None, description="SurgeArea nomi")
+    multiplier: float = Field(..., ge=1.0, le=5.0, example=1.5)
+    is_active: bool = True
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+class SurgePricingUpdate(BaseModel):
+    multiplier: Optional[float] = Field(None, ge=1.0, le=5.0)
+    is_active: Optional[bool] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+class SurgePricingResponse(BaseModel):
+    id: int
+    area_name: Optional[str]
+    multiplier: float
+    is_active: bool
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    created_by: Optional[int]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
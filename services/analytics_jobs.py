@@ -0,0 +1,148 @@
+"""
+Background analytics jobs for the admin dashboard
+
+Dashboard datasets (system stats, today's and this week's analytics, income
+stats, current month/year) are registered as jobs and recomputed every
+ANALYTICS_REFRESH_SECONDS by a loop started from main.lifespan. Each run
+stores a versioned snapshot; endpoints serve the latest one together with
+its ``as_of`` time, so a dashboard view costs a dict lookup.
+
+Jobs run in worker threads with their own session (the work is SQL-bound, so
+threads are enough). ``refresh_in_background`` lets an endpoint honour
+``?fresh=1`` without waiting; concurrent refreshes of one job are coalesced.
+A job with no snapshot yet (first view after startup) is computed inline once.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    name: str
+    version: int
+    as_of: datetime
+    data: Dict[str, Any]
+
+    def response(self, refreshing: bool = False) -> Dict[str, Any]:
+        """Job payload plus snapshot metadata"""
+        body = dict(self.data)
+        body.update({
+            "as_of": self.as_of.isoformat(),
+            "snapshot_version": self.version,
+            "refreshing": refreshing,
+        })
+        return body
+
+
+class AnalyticsJobs:
+    """Registry of dashboard jobs and their latest snapshots"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._jobs: Dict[str, Callable[[Session], Dict[str, Any]]] = {}
+        self._snapshots: Dict[str, AnalyticsSnapshot] = {}
+        self._running: set = set()
+        self._tasks: set = set()  # strong refs so pending refresh tasks are not collected
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def register(self, name: str):
+        """Decorator: ``@analytics_jobs.register("system_stats")`` on ``fn(db) -> dict``"""
+        def decorator(fn):
+            self._jobs[name] = fn
+            return fn
+        return decorator
+
+    def run(self, name: str, db: Optional[Session] = None) -> AnalyticsSnapshot:
+        """Compute one job now and store its snapshot"""
+        own_session = db is None
+        db = db or self.session_factory()
+        try:
+            data = self._jobs[name](db)
+        finally:
+            if own_session:
+                db.close()
+        with self._lock:
+            self._version += 1
+            snapshot = AnalyticsSnapshot(name, self._version, datetime.utcnow(), data)
+            self._snapshots[name] = snapshot
+        return snapshot
+
+    def run_all(self) -> int:
+        """Recompute every job; a failing job keeps its previous snapshot"""
+        done = 0
+        for name in list(self._jobs):
+            try:
+                self.run(name)
+                done += 1
+            except Exception as e:
+                logger.error(f"Analytics job {name} failed: {e}")
+        return done
+
+    def refresh_in_background(self, name: str) -> bool:
+        """Schedule a recompute on the running loop; False if one is already in flight"""
+        with self._lock:
+            if name in self._running:
+                return False
+            self._running.add(name)
+
+        async def _refresh():
+            try:
+                await asyncio.to_thread(self.run, name)
+            except Exception as e:
+                logger.error(f"Analytics job {name} failed: {e}")
+            finally:
+                with self._lock:
+                    self._running.discard(name)
+
+        task = asyncio.get_running_loop().create_task(_refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    def serve(self, name: str, db: Session, fresh: bool = False,
+              expect: Optional[Tuple[str, Any]] = None) -> Dict[str, Any]:
+        """Endpoint helper: latest snapshot, optionally kicking off a refresh.
+
+        ``expect=(field, value)`` names the period the caller wants (e.g. the
+        current date); a snapshot for an older period is recomputed inline.
+        """
+        snapshot = self._snapshots.get(name)
+        if snapshot is None or (expect and snapshot.data.get(expect[0]) != expect[1]):
+            return self.run(name, db).response()
+        refreshing = self.refresh_in_background(name) if fresh else False
+        return snapshot.response(refreshing)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": sorted(self._jobs),
+            "running": sorted(self._running),
+            "snapshots": {
+                name: {"version": s.version, "as_of": s.as_of.isoformat()}
+                for name, s in self._snapshots.items()
+            },
+        }
+
+
+async def run_analytics_jobs(interval: float) -> None:
+    """Background loop started from main.lifespan: recompute every dashboard job"""
+    while True:
+        try:
+            await asyncio.to_thread(analytics_jobs.run_all)
+        except Exception as e:
+            logger.error(f"Analytics jobs run failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Global analytics jobs instance
+analytics_jobs = AnalyticsJobs(SessionLocal)
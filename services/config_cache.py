@@ -0,0 +1,188 @@
+"""
+Versioned SystemConfig cache shared by pricing and commission lookups
+
+Every worker keeps an immutable ConfigSnapshot in memory. Writes go through
+ConfigCache.set_value, which bumps the ``config_version`` row in the same
+transaction. Other workers notice the new version either immediately (Redis
+pub/sub, when Redis is reachable) or on their next version check, which runs
+at most every CONFIG_CACHE_CHECK_SECONDS. Between checks a read is a plain
+attribute lookup with no database access.
+"""
+import copy
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import Integer, String, cast
+from sqlalchemy.orm import Session
+
+from config import settings, VEHICLE_TYPES
+from models import SystemConfig
+
+logger = logging.getLogger(__name__)
+
+CONFIG_VERSION_KEY = "config_version"
+CONFIG_CHANNEL = "royaltaxi:config"
+PRICED_VEHICLE_TYPES = ("economy", "comfort", "business")
+
+# Pristine copy of the defaults from config.py (never mutated at runtime)
+DEFAULT_VEHICLE_PRICING: Dict[str, Dict[str, Any]] = copy.deepcopy(VEHICLE_TYPES)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Typed, read-only view of SystemConfig at one version
+
+    The mappings are read-only proxies: a snapshot is shared by every request
+    of the worker, so callers must not be able to change it in place.
+    """
+    version: int
+    commission_rate: float
+    vehicle_pricing: Mapping[str, Mapping[str, Any]]
+    values: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+
+    def pricing_for(self, vehicle_type: str) -> Dict[str, Any]:
+        """Copy of the tariff for a vehicle type, falling back to economy like calculate_fare does"""
+        return dict(self.vehicle_pricing.get(vehicle_type) or self.vehicle_pricing["economy"])
+
+
+def build_snapshot(version: int, values: Dict[str, str]) -> ConfigSnapshot:
+    commission_rate = settings.commission_rate
+    if "commission_rate" in values:
+        try:
+            commission_rate = float(values["commission_rate"])
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid commission_rate in system_config: {values['commission_rate']!r}")
+
+    vehicle_pricing = copy.deepcopy(DEFAULT_VEHICLE_PRICING)
+    for vehicle_type in PRICED_VEHICLE_TYPES:
+        raw = values.get(f"pricing_{vehicle_type}")
+        if not raw:
+            continue
+        try:
+            overrides = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid pricing_{vehicle_type} in system_config: {raw!r}")
+            continue
+        for key in ("base_fare", "per_km_rate", "per_minute_rate"):
+            if key in overrides:
+                vehicle_pricing[vehicle_type][key] = overrides[key]
+
+    return ConfigSnapshot(
+        version=version,
+        commission_rate=commission_rate,
+        vehicle_pricing=MappingProxyType({
+            vehicle_type: MappingProxyType(pricing) for vehicle_type, pricing in vehicle_pricing.items()
+        }),
+        values=MappingProxyType(dict(values)),
+    )
+
+
+class ConfigCache:
+    """Per-worker cache of SystemConfig, invalidated by a version counter"""
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._redis = None
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    def get(self, db: Session) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+            version = self._read_version(db)
+            if snapshot is None or snapshot.version != version:
+                rows = db.query(SystemConfig.key, SystemConfig.value).all()
+                values = {key: value for key, value in rows if key != CONFIG_VERSION_KEY}
+                snapshot = build_snapshot(version, values)
+                self._snapshot = snapshot
+                logger.info(f"Loaded system config version {version}")
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Force a version check on the next read"""
+        self._checked_at = 0.0
+
+    def set_value(self, db: Session, key: str, value: str) -> int:
+        """Write one SystemConfig value, bump the version and notify other workers"""
+        cfg = db.query(SystemConfig).filter(SystemConfig.key == key).first()
+        if not cfg:
+            db.add(SystemConfig(key=key, value=value))
+        else:
+            cfg.value = value
+        return self.bump_version(db)
+
+    def bump_version(self, db: Session) -> int:
+        """Atomically increment the config version (commits the session)"""
+        updated = db.query(SystemConfig).filter(SystemConfig.key == CONFIG_VERSION_KEY).update(
+            {SystemConfig.value: cast(cast(SystemConfig.value, Integer) + 1, String)},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(SystemConfig(key=CONFIG_VERSION_KEY, value="1"))
+        db.commit()
+        version = self._read_version(db)
+        self.invalidate()
+        self._publish(version)
+        return version
+
+    def start_listener(self, redis_url: str) -> bool:
+        """Subscribe to version bumps from other workers; polling stays as the fallback"""
+        try:
+            import redis
+            client = redis.from_url(redis_url)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CONFIG_CHANNEL)
+        except Exception as e:
+            logger.info(f"Config invalidation via Redis disabled ({e}); polling every {self.check_interval}s")
+            return False
+
+        self._redis = client
+
+        def listen():
+            try:
+                for _ in pubsub.listen():
+                    self.invalidate()
+            except Exception as e:
+                logger.warning(f"Config invalidation listener stopped: {e}")
+                self._redis = None
+
+        threading.Thread(target=listen, name="config-cache-listener", daemon=True).start()
+        return True
+
+    def _publish(self, version: int) -> None:
+        if self._redis is None:
+            return
+        try:
+            self._redis.publish(CONFIG_CHANNEL, str(version))
+        except Exception as e:
+            logger.warning(f"Could not broadcast config version {version}: {e}")
+
+    @staticmethod
+    def _read_version(db: Session) -> int:
+        value = db.query(SystemConfig.value).filter(SystemConfig.key == CONFIG_VERSION_KEY).scalar()
+        try:
+            return int(value) if value is not None else 0
+        except (TypeError, ValueError):
+            return 0
+
+
+# Global config cache instance
+config_cache = ConfigCache(settings.config_cache_check_seconds)
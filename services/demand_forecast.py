@@ -0,0 +1,251 @@
+"""
+Hourly demand forecast per zone, for pre-positioning drivers
+
+Pickups are binned into hexagonal zones (hex_cell from services.demand_surge,
+FORECAST_ZONE_KM) and hours of the week (0 = Monday 00:00 UTC). The model is
+a seasonal profile: for every (zone, hour of week) an exponentially smoothed
+pickup count, updated with weight max(FORECAST_ALPHA, 1/n) so the first
+weeks are averaged evenly and older weeks then fade out. The forecast for an
+upcoming hour is the profile value of its hour of week.
+
+Training is incremental by day. One day's rides are read once (created_at
+index), binned into a zones x 24 matrix and folded into that weekday's 24
+columns; known zones without pickups that day decay toward zero. History is
+never re-read. The profile is stored in demand_profiles and the last trained
+day in SystemConfig; each day is claimed with a conditional UPDATE of that
+value, so of several workers exactly one trains it and the others reload.
+
+The loop in main.lifespan trains every complete day up to yesterday each
+FORECAST_RETRAIN_SECONDS; train_demand_forecast.py does the same offline
+(e.g. a first pass over months of history).
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import DemandProfile, Ride, SystemConfig
+from services.demand_surge import Cell, hex_cell, hex_center
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+TRAINED_THROUGH_KEY = "demand_forecast_trained_through"
+
+
+def hour_of_week(at: datetime) -> int:
+    return at.weekday() * 24 + at.hour
+
+
+class DemandForecast:
+    """Seasonal (zone x hour-of-week) demand profile with incremental daily training"""
+
+    def __init__(self, size_km: float, alpha: float):
+        self.size_km = size_km
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        # Replaced wholesale after each trained day; readers never see a half-updated profile
+        self.zones: List[Cell] = []
+        self.expected = np.zeros((0, HOURS_PER_WEEK))
+        self.samples = np.zeros((0, HOURS_PER_WEEK), dtype=np.int64)
+        self.trained_through: Optional[date] = None
+
+    # --- Training -----------------------------------------------------------
+
+    def bin_day(self, db: Session, day: date) -> Tuple[List[Cell], np.ndarray]:
+        """(zones, zones x 24 pickup counts) for rides created on ``day``"""
+        lo = datetime.combine(day, datetime.min.time())
+        rows = db.query(Ride.created_at, Ride.pickup_location).filter(
+            Ride.created_at >= lo, Ride.created_at < lo + timedelta(days=1)
+        )
+        cells: List[Cell] = []
+        hours: List[int] = []
+        for created_at, pickup in rows:
+            try:
+                loc = json.loads(pickup)
+                cells.append(hex_cell(float(loc["lat"]), float(loc["lng"]), self.size_km))
+            except (TypeError, ValueError, KeyError):
+                continue
+            hours.append(created_at.hour)
+
+        zones = sorted(set(cells))
+        position = {cell: i for i, cell in enumerate(zones)}
+        counts = np.zeros((len(zones), 24))
+        np.add.at(counts, (np.array([position[c] for c in cells], dtype=np.int64), np.array(hours, dtype=np.int64)), 1)
+        return zones, counts
+
+    def fold_day(self, day: date, zones: List[Cell], counts: np.ndarray) -> None:
+        """Smooth one day's counts into its weekday columns (in memory)"""
+        with self._lock:
+            known = list(self.zones)
+            index = {cell: i for i, cell in enumerate(known)}
+            new = [cell for cell in zones if cell not in index]
+            for cell in new:
+                index[cell] = len(known)
+                known.append(cell)
+            expected = np.vstack([self.expected, np.zeros((len(new), HOURS_PER_WEEK))])
+            samples = np.vstack([self.samples, np.zeros((len(new), HOURS_PER_WEEK), dtype=np.int64)])
+
+            observed = np.zeros((len(known), 24))
+            if zones:
+                observed[[index[cell] for cell in zones]] = counts
+            cols = slice(day.weekday() * 24, day.weekday() * 24 + 24)
+            n = samples[:, cols] + 1
+            weight = np.maximum(self.alpha, 1.0 / n)
+            expected[:, cols] += weight * (observed - expected[:, cols])
+            samples[:, cols] = n
+
+            self.zones, self.expected, self.samples = known, expected, samples
+            self.trained_through = day
+
+    def train(self, db: Session, until: date) -> int:
+        """Train every untrained day up to ``until``; returns the number of days trained here"""
+        stored = self._stored_day(db)
+        if stored != self.trained_through:
+            self.load(db)
+        if stored is None:
+            first = db.query(func.min(Ride.created_at)).scalar()
+            if first is None:
+                return 0
+            day = first.date()
+        else:
+            day = stored + timedelta(days=1)
+
+        trained = 0
+        while day <= until:
+            zones, counts = self.bin_day(db, day)
+            if not self._claim(db, stored, day):
+                # Another worker trained it first; pick up its profile
+                db.rollback()
+                self.load(db)
+                break
+            try:
+                self.fold_day(day, zones, counts)
+                self._save_weekday(db, day.weekday())
+                db.commit()
+            except Exception:
+                db.rollback()
+                self.load(db)
+                raise
+            stored, day = day, day + timedelta(days=1)
+            trained += 1
+        if trained:
+            logger.info(f"Demand forecast trained {trained} day(s) through {stored}: {len(self.zones)} zones")
+        return trained
+
+    def _stored_day(self, db: Session) -> Optional[date]:
+        value = db.query(SystemConfig.value).filter(SystemConfig.key == TRAINED_THROUGH_KEY).scalar()
+        return date.fromisoformat(value) if value else None
+
+    def _claim(self, db: Session, previous: Optional[date], day: date) -> bool:
+        """Move trained_through from ``previous`` to ``day``; False if another worker did"""
+        if previous is None:
+            try:
+                with db.begin_nested():
+                    db.add(SystemConfig(key=TRAINED_THROUGH_KEY, value=day.isoformat()))
+            except IntegrityError:
+                return False
+            return True
+        return db.query(SystemConfig).filter(
+            SystemConfig.key == TRAINED_THROUGH_KEY,
+            SystemConfig.value == previous.isoformat(),
+        ).update({SystemConfig.value: day.isoformat()}, synchronize_session=False) == 1
+
+    def _save_weekday(self, db: Session, weekday: int) -> None:
+        """Replace the stored profile rows of one weekday (24 hours x all zones)"""
+        lo = weekday * 24
+        db.query(DemandProfile).filter(
+            DemandProfile.hour_of_week >= lo, DemandProfile.hour_of_week < lo + 24
+        ).delete(synchronize_session=False)
+        expected, samples = self.expected[:, lo:lo + 24], self.samples[:, lo:lo + 24]
+        rows, hours = np.nonzero(samples)
+        db.bulk_insert_mappings(DemandProfile, [
+            {
+                "zone_q": self.zones[row][0], "zone_r": self.zones[row][1], "hour_of_week": lo + int(hour),
+                "expected": float(expected[row, hour]), "samples": int(samples[row, hour]),
+            }
+            for row, hour in zip(rows.tolist(), hours.tolist())
+        ])
+
+    def load(self, db: Session) -> None:
+        """Replace the in-memory profile with the stored one"""
+        stored = self._stored_day(db)
+        rows = db.query(
+            DemandProfile.zone_q, DemandProfile.zone_r, DemandProfile.hour_of_week,
+            DemandProfile.expected, DemandProfile.samples
+        ).all()
+        zones = sorted({(q, r) for q, r, _, _, _ in rows})
+        index = {cell: i for i, cell in enumerate(zones)}
+        expected = np.zeros((len(zones), HOURS_PER_WEEK))
+        samples = np.zeros((len(zones), HOURS_PER_WEEK), dtype=np.int64)
+        for q, r, hour, value, n in rows:
+            expected[index[(q, r)], hour] = value
+            samples[index[(q, r)], hour] = n
+        with self._lock:
+            self.zones, self.expected, self.samples = zones, expected, samples
+            self.trained_through = stored
+
+    # --- Forecast -----------------------------------------------------------
+
+    def forecast(self, hours: int, limit: int, at: Optional[datetime] = None) -> Dict:
+        """Expected pickups per zone for ``hours`` hours from the current hour, busiest zones first"""
+        start = (at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+        cols = (hour_of_week(start) + np.arange(hours)) % HOURS_PER_WEEK
+        with self._lock:
+            zones, expected, trained_through = self.zones, self.expected, self.trained_through
+
+        values = expected[:, cols]
+        totals = values.sum(axis=1)
+        order = [i for i in np.argsort(-totals, kind="stable")[:limit].tolist() if totals[i] > 0]
+        items = []
+        for i in order:
+            lat, lng = hex_center(zones[i], self.size_km)
+            items.append({
+                "zone": f"{zones[i][0]}:{zones[i][1]}",
+                "lat": round(lat, 6),
+                "lng": round(lng, 6),
+                "total": round(float(totals[i]), 2),
+                "expected": [round(float(v), 2) for v in values[i]],
+            })
+        return {
+            "trained_through": trained_through.isoformat() if trained_through else None,
+            "zone_km": self.size_km,
+            "hours": [(start + timedelta(hours=h)).isoformat() for h in range(hours)],
+            "zones": items,
+        }
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "zones": len(self.zones),
+            "trained_through": self.trained_through.isoformat() if self.trained_through else None,
+        }
+
+
+def _train(session_factory) -> int:
+    db = session_factory()
+    try:
+        return demand_forecast.train(db, datetime.utcnow().date() - timedelta(days=1))
+    finally:
+        db.close()
+
+
+async def run_demand_forecast(session_factory, interval: float) -> None:
+    """Background loop started from main.lifespan: train new complete days"""
+    while True:
+        try:
+            await asyncio.to_thread(_train, session_factory)
+        except Exception as e:
+            logger.warning(f"Demand forecast training failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Global demand forecast instance
+demand_forecast = DemandForecast(size_km=settings.forecast_zone_km, alpha=settings.forecast_alpha)
@@ -0,0 +1,307 @@
+"""
+Automatic surge from supply and demand per hexagonal cell
+
+On-duty drivers and pending rides are binned into hexagonal cells as events
+arrive (/driver/status, order creation, accept, cancel), so a tick never scans
+a table. Every SURGE_TICK_SECONDS the background loop turns each active cell's
+demand/supply ratio into an exponentially smoothed value and publishes the
+resulting multipliers; PricingSnapshot.surge_multiplier takes the higher of
+this and the manual SurgeIndex.
+
+The tracked positions themselves are kept whether or not automatic surge is
+enabled: the dispatcher heatmap (services.live_map) freezes them into its
+snapshots. SURGE_AUTO_ENABLED only gates the multipliers.
+
+Each worker only sees its own events, so its positions and counters are
+re-seeded from the database every SURGE_RESYNC_SECONDS (two indexed queries).
+Multipliers must not differ between workers, though, or the same trip would be
+priced differently depending on which process serves it. So per tick slot one worker
+claims the ``surge_auto_state`` SystemConfig row with a conditional UPDATE,
+re-seeds from the database, smooths on top of the stored EWMA and writes the
+result back; every other worker adopts the stored multipliers. The row is not
+a tariff, so writing it does not bump the config version.
+"""
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import DriverStatus, Ride, SystemConfig
+
+logger = logging.getLogger(__name__)
+
+SURGE_STATE_KEY = "surge_auto_state"
+
+KM_PER_DEG_LAT = 111.32
+SQRT3 = math.sqrt(3)
+
+Cell = Tuple[int, int]
+Position = Tuple[float, float]
+
+
+def hex_cell(lat: float, lng: float, size_km: float) -> Cell:
+    """Axial (q, r) of the pointy-top hexagon with circumradius ``size_km`` containing the point"""
+    x = lng * KM_PER_DEG_LAT * math.cos(math.radians(lat))
+    y = lat * KM_PER_DEG_LAT
+    q = (SQRT3 / 3 * x - y / 3) / size_km
+    r = (2 / 3 * y) / size_km
+    # Cube rounding
+    s = -q - r
+    rq, rr, rs = round(q), round(r), round(s)
+    dq, dr, ds = abs(rq - q), abs(rr - r), abs(rs - s)
+    if dq > dr and dq > ds:
+        rq = -rr - rs
+    elif dr > ds:
+        rr = -rq - rs
+    return int(rq), int(rr)
+
+
+def hex_center(cell: Cell, size_km: float) -> Tuple[float, float]:
+    """Approximate (lat, lng) of a cell center (inverse of hex_cell)"""
+    q, r = cell
+    y = size_km * 1.5 * r
+    x = size_km * SQRT3 * (q + r / 2)
+    lat = y / KM_PER_DEG_LAT
+    return lat, x / (KM_PER_DEG_LAT * math.cos(math.radians(lat)))
+
+
+class DemandSurge:
+    """Per-cell supply/demand counters, EWMA smoothing and published multipliers"""
+
+    def __init__(self, enabled: bool, size_km: float, alpha: float, threshold: float,
+                 sensitivity: float, max_multiplier: float):
+        self.enabled = enabled
+        self.size_km = size_km
+        self.alpha = alpha
+        self.threshold = threshold
+        self.sensitivity = sensitivity
+        self.max_multiplier = max_multiplier
+        self._lock = threading.Lock()
+        self._drivers: Dict[int, Position] = {}
+        self._rides: Dict[int, Position] = {}  # Pending pickups
+        self._supply: Counter = Counter()
+        self._demand: Counter = Counter()
+        self._smoothed: Dict[Cell, float] = {}
+        # Replaced wholesale on every tick; readers never see a half-built map
+        self._multipliers: Dict[Cell, float] = {}
+        self.ticks = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._multipliers)
+
+    def cell(self, lat: float, lng: float) -> Cell:
+        return hex_cell(lat, lng, self.size_km)
+
+    # --- Events -------------------------------------------------------------
+
+    def driver_update(self, driver_id: int, is_on_duty: bool,
+                      lat: Optional[float], lng: Optional[float]) -> None:
+        position = (lat, lng) if is_on_duty and lat is not None and lng is not None else None
+        with self._lock:
+            self._move(self._drivers, self._supply, driver_id, position)
+
+    def ride_opened(self, ride_id: int, lat: float, lng: float) -> None:
+        with self._lock:
+            self._move(self._rides, self._demand, ride_id, (lat, lng))
+
+    def ride_closed(self, ride_id: int) -> None:
+        with self._lock:
+            self._move(self._rides, self._demand, ride_id, None)
+
+    def _move(self, positions: Dict[int, Position], counts: Counter, key: int,
+              position: Optional[Position]) -> None:
+        old = positions.pop(key, None)
+        if old is not None:
+            cell = self.cell(*old)
+            counts[cell] -= 1
+            if counts[cell] <= 0:
+                del counts[cell]
+        if position is not None:
+            positions[key] = position
+            counts[self.cell(*position)] += 1
+
+    def positions(self) -> Tuple[List[Position], List[Position]]:
+        """Copies of the on-duty driver and pending pickup positions"""
+        with self._lock:
+            return list(self._drivers.values()), list(self._rides.values())
+
+    # --- Ticks --------------------------------------------------------------
+
+    def tick(self) -> Dict[Cell, float]:
+        """Smooth demand/supply per active cell and publish the new multipliers"""
+        if not self.enabled:
+            return {}
+        with self._lock:
+            cells = set(self._supply) | set(self._demand) | set(self._smoothed)
+            smoothed: Dict[Cell, float] = {}
+            multipliers: Dict[Cell, float] = {}
+            for cell in cells:
+                ratio = self._demand.get(cell, 0) / max(self._supply.get(cell, 0), 1)
+                value = self.alpha * ratio + (1 - self.alpha) * self._smoothed.get(cell, 0.0)
+                if value < 0.01 and cell not in self._demand:
+                    continue  # fully decayed; forget the cell
+                smoothed[cell] = value
+                excess = value - self.threshold
+                if excess > 0:
+                    # 0.1 steps keep quote cache keys stable between ticks
+                    multiplier = round(min(self.max_multiplier, 1 + self.sensitivity * excess), 1)
+                    if multiplier > 1.0:
+                        multipliers[cell] = multiplier
+            self._smoothed = smoothed
+            self.ticks += 1
+        self._multipliers = multipliers
+        return multipliers
+
+    def multiplier(self, lat: Optional[float], lng: Optional[float]) -> float:
+        multipliers = self._multipliers
+        if not multipliers or lat is None or lng is None:
+            return 1.0
+        return multipliers.get(self.cell(lat, lng), 1.0)
+
+    # --- Cross-worker publishing --------------------------------------------
+
+    def sync(self, db: Session, slot: int) -> Dict[Cell, float]:
+        """Run one tick slot: publish the multipliers if this worker claims the slot, else adopt them"""
+        if not self.enabled:
+            return {}
+        row = db.query(SystemConfig).filter(SystemConfig.key == SURGE_STATE_KEY).first()
+        raw = row.value if row else None
+        state = _load_state(raw)
+        if state["slot"] >= slot or not self._claim(db, raw, state, slot):
+            # Someone else publishes this slot (possibly still computing: keep the last one until then)
+            self._multipliers = _cells_from_json(state["multipliers"])
+            return self._multipliers
+
+        self.seed(db)
+        with self._lock:
+            self._smoothed = _cells_from_json(state["smoothed"])
+        multipliers = self.tick()
+        with self._lock:
+            published = _dump_state(slot, self._smoothed, multipliers)
+        db.query(SystemConfig).filter(SystemConfig.key == SURGE_STATE_KEY).update(
+            {SystemConfig.value: published}, synchronize_session=False
+        )
+        db.commit()
+        return multipliers
+
+    @staticmethod
+    def _claim(db: Session, raw: Optional[str], state: Dict[str, Any], slot: int) -> bool:
+        """Move the stored slot forward; only one worker's conditional write can succeed"""
+        claimed = json.dumps({**state, "slot": slot})
+        if raw is None:
+            try:
+                with db.begin_nested():
+                    db.add(SystemConfig(key=SURGE_STATE_KEY, value=claimed))
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+                return False
+        updated = db.query(SystemConfig).filter(
+            SystemConfig.key == SURGE_STATE_KEY, SystemConfig.value == raw
+        ).update({SystemConfig.value: claimed}, synchronize_session=False)
+        db.commit()
+        return updated == 1
+
+    def seed(self, db: Session) -> None:
+        """Rebuild the positions and counters from on-duty drivers and pending rides"""
+        drivers = db.query(DriverStatus.driver_id, DriverStatus.last_lat, DriverStatus.last_lng).filter(
+            DriverStatus.is_on_duty == True
+        ).all()
+        rides = db.query(Ride.id, Ride.pickup_location).filter(Ride.status == "pending").all()
+
+        driver_positions: Dict[int, Position] = {}
+        for driver_id, lat, lng in drivers:
+            if lat is not None and lng is not None:
+                driver_positions[driver_id] = (lat, lng)
+        ride_positions: Dict[int, Position] = {}
+        for ride_id, pickup in rides:
+            try:
+                loc = json.loads(pickup)
+                ride_positions[ride_id] = (float(loc["lat"]), float(loc["lng"]))
+            except Exception:
+                continue
+        supply = Counter(self.cell(*p) for p in driver_positions.values())
+        demand = Counter(self.cell(*p) for p in ride_positions.values())
+
+        with self._lock:
+            self._drivers = driver_positions
+            self._rides = ride_positions
+            self._supply = supply
+            self._demand = demand
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ticks": self.ticks,
+                "drivers": len(self._drivers),
+                "pending_rides": len(self._rides),
+                "active_cells": len(self._smoothed),
+                "surging_cells": len(self._multipliers),
+                "max_multiplier": max(self._multipliers.values(), default=1.0),
+            }
+
+
+def _load_state(raw: Optional[str]) -> Dict[str, Any]:
+    state = {"slot": -1, "smoothed": [], "multipliers": []}
+    if raw:
+        try:
+            state.update(json.loads(raw))
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid {SURGE_STATE_KEY} in system_config, starting over")
+    return state
+
+
+def _dump_state(slot: int, smoothed: Dict[Cell, float], multipliers: Dict[Cell, float]) -> str:
+    return json.dumps({
+        "slot": slot,
+        "smoothed": [[q, r, round(value, 4)] for (q, r), value in smoothed.items()],
+        "multipliers": [[q, r, value] for (q, r), value in multipliers.items()],
+    })
+
+
+def _cells_from_json(items) -> Dict[Cell, float]:
+    return {(int(q), int(r)): float(value) for q, r, value in items}
+
+
+async def run_demand_surge(session_factory, interval: float, resync_seconds: float) -> None:
+    """Background loop started from main.lifespan; without automatic surge it only re-seeds"""
+    since_resync = resync_seconds
+    while True:
+        try:
+            resync = since_resync >= resync_seconds
+            if resync or demand_surge.enabled:
+                db = session_factory()
+                try:
+                    if resync:
+                        demand_surge.seed(db)
+                        since_resync = 0.0
+                    # Wall-clock slots line up across workers
+                    demand_surge.sync(db, int(time.time() // interval))
+                finally:
+                    db.close()
+        except Exception as e:
+            logger.warning(f"Demand surge tick failed: {e}")
+        await asyncio.sleep(interval)
+        since_resync += interval
+
+
+# Global demand surge instance
+demand_surge = DemandSurge(
+    enabled=settings.surge_auto_enabled,
+    size_km=settings.surge_hex_size_km,
+    alpha=settings.surge_ewma_alpha,
+    threshold=settings.surge_demand_threshold,
+    sensitivity=settings.surge_sensitivity,
+    max_multiplier=settings.surge_max_multiplier,
+)
@@ -0,0 +1,70 @@
+"""
+In-process cache of driver duty state and last known position
+
+Ride acceptance checks eligibility on every call; reading DriverStatus each
+time costs a query per accept. The cache is refreshed by /driver/status in the
+same worker and expires after DRIVER_STATE_TTL_SECONDS, so a change made
+through another worker is picked up within that window.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import DriverStatus
+
+
+@dataclass
+class DriverState:
+    driver_id: int
+    is_on_duty: bool
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    city: Optional[str] = None
+    loaded_at: float = 0.0
+
+
+class DriverStateCache:
+    """Driver id -> DriverState with TTL, falling back to DriverStatus on a miss"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._states: Dict[int, DriverState] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, driver_id: int) -> Optional[DriverState]:
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(driver_id)
+        if state and now - state.loaded_at < self.ttl_seconds:
+            return state
+
+        ds = db.query(DriverStatus).filter(DriverStatus.driver_id == driver_id).first()
+        if not ds:
+            self.invalidate(driver_id)
+            return None
+        return self.update(driver_id, bool(ds.is_on_duty), ds.last_lat, ds.last_lng, ds.city)
+
+    def update(
+        self,
+        driver_id: int,
+        is_on_duty: bool,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        city: Optional[str] = None,
+    ) -> DriverState:
+        state = DriverState(driver_id, is_on_duty, lat, lng, city, time.monotonic())
+        with self._lock:
+            self._states[driver_id] = state
+        return state
+
+    def invalidate(self, driver_id: int) -> None:
+        with self._lock:
+            self._states.pop(driver_id, None)
+
+
+# Global driver state cache instance
+driver_state = DriverStateCache(settings.driver_state_ttl_seconds)
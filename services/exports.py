@@ -0,0 +1,185 @@
+"""
+Streaming exports of rides, payments and transactions (CSV / XLSX)
+
+Rows are selected as plain column tuples with ``yield_per`` (a server-side
+cursor on PostgreSQL), so memory stays flat no matter how many rows match.
+CSV is yielded in chunks as rows arrive. XLSX is written by xlsxwriter in
+``constant_memory`` mode to a temporary file, which is then streamed and
+removed; a workbook can only be zipped once it is complete.
+
+Exports run in the threadpool (sync generators under StreamingResponse) with
+their own session, so a long export neither blocks the event loop nor holds
+the request's session.
+"""
+import csv
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import xlsxwriter
+from sqlalchemy.orm import Query, Session
+
+from config import settings
+from database import SessionLocal
+from models import Payment, Ride, Transaction, User
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+FILE_CHUNK_BYTES = 64 * 1024
+# Excel's row limit minus the header row; larger exports continue on a new sheet
+XLSX_SHEET_ROWS = 1_048_575
+# Spreadsheet apps run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    date_from: Optional[datetime] = None  # inclusive
+    date_to: Optional[datetime] = None  # exclusive
+    city: Optional[str] = None
+    driver_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Dataset:
+    columns: List[Tuple[str, object]]  # (header, column expression)
+    build: Callable[[Session, list, ExportFilters], Query]
+
+
+def _rides(db: Session, columns: list, f: ExportFilters) -> Query:
+    q = db.query(*columns)
+    if f.date_from:
+        q = q.filter(Ride.created_at >= f.date_from)
+    if f.date_to:
+        q = q.filter(Ride.created_at < f.date_to)
+    if f.city:
+        q = q.filter(Ride.city == f.city)
+    if f.driver_id:
+        q = q.filter(Ride.driver_id == f.driver_id)
+    return q.order_by(Ride.id)
+
+
+def _payments(db: Session, columns: list, f: ExportFilters) -> Query:
+    q = db.query(*columns).select_from(Payment).outerjoin(Ride, Payment.ride_id == Ride.id)
+    if f.date_from:
+        q = q.filter(Payment.created_at >= f.date_from)
+    if f.date_to:
+        q = q.filter(Payment.created_at < f.date_to)
+    if f.city:
+        q = q.filter(Ride.city == f.city)
+    if f.driver_id:
+        q = q.filter(Ride.driver_id == f.driver_id)
+    return q.order_by(Payment.id)
+
+
+def _transactions(db: Session, columns: list, f: ExportFilters) -> Query:
+    q = db.query(*columns).select_from(Transaction).outerjoin(User, Transaction.user_id == User.id)
+    if f.date_from:
+        q = q.filter(Transaction.created_at >= f.date_from)
+    if f.date_to:
+        q = q.filter(Transaction.created_at < f.date_to)
+    if f.city:
+        q = q.filter(User.city == f.city)
+    if f.driver_id:
+        q = q.filter(Transaction.user_id == f.driver_id)
+    return q.order_by(Transaction.id)
+
+
+DATASETS = {
+    "rides": Dataset([
+        ("id", Ride.id), ("created_at", Ride.created_at), ("completed_at", Ride.completed_at),
+        ("status", Ride.status), ("city", Ride.city), ("vehicle_type", Ride.vehicle_type),
+        ("driver_id", Ride.driver_id), ("customer_id", Ride.customer_id), ("fare", Ride.fare),
+        ("distance_km", Ride.distance_km), ("duration_min", Ride.duration),
+    ], _rides),
+    "payments": Dataset([
+        ("id", Payment.id), ("created_at", Payment.created_at), ("ride_id", Payment.ride_id),
+        ("driver_id", Ride.driver_id), ("city", Ride.city), ("amount", Payment.amount),
+        ("currency", Payment.currency), ("status", Payment.status),
+        ("payment_method", Payment.payment_method), ("transaction_id", Payment.transaction_id),
+    ], _payments),
+    "transactions": Dataset([
+        ("id", Transaction.id), ("created_at", Transaction.created_at), ("user_id", Transaction.user_id),
+        ("city", User.city), ("transaction_type", Transaction.transaction_type),
+        ("amount", Transaction.amount), ("ride_id", Transaction.ride_id),
+        ("description", Transaction.description),
+    ], _transactions),
+}
+
+
+def csv_cell(value):
+    """Quote text that a spreadsheet would evaluate (CSV injection); other values pass through"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class ExportService:
+    """Streams one dataset as CSV or XLSX chunks"""
+
+    def __init__(self, session_factory, batch_size: int):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    def _rows(self, name: str, filters: ExportFilters) -> Iterator[tuple]:
+        dataset = DATASETS[name]
+        db = self.session_factory()
+        try:
+            query = dataset.build(db, [col for _, col in dataset.columns], filters)
+            yield from query.yield_per(self.batch_size)
+        finally:
+            db.close()
+
+    def headers(self, name: str) -> List[str]:
+        return [header for header, _ in DATASETS[name].columns]
+
+    def csv(self, name: str, filters: ExportFilters) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM so Excel opens Cyrillic/Latin Uzbek text as UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(self.headers(name))
+        for count, row in enumerate(self._rows(name, filters), 1):
+            writer.writerow([csv_cell(value) for value in row])
+            if count % self.batch_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    def xlsx(self, name: str, filters: ExportFilters) -> Iterator[bytes]:
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+            sheet = workbook.add_worksheet(name)
+            date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+            bold = workbook.add_format({"bold": True})
+            sheet.write_row(0, 0, self.headers(name), bold)
+            # constant_memory flushes each row once the next one starts
+            for count, row in enumerate(self._rows(name, filters)):
+                row_index = count % XLSX_SHEET_ROWS + 1
+                if count and row_index == 1:
+                    sheet = workbook.add_worksheet(f"{name}_{count // XLSX_SHEET_ROWS + 1}")
+                    sheet.write_row(0, 0, self.headers(name), bold)
+                for col_index, value in enumerate(row):
+                    if isinstance(value, datetime):
+                        sheet.write_datetime(row_index, col_index, value, date_format)
+                    elif isinstance(value, (int, float)):
+                        sheet.write_number(row_index, col_index, value)
+                    elif value is not None:
+                        # Never let free text (descriptions) be parsed as a formula
+                        sheet.write_string(row_index, col_index, str(value))
+            workbook.close()
+
+            with open(path, "rb") as fh:
+                while chunk := fh.read(FILE_CHUNK_BYTES):
+                    yield chunk
+        finally:
+            os.remove(path)
+
+
+# Global export service instance
+export_service = ExportService(SessionLocal, settings.export_batch_size)
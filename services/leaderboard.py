@@ -0,0 +1,233 @@
+"""
+Driver leaderboards (daily / weekly / monthly x rides / revenue / km / rating)
+
+Each (period, period key, metric) board is an in-process sorted set: a score
+per driver plus a list of ``(-score, driver_id)`` kept sorted with bisect, the
+same shape as a Redis ZSET. complete_ride adds the ride to the current board
+of every period, so top-N is a slice and a driver's rank is one bisect.
+
+Boards are rebuilt from rides with one grouped query per period at startup
+and every LEADERBOARD_RESYNC_SECONDS (main.lifespan), which also picks up
+completions handled by other workers. Only the current and previous key of
+each period are kept.
+
+The rating board holds the driver's profile rating, listed for drivers who
+completed at least one ride in the period.
+"""
+import asyncio
+import logging
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Ride, User
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("daily", "weekly", "monthly")
+METRICS = ("rides", "revenue", "km", "rating")
+
+
+def period_bounds(period: str, at: datetime) -> Tuple[str, datetime, datetime]:
+    """(key, start, end) of the period containing ``at`` (UTC, end exclusive)"""
+    day = datetime(at.year, at.month, at.day)
+    if period == "daily":
+        return day.strftime("%Y-%m-%d"), day, day + timedelta(days=1)
+    if period == "weekly":
+        start = day - timedelta(days=day.weekday())
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}", start, start + timedelta(days=7)
+    if period == "monthly":
+        start = day.replace(day=1)
+        return start.strftime("%Y-%m"), start, (start + timedelta(days=32)).replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+class SortedScores:
+    """Score per member plus a sorted (-score, member) index"""
+
+    def __init__(self):
+        self._scores: Dict[int, float] = {}
+        self._order: List[Tuple[float, int]] = []
+
+    @classmethod
+    def from_scores(cls, scores: Dict[int, float]) -> "SortedScores":
+        board = cls()
+        board._scores = dict(scores)
+        board._order = sorted((-score, member) for member, score in scores.items())
+        return board
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def set(self, member: int, score: float) -> None:
+        old = self._scores.get(member)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, member))]
+        self._scores[member] = score
+        insort(self._order, (-score, member))
+
+    def incr(self, member: int, delta: float) -> float:
+        score = self._scores.get(member, 0.0) + delta
+        self.set(member, score)
+        return score
+
+    def score(self, member: int) -> Optional[float]:
+        return self._scores.get(member)
+
+    def rank(self, member: int) -> Optional[int]:
+        """1-based rank, highest score first (ties: lower driver id first)"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return bisect_left(self._order, (-score, member)) + 1
+
+    def top(self, limit: int) -> List[Tuple[int, float]]:
+        return [(member, -neg) for neg, member in self._order[:limit]]
+
+
+class Leaderboard:
+    """All period/metric boards, updated on completion and resynced from the DB"""
+
+    def __init__(self):
+        self._boards: Dict[Tuple[str, str, str], SortedScores] = {}
+        self._keys: Dict[str, List[str]] = {period: [] for period in PERIODS}
+        self._lock = threading.Lock()
+
+    def _track_key(self, period: str, key: str) -> None:
+        """Remember a period key; keep the current and previous period only"""
+        keys = self._keys[period]
+        if key in keys:
+            return
+        keys.append(key)
+        keys.sort()
+        for stale in keys[:-2]:
+            for metric in METRICS:
+                self._boards.pop((period, stale, metric), None)
+        del keys[:-2]
+
+    def _board(self, period: str, key: str, metric: str) -> SortedScores:
+        board = self._boards.get((period, key, metric))
+        if board is None:
+            board = self._boards[(period, key, metric)] = SortedScores()
+            self._track_key(period, key)
+        return board
+
+    def ride_completed(self, driver_id: int, fare: float, km: float, rating: Optional[float],
+                       at: Optional[datetime] = None) -> None:
+        at = at or datetime.utcnow()
+        with self._lock:
+            for period in PERIODS:
+                key = period_bounds(period, at)[0]
+                self._board(period, key, "rides").incr(driver_id, 1)
+                self._board(period, key, "revenue").incr(driver_id, float(fare or 0))
+                self._board(period, key, "km").incr(driver_id, float(km or 0))
+                self._board(period, key, "rating").set(driver_id, float(rating if rating is not None else 5.0))
+
+    @staticmethod
+    def validate(period: str, metric: str, limit: int) -> int:
+        """Check query parameters; returns limit clamped to 1..100"""
+        if period not in PERIODS:
+            raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+        if metric not in METRICS:
+            raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(METRICS)}")
+        return max(1, min(limit, 100))
+
+    @staticmethod
+    def with_names(db: Session, board: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach full_name to the top entries with one IN query"""
+        ids = [entry["driver_id"] for entry in board["top"]]
+        if ids:
+            names = dict(db.query(User.id, User.full_name).filter(User.id.in_(ids)).all())
+            for entry in board["top"]:
+                entry["full_name"] = names.get(entry["driver_id"])
+        return board
+
+    def top(self, period: str, metric: str, limit: int, at: Optional[datetime] = None) -> Dict:
+        key = period_bounds(period, at or datetime.utcnow())[0]
+        with self._lock:
+            board = self._boards.get((period, key, metric))
+            entries = board.top(limit) if board else []
+            total = len(board) if board else 0
+        return {
+            "period": period,
+            "period_key": key,
+            "metric": metric,
+            "total_drivers": total,
+            "top": [
+                {"rank": i + 1, "driver_id": driver_id, "score": round(score, 2)}
+                for i, (driver_id, score) in enumerate(entries)
+            ],
+        }
+
+    def rank(self, period: str, metric: str, driver_id: int, at: Optional[datetime] = None) -> Dict:
+        key = period_bounds(period, at or datetime.utcnow())[0]
+        with self._lock:
+            board = self._boards.get((period, key, metric))
+            rank = board.rank(driver_id) if board else None
+            score = board.score(driver_id) if board else None
+            total = len(board) if board else 0
+        return {
+            "period": period,
+            "period_key": key,
+            "metric": metric,
+            "rank": rank,
+            "score": round(score, 2) if score is not None else None,
+            "total_drivers": total,
+        }
+
+    def seed(self, db: Session, at: Optional[datetime] = None) -> None:
+        """Rebuild the current boards with one grouped query per period"""
+        at = at or datetime.utcnow()
+        fresh: Dict[Tuple[str, str, str], SortedScores] = {}
+        for period in PERIODS:
+            key, start, end = period_bounds(period, at)
+            rows = db.query(
+                Ride.driver_id, func.count(Ride.id), func.sum(Ride.fare),
+                func.sum(Ride.distance_km), User.rating
+            ).join(User, User.id == Ride.driver_id).filter(
+                Ride.status == "completed",
+                Ride.completed_at >= start,
+                Ride.completed_at < end,
+            ).group_by(Ride.driver_id, User.rating).all()
+
+            scores = {metric: {} for metric in METRICS}
+            for driver_id, rides, revenue, km, rating in rows:
+                scores["rides"][driver_id] = float(rides)
+                scores["revenue"][driver_id] = float(revenue or 0)
+                scores["km"][driver_id] = float(km or 0)
+                scores["rating"][driver_id] = float(rating if rating is not None else 5.0)
+            for metric in METRICS:
+                fresh[(period, key, metric)] = SortedScores.from_scores(scores[metric])
+
+        with self._lock:
+            self._boards.update(fresh)
+            for period, key, _ in fresh:
+                self._track_key(period, key)
+
+
+def _seed(session_factory) -> None:
+    db = session_factory()
+    try:
+        leaderboard.seed(db)
+    finally:
+        db.close()
+
+
+async def run_leaderboard_resync(session_factory, interval: float) -> None:
+    """Background loop started from main.lifespan"""
+    while True:
+        try:
+            await asyncio.to_thread(_seed, session_factory)
+        except Exception as e:
+            logger.warning(f"Leaderboard resync failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Global leaderboard instance
+leaderboard = Leaderboard()
@@ -0,0 +1,140 @@
+"""
+Live driver/pickup positions and heatmap tiles for the dispatcher map
+
+On-duty driver positions and pending pickups are the ones services.demand_surge
+already tracks (fed by /driver/status, order creation, accept and cancel, and
+re-seeded from the database every SURGE_RESYNC_SECONDS); this module keeps no
+copy of its own.
+
+When a heatmap request finds the snapshot older than HEATMAP_TICK_SECONDS,
+those positions are frozen into NumPy arrays. Requests bin the frozen points
+into Web Mercator cells (tiles of zoom + CELL_ZOOM_OFFSET, i.e. 8 x 8 cells
+per map tile) with np.unique; the result is cached per (tick, zoom, bbox), so
+all dispatchers looking at the same view within one tick share one
+aggregation and no request touches the database.
+"""
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+from config import settings
+from services.demand_surge import DemandSurge, demand_surge
+
+CELL_ZOOM_OFFSET = 3
+MAX_CELL_ZOOM = 22
+MAX_MERCATOR_LAT = 85.05112878
+HEATMAP_COLUMNS = ["x", "y", "lat", "lng", "drivers", "pickups"]
+
+Position = Tuple[float, float]
+BBox = Tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+def tile_xy(lat: np.ndarray, lng: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator (slippy map) tile indices of each point at ``zoom``"""
+    n = 2 ** zoom
+    lat = np.radians(np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = np.floor((lng + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_center(x: int, y: int, zoom: int) -> Position:
+    n = 2 ** zoom
+    lng = (x + 0.5) / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / n))))
+    return lat, lng
+
+
+class LiveMap:
+    """Per-tick NumPy snapshots of the demand_surge positions, binned into heatmaps"""
+
+    def __init__(self, source: DemandSurge, tick_seconds: float, cache_size: int = 256):
+        self.source = source
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self._frozen = {"drivers": np.zeros((0, 2)), "pickups": np.zeros((0, 2))}
+        self._frozen_at: Optional[float] = None  # time.monotonic() of the last tick
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        self.ticks = 0
+        self.as_of: Optional[datetime] = None
+
+    def tick(self) -> None:
+        """Freeze the current positions; cached heatmaps of the previous tick expire"""
+        drivers, pickups = self.source.positions()
+        with self._lock:
+            self._frozen = {
+                "drivers": np.array(drivers, dtype=np.float64).reshape(-1, 2),
+                "pickups": np.array(pickups, dtype=np.float64).reshape(-1, 2),
+            }
+            self._frozen_at = time.monotonic()
+            self._cache.clear()
+            self.ticks += 1
+            self.as_of = datetime.utcnow()
+
+    def _stale(self) -> bool:
+        return self._frozen_at is None or time.monotonic() - self._frozen_at >= self.tick_seconds
+
+    def heatmap(self, zoom: int, bbox: Optional[BBox] = None) -> Dict:
+        """Driver and pickup counts per cell of the given map zoom (cached per tick)"""
+        if self._stale():
+            self.tick()
+        with self._lock:
+            key = (self.ticks, zoom, bbox)
+            cached = self._cache.get(key)
+            frozen, as_of = self._frozen, self.as_of
+        if cached is not None:
+            return cached
+
+        cell_zoom = min(zoom + CELL_ZOOM_OFFSET, MAX_CELL_ZOOM)
+        counts: Dict[Tuple[int, int], list] = {}
+        for column, name in ((0, "drivers"), (1, "pickups")):
+            points = frozen[name]
+            if bbox is not None and len(points):
+                min_lng, min_lat, max_lng, max_lat = bbox
+                inside = (points[:, 0] >= min_lat) & (points[:, 0] <= max_lat) \
+                    & (points[:, 1] >= min_lng) & (points[:, 1] <= max_lng)
+                points = points[inside]
+            if not len(points):
+                continue
+            x, y = tile_xy(points[:, 0], points[:, 1], cell_zoom)
+            cells, totals = np.unique(np.stack([x, y], axis=1), axis=0, return_counts=True)
+            for (cx, cy), total in zip(cells.tolist(), totals.tolist()):
+                counts.setdefault((cx, cy), [0, 0])[column] = total
+
+        rows = []
+        for (cx, cy), (drivers, pickups) in sorted(counts.items()):
+            lat, lng = tile_center(cx, cy, cell_zoom)
+            rows.append([cx, cy, round(lat, 6), round(lng, 6), drivers, pickups])
+        result = {
+            "zoom": zoom,
+            "cell_zoom": cell_zoom,
+            "tick": key[0],
+            "as_of": as_of.isoformat() if as_of else None,
+            "columns": HEATMAP_COLUMNS,
+            "cells": rows,
+            "drivers": int(sum(r[4] for r in rows)),
+            "pickups": int(sum(r[5] for r in rows)),
+        }
+        with self._lock:
+            if self.ticks == key[0]:
+                self._cache[key] = result
+        return result
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "as_of": self.as_of.isoformat() if self.as_of else None,
+                "drivers": len(self._frozen["drivers"]),
+                "pickups": len(self._frozen["pickups"]),
+                "cached_views": len(self._cache),
+            }
+
+
+# Global live map instance
+live_map = LiveMap(demand_surge, settings.heatmap_tick_seconds, cache_size=settings.heatmap_cache_size)
@@ -1,7 +1,23 @@
+"""
+Map services: OSRM routing and Nominatim reverse geocoding
+
+All calls share one aiohttp ClientSession opened in main.lifespan
+(MapService.startup / shutdown): keep-alive connections are reused across
+orders instead of a TCP/TLS handshake per call, with pool limits
+(MAP_HTTP_MAX_CONNECTIONS, MAP_HTTP_PER_HOST), a DNS cache, connect/read
+timeouts and a semaphore bounding in-flight requests (MAP_HTTP_CONCURRENCY).
+Waiting for the semaphore is bounded by MAP_HTTP_TOTAL_TIMEOUT too.
+Outside the lifespan (scripts, tests) each call falls back to a one-off
+session with the same timeouts.
+"""
+import asyncio
+from contextlib import asynccontextmanager
 import aiohttp
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
 class MapService:
@@ -9,6 +25,60 @@ class MapService:
     
     OSRM_BASE_URL = "http://router.project-osrm.org/route/v1/driving/"
     NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+    HEADERS = {"User-Agent": "RoyalTaxi/1.0 (contact: admin@example.com)"}
+
+    _session: Optional[aiohttp.ClientSession] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _timeout() -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=settings.map_http_total_timeout,
+            connect=settings.map_http_connect_timeout,
+            sock_read=settings.map_http_read_timeout,
+        )
+
+    @classmethod
+    async def startup(cls) -> None:
+        """Open the shared session (main.lifespan)"""
+        if cls._session is not None and not cls._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=settings.map_http_max_connections,
+            limit_per_host=settings.map_http_per_host,
+            ttl_dns_cache=settings.map_http_dns_ttl_seconds,
+            keepalive_timeout=settings.map_http_keepalive_seconds,
+        )
+        cls._session = aiohttp.ClientSession(connector=connector, timeout=cls._timeout(), headers=cls.HEADERS)
+        cls._loop = asyncio.get_running_loop()
+        cls._semaphore = asyncio.Semaphore(settings.map_http_concurrency)
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close the shared session and its pooled connections"""
+        session, cls._session, cls._loop, cls._semaphore = cls._session, None, None, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    @classmethod
+    @asynccontextmanager
+    async def _get(cls, url: str, **kwargs):
+        """GET through the shared session, or a one-off session if it is not started"""
+        session = cls._session
+        if session is not None and not session.closed and cls._loop is asyncio.get_running_loop():
+            # Waiting for a slot counts against the total timeout, so a saturated
+            # pool fails like any other slow map call instead of queueing forever
+            await asyncio.wait_for(cls._semaphore.acquire(), settings.map_http_total_timeout)
+            try:
+                async with session.get(url, **kwargs) as response:
+                    yield response
+            finally:
+                cls._semaphore.release()
+            return
+        async with aiohttp.ClientSession(timeout=cls._timeout(), headers=cls.HEADERS) as one_off:
+            async with one_off.get(url, **kwargs) as response:
+                yield response
     
     @classmethod
     async def get_route(
@@ -22,25 +92,27 @@ class MapService:
         url = f"{cls.OSRM_BASE_URL}{start_lon},{start_lat};{end_lon},{end_lat}?overview=full&geometries=geojson"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.error(f"OSRM API xatosi: {response.status}")
-                        return {"error": "Yo'nalish topilmadi"}
-                    
-                    data = await response.json()
-                    
-                    if data.get('code') != 'Ok':
-                        return {"error": data.get('message', 'Nomalum xatolik yuz berdi')}
-                    
-                    # Faqat kerakli ma'lumotlarni qaytaramiz
-                    route = data['routes'][0]
-                    return {
-                        "distance": route['distance'],  # metrda
-                        "duration": route['duration'],  # sekundda
-                        "geometry": route['geometry']   # GeoJSON LineString
-                    }
-                
+            async with cls._get(url) as response:
+                if response.status != 200:
+                    logger.error(f"OSRM API xatosi: {response.status}")
+                    return {"error": "Yo'nalish topilmadi"}
+
+                data = await response.json()
+
+                if data.get('code') != 'Ok':
+                    return {"error": data.get('message', 'Nomalum xatolik yuz berdi')}
+
+                # Faqat kerakli ma'lumotlarni qaytaramiz
+                route = data['routes'][0]
+                return {
+                    "distance": route['distance'],  # metrda
+                    "duration": route['duration'],  # sekundda
+                    "geometry": route['geometry']   # GeoJSON LineString
+                }
+
+        except asyncio.TimeoutError:
+            logger.error("OSRM API javob bermadi (timeout)")
+            return {"error": "Xarita xizmati javob bermadi"}
         except Exception as e:
             logger.error(f"Xarita xizmatida xatolik: {str(e)}")
             return {"error": f"Xarita xizmatida xatolik: {str(e)}"}
@@ -60,23 +132,22 @@ class MapService:
             "accept-language": language,
             "addressdetails": 1
         }
-        headers = {
-            "User-Agent": "RoyalTaxi/1.0 (contact: admin@example.com)"
-        }
         try:
-            async with aiohttp.ClientSession(headers=headers) as session:
-                async with session.get(cls.NOMINATIM_REVERSE_URL, params=params) as resp:
-                    if resp.status != 200:
-                        logger.warning(f"Nominatim qaytardi: {resp.status}")
-                        return {}
-                    data = await resp.json()
-                    address = data.get("address", {}) or {}
-                    city = address.get("city") or address.get("town") or address.get("village") or address.get("state")
-                    return {
-                        "display_name": data.get("display_name"),
-                        "city": city,
-                        "address": address
-                    }
+            async with cls._get(cls.NOMINATIM_REVERSE_URL, params=params) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Nominatim qaytardi: {resp.status}")
+                    return {}
+                data = await resp.json()
+                address = data.get("address", {}) or {}
+                city = address.get("city") or address.get("town") or address.get("village") or address.get("state")
+                return {
+                    "display_name": data.get("display_name"),
+                    "city": city,
+                    "address": address
+                }
+        except asyncio.TimeoutError:
+            logger.warning("Nominatim javob bermadi (timeout)")
+            return {}
         except Exception as e:
             logger.error(f"Reverse geocoding xatosi: {e}")
             return {}
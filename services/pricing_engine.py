@@ -0,0 +1,236 @@
+"""
+Compiled tariff engine shared by the dispatcher, driver taximeter and admin preview
+
+All pricing inputs (vehicle tariffs, commission, active surge rules and
+additional service prices) are compiled into one immutable PricingSnapshot.
+The snapshot is rebuilt only when the SystemConfig version changes (see
+services.config_cache) and swapped in with a single assignment, so a quote
+never touches the database and every endpoint prices a trip the same way.
+
+Anything that changes a pricing input must call config_cache.bump_version.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import AdditionalService, SurgeArea, SurgePricing
+from services.config_cache import ConfigSnapshot, config_cache
+from services.demand_surge import demand_surge
+from services.surge import SurgeIndex, SurgeRule, SurgeZone
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+@dataclass(frozen=True)
+class Tariff:
+    vehicle_type: str
+    base_fare: float
+    per_km_rate: float
+    per_minute_rate: float
+
+
+@dataclass(frozen=True)
+class Quote:
+    vehicle_type: str
+    distance_km: float
+    duration_minutes: int
+    base_fare: float
+    distance_cost: float
+    time_cost: float
+    surge_multiplier: float
+    services_cost: float
+    total_fare: float
+    commission_rate: float
+    commission_amount: float
+    driver_earnings: float
+    per_km_rate: float
+    per_minute_rate: float
+
+    @property
+    def formula(self) -> str:
+        formula = f"{self.base_fare} + ({self.distance_km} × {self.per_km_rate}) + ({self.duration_minutes} × {self.per_minute_rate})"
+        if self.surge_multiplier != 1.0:
+            formula = f"({formula}) × {self.surge_multiplier}"
+        if self.services_cost:
+            formula = f"{formula} + {self.services_cost}"
+        return f"{formula} = {self.total_fare} so'm"
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Response body used by the taximeter and admin preview endpoints"""
+        return {
+            "vehicle_type": self.vehicle_type,
+            "distance_km": self.distance_km,
+            "duration_minutes": self.duration_minutes,
+            "breakdown": {
+                "base_fare": self.base_fare,
+                "distance_cost": self.distance_cost,
+                "time_cost": self.time_cost,
+                "services_cost": self.services_cost
+            },
+            "surge_multiplier": self.surge_multiplier,
+            "total_fare": self.total_fare,
+            "commission_rate": self.commission_rate,
+            "commission_amount": self.commission_amount,
+            "driver_earnings": self.driver_earnings,
+            "formula": self.formula
+        }
+
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    version: int
+    commission_rate: float
+    tariffs: Dict[str, Tariff]
+    surge: SurgeIndex = field(default_factory=SurgeIndex)
+    service_prices: Dict[int, float] = field(default_factory=dict)
+
+    def tariff(self, vehicle_type: str) -> Tariff:
+        """Tariff for a vehicle type; unknown types are priced as economy"""
+        return self.tariffs.get(vehicle_type) or self.tariffs["economy"]
+
+    def surge_multiplier(self, lat: Optional[float] = None, lng: Optional[float] = None,
+                         at: Optional[datetime] = None) -> float:
+        """Higher of the manual and the automatic (demand) multiplier at the point"""
+        return max(self.surge.multiplier(lat, lng, at), demand_surge.multiplier(lat, lng))
+
+    def services_cost(self, service_ids: Iterable[int] = ()) -> float:
+        """Sum of active service prices; unknown or inactive ids are ignored"""
+        return sum((self.service_prices.get(service_id, 0.0) for service_id in service_ids), 0.0)
+
+    def quote(self, distance: float, duration: int, vehicle_type: str = "economy",
+              lat: Optional[float] = None, lng: Optional[float] = None,
+              at: Optional[datetime] = None, service_ids: Iterable[int] = (),
+              surge_multiplier: Optional[float] = None) -> Quote:
+        """Price one trip. Surge is looked up at (lat, lng, at) unless passed explicitly."""
+        tariff = self.tariff(vehicle_type)
+        if surge_multiplier is None:
+            surge_multiplier = self.surge_multiplier(lat, lng, at)
+        distance_cost = distance * tariff.per_km_rate
+        time_cost = duration * tariff.per_minute_rate
+        services_cost = self.services_cost(service_ids)
+        total_fare = round((tariff.base_fare + distance_cost + time_cost) * surge_multiplier + services_cost, 2)
+        commission_amount = round(total_fare * self.commission_rate, 2)
+        return Quote(
+            vehicle_type=vehicle_type,
+            distance_km=distance,
+            duration_minutes=duration,
+            base_fare=tariff.base_fare,
+            distance_cost=distance_cost,
+            time_cost=time_cost,
+            surge_multiplier=surge_multiplier,
+            services_cost=services_cost,
+            total_fare=total_fare,
+            commission_rate=self.commission_rate,
+            commission_amount=commission_amount,
+            driver_earnings=round(total_fare - commission_amount, 2),
+            per_km_rate=tariff.per_km_rate,
+            per_minute_rate=tariff.per_minute_rate,
+        )
+
+    def quote_batch(self, trips: np.ndarray, vehicle_types: Sequence[str],
+                    at: Optional[datetime] = None, service_ids: Iterable[int] = ()) -> Dict[str, np.ndarray]:
+        """Price N trips for V vehicle types in one vectorized pass.
+
+        ``trips`` is an (N, 4) array of pickup_lat, pickup_lng, dropoff_lat,
+        dropoff_lng. Distance and duration use the same haversine and 30 km/h
+        estimate as the scalar fallback (utils.helpers). Each fare matches
+        ``quote`` for the same distance, duration and surge.
+        """
+        lat1, lng1, lat2, lng2 = np.radians(trips).T
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        # estimate_duration: distance / 0.5 km per minute, at least 15 minutes
+        duration = np.maximum(15, np.floor(distance * 2)).astype(np.int64)
+
+        if self.surge.rule_count or demand_surge.active:
+            at = at or datetime.utcnow()
+            surge = np.fromiter(
+                (self.surge_multiplier(lat, lng, at) for lat, lng in trips[:, :2].tolist()),
+                dtype=np.float64, count=len(trips)
+            )
+        else:
+            surge = np.ones(len(trips))
+
+        tariffs = [self.tariff(vehicle_type) for vehicle_type in vehicle_types]
+        base = np.array([t.base_fare for t in tariffs])
+        per_km = np.array([t.per_km_rate for t in tariffs])
+        per_minute = np.array([t.per_minute_rate for t in tariffs])
+
+        fares = (base + distance[:, None] * per_km + duration[:, None] * per_minute) * surge[:, None]
+        fares = np.round(fares + self.services_cost(service_ids), 2)
+        return {"distance_km": distance, "duration_min": duration, "surge_multiplier": surge, "fares": fares}
+
+
+def compile_snapshot(config: ConfigSnapshot, db: Session) -> PricingSnapshot:
+    """Build a PricingSnapshot from the config snapshot plus surge and service rows"""
+    tariffs = {
+        vehicle_type: Tariff(
+            vehicle_type=vehicle_type,
+            base_fare=float(pricing["base_fare"]),
+            per_km_rate=float(pricing["per_km_rate"]),
+            per_minute_rate=float(pricing["per_minute_rate"]),
+        )
+        for vehicle_type, pricing in config.vehicle_pricing.items()
+    }
+
+    zones = [
+        SurgeZone(area.name, area.center_lat, area.center_lng, area.radius_km or 0.0)
+        for area in db.query(SurgeArea).filter(SurgeArea.is_active == True).all()
+        if area.center_lat is not None and area.center_lng is not None
+    ]
+    rules = [
+        SurgeRule(float(surge.multiplier or 1.0), surge.area_name or None, surge.start_time, surge.end_time)
+        for surge in db.query(SurgePricing).filter(SurgePricing.is_active == True).all()
+    ]
+
+    service_prices = {
+        service_id: float(price or 0.0)
+        for service_id, price in db.query(AdditionalService.id, AdditionalService.price).filter(
+            AdditionalService.is_active == True
+        ).all()
+    }
+
+    return PricingSnapshot(
+        version=config.version,
+        commission_rate=config.commission_rate,
+        tariffs=tariffs,
+        surge=SurgeIndex(rules, zones),
+        service_prices=service_prices,
+    )
+
+
+class PricingEngine:
+    """Holds the current PricingSnapshot and recompiles it on config version changes"""
+
+    def __init__(self):
+        self._snapshot: Optional[PricingSnapshot] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, db: Session) -> PricingSnapshot:
+        config = config_cache.get(db)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == config.version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != config.version:
+                snapshot = compile_snapshot(config, db)
+                self._snapshot = snapshot
+                logger.info(f"Compiled pricing snapshot version {snapshot.version} "
+                            f"({snapshot.surge.rule_count} surge rules, {len(snapshot.service_prices)} services)")
+            return snapshot
+
+    def quote(self, db: Session, distance: float, duration: int, vehicle_type: str = "economy",
+              **kwargs) -> Quote:
+        return self.snapshot(db).quote(distance, duration, vehicle_type, **kwargs)
+
+
+# Global pricing engine instance
+pricing_engine = PricingEngine()
@@ -0,0 +1,207 @@
+"""
+Promo code validation and redemption
+
+Active codes are cached in memory by code, so validating a code costs no
+query. Redemption reserves a use with one conditional UPDATE
+(``used_count < max_uses`` in the WHERE clause): concurrent redemptions of
+the last use cannot both succeed, and the row lock is held only for that
+statement. A reserved use is given back with release() when the order fails
+before its ride is stored or the ride is cancelled; the ride's usage row goes
+with it. PromoCodeUsage rows are buffered and written with one bulk insert
+per PROMO_USAGE_BATCH_SIZE redemptions or PROMO_USAGE_FLUSH_SECONDS; the
+counter on promo_codes is authoritative, the usage rows are the audit trail.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import PromoCode, PromoCodeUsage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromoEntry:
+    id: int
+    code: str
+    discount_type: str
+    discount_value: float
+    max_uses: int
+    valid_from: Optional[datetime]
+    valid_until: Optional[datetime]
+
+    def discount_for(self, fare: float) -> float:
+        """Discount in so'm, never more than the fare"""
+        if self.discount_type == "percentage":
+            discount = fare * self.discount_value / 100
+        else:
+            discount = self.discount_value
+        return round(max(0.0, min(discount, fare)), 2)
+
+
+@dataclass(frozen=True)
+class Redemption:
+    promo_code_id: int
+    code: str
+    customer_id: int
+    discount: float
+
+
+def normalize_code(code: str) -> str:
+    return code.strip().upper()
+
+
+class PromoService:
+    """In-memory index of active codes plus atomic redemption and buffered usage rows"""
+
+    def __init__(self, ttl_seconds: float, batch_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+        self._codes: Dict[str, PromoEntry] = {}
+        self._loaded_at: Optional[float] = None
+        self._sold_out: set = set()
+        self._lock = threading.Lock()
+        self._pending: List[dict] = []
+        self._pending_lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Reload active codes on the next lookup (call after admin changes)"""
+        self._loaded_at = None
+
+    def _index(self, db: Session) -> Dict[str, PromoEntry]:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl_seconds:
+            return self._codes
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_seconds:
+                rows = db.query(PromoCode).filter(PromoCode.is_active == True).all()
+                self._codes = {
+                    normalize_code(p.code): PromoEntry(
+                        p.id, p.code, p.discount_type, float(p.discount_value or 0),
+                        p.max_uses, p.valid_from, p.valid_until
+                    )
+                    for p in rows if p.code
+                }
+                self._sold_out = set()
+                self._loaded_at = time.monotonic()
+            return self._codes
+
+    def validate(self, db: Session, code: str) -> PromoEntry:
+        """Look up a usable code without touching the database (between reloads)"""
+        key = normalize_code(code)
+        entry = self._index(db).get(key)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Promo code not found")
+        if key in self._sold_out:
+            raise HTTPException(status_code=400, detail="Promo code usage limit reached")
+        now = datetime.utcnow()
+        if entry.valid_from and now < entry.valid_from:
+            raise HTTPException(status_code=400, detail="Promo code is not active yet")
+        if entry.valid_until and now >= entry.valid_until:
+            raise HTTPException(status_code=400, detail="Promo code has expired")
+        return entry
+
+    def redeem(self, db: Session, code: str, customer_id: int, fare: float) -> Redemption:
+        """Reserve one use of the code and return the discount (commits the session)"""
+        entry = self.validate(db, code)
+        reserved = db.query(PromoCode).filter(
+            PromoCode.id == entry.id,
+            PromoCode.is_active == True,
+            PromoCode.used_count < PromoCode.max_uses
+        ).update(
+            {PromoCode.used_count: PromoCode.used_count + 1},
+            synchronize_session=False
+        )
+        db.commit()
+        if reserved != 1:
+            with self._lock:
+                self._sold_out.add(normalize_code(code))
+            raise HTTPException(status_code=400, detail="Promo code usage limit reached")
+        return Redemption(entry.id, entry.code, customer_id, entry.discount_for(fare))
+
+    def release(self, db: Session, promo_code_id: int, ride_id: Optional[int] = None) -> None:
+        """Give back one reserved use and drop the ride's usage row (the caller commits)"""
+        db.query(PromoCode).filter(
+            PromoCode.id == promo_code_id,
+            PromoCode.used_count > 0
+        ).update(
+            {PromoCode.used_count: PromoCode.used_count - 1},
+            synchronize_session=False
+        )
+        if ride_id is not None:
+            with self._pending_lock:
+                queued = len(self._pending)
+                self._pending = [
+                    row for row in self._pending
+                    if not (row["ride_id"] == ride_id and row["promo_code_id"] == promo_code_id)
+                ]
+                unqueued = queued - len(self._pending)
+            if not unqueued:
+                db.query(PromoCodeUsage).filter(
+                    PromoCodeUsage.ride_id == ride_id,
+                    PromoCodeUsage.promo_code_id == promo_code_id
+                ).delete(synchronize_session=False)
+        with self._lock:
+            self._sold_out = {
+                key for key in self._sold_out
+                if key not in self._codes or self._codes[key].id != promo_code_id
+            }
+
+    def record_usage(self, db: Session, redemption: Redemption, ride_id: Optional[int] = None) -> None:
+        """Queue the usage row; flushes in bulk once the batch is full"""
+        with self._pending_lock:
+            self._pending.append({
+                "promo_code_id": redemption.promo_code_id,
+                "customer_id": redemption.customer_id,
+                "ride_id": ride_id,
+                "discount_amount": redemption.discount,
+                "used_at": datetime.utcnow(),
+            })
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush(db)
+
+    def flush(self, db: Session) -> int:
+        """Write all queued usage rows with one bulk insert"""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            db.bulk_insert_mappings(PromoCodeUsage, rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            with self._pending_lock:
+                self._pending[:0] = rows
+            logger.error(f"Could not write {len(rows)} promo usage rows: {e}")
+            return 0
+        return len(rows)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+
+async def run_promo_flush(session_factory, interval: float) -> None:
+    """Background loop started from main.lifespan: bounds how long usage rows wait"""
+    while True:
+        await asyncio.sleep(interval)
+        if promo_service.pending:
+            db = session_factory()
+            try:
+                promo_service.flush(db)
+            finally:
+                db.close()
+
+
+# Global promo service instance
+promo_service = PromoService(settings.promo_cache_ttl_seconds, settings.promo_usage_batch_size)
@@ -0,0 +1,100 @@
+"""
+In-process cache of dispatcher ride quotes (route + fare)
+
+Repeat orders between popular points (airport, bazaar, train station) used
+to call OSRM and recompute the fare every time. Quotes are keyed with
+utils.helpers.generate_ride_quote_cache_key on pickup/dropoff rounded to
+QUOTE_CACHE_PRECISION decimals, the vehicle type, the pricing snapshot
+version and the surge multiplier at the pickup. Changing tariffs, services or
+surge rules bumps the version, which drops every cached quote; surge windows
+that open or close on their own change the multiplier and so the key.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from config import settings
+from utils.helpers import generate_ride_quote_cache_key
+
+
+@dataclass(frozen=True)
+class CachedQuote:
+    distance_km: float
+    duration_min: int
+    fare: float
+    route_geometry: Optional[Any] = None
+
+
+class QuoteCache:
+    """LRU + TTL quote cache with hit/miss counters"""
+
+    def __init__(self, maxsize: int, ttl_seconds: int, precision: int):
+        self.precision = precision
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def key(self, pickup_lat: float, pickup_lng: float, dropoff_lat: float, dropoff_lng: float,
+            vehicle_type: str, version: int, surge_multiplier: float = 1.0) -> str:
+        return generate_ride_quote_cache_key({
+            "pickup": [round(pickup_lat, self.precision), round(pickup_lng, self.precision)],
+            "dropoff": [round(dropoff_lat, self.precision), round(dropoff_lng, self.precision)],
+            "vehicle_type": vehicle_type,
+            "version": version,
+            "surge": surge_multiplier,
+        })
+
+    def get(self, key: str, version: int) -> Optional[CachedQuote]:
+        with self._lock:
+            self._sync_version(version)
+            quote = self._cache.get(key)
+            if quote is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return quote
+
+    def put(self, key: str, version: int, quote: CachedQuote) -> None:
+        with self._lock:
+            self._sync_version(version)
+            self._cache[key] = quote
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync_version(self, version: int) -> None:
+        # Old-version entries can never be hit again; free them at once
+        if version != self._version:
+            if self._version is not None:
+                self._cache.clear()
+                self.invalidations += 1
+            self._version = version
+
+
+# Global quote cache instance
+quote_cache = QuoteCache(
+    settings.quote_cache_size,
+    settings.quote_cache_ttl_seconds,
+    settings.quote_cache_precision,
+)
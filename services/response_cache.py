@@ -0,0 +1,55 @@
+"""
+Conditional GET caching for read-mostly catalog endpoints
+
+Service lists and tariffs change a few times a month, and every such change
+bumps the SystemConfig version (admin pricing/commission/service/surge
+endpoints). A response body is therefore built and serialized once per
+(endpoint, version) and reused; its strong ETag combines the version with a
+digest of the body. A client sending a matching If-None-Match gets
+``304 Not Modified`` with no body.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# Clients must revalidate, but may keep the body; responses can be user-gated
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+class ResponseCache:
+    """(name, version) -> (serialized body, ETag)"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def respond(self, request: Request, name: str, version: int, build: Callable[[], Any]) -> Response:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != version:
+            body = json.dumps(jsonable_encoder(build()), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            digest = hashlib.sha1(body).hexdigest()[:16]
+            entry = (version, body, f'"v{version}-{digest}"')
+            with self._lock:
+                self._entries[name] = entry
+        _, body, etag = entry
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,384 @@
+"""
+Daily rollups for admin dashboards (daily_stats table)
+
+Each ride/user event adds its deltas to one (day, city, vehicle_type) row in
+the caller's transaction, so the counters commit or roll back together with
+the event itself. Dashboards then sum O(days x cities x vehicle types) rows
+instead of scanning rides and payments.
+
+Bucketing (UTC days):
+- rides_created, rides_cancelled: day the ride was created
+- rides_completed, revenue, commission, distance_km: day the ride completed
+- new_users: registration day; driver_approvals: approval day (vehicle_type "")
+
+Per-driver running totals (driver_totals) use the same upsert on accept and
+completion and back /driver/stats.
+
+Dispatch latencies go to ride_latency_buckets: one fixed-bucket histogram per
+(created day, created hour, city, metric), so p50/p90/p99 for any range are a
+grouped sum of bucket counts. Metrics:
+- accept: created_at -> accepted_at (time to accept)
+- pickup: accepted_at -> arrived_at (started_at if the driver never sent arrive)
+- trip: started_at -> completed_at
+
+``rebuild`` recomputes a date range from the source tables and
+``rebuild_driver_totals`` recomputes every driver; the migrations backfill
+history, rebuild_daily_stats.py repairs whatever is in doubt.
+"""
+import json
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Numeric, and_, case, cast, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import DailyStat, DriverTotal, Ride, RideLatencyBucket, User
+from utils.helpers import calculate_distance
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "rides_created", "rides_completed", "rides_cancelled", "revenue",
+    "commission", "distance_km", "new_users", "driver_approvals",
+)
+DRIVER_COUNTERS = ("rides_accepted", "rides_completed", "revenue", "commission", "distance_km")
+LATENCY_METRICS = ("accept", "pickup", "trip")
+# Upper bounds (seconds) of the latency buckets; index len(LATENCY_BUCKETS) is the overflow bucket
+LATENCY_BUCKETS = (
+    5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 240, 300,
+    420, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200,
+)
+
+
+def _as_date(value) -> Optional[date]:
+    """func.date() returns a string on SQLite and a date on PostgreSQL"""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _location(raw) -> dict:
+    try:
+        loc = json.loads(raw) if isinstance(raw, str) else raw
+        return loc if isinstance(loc, dict) else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def ride_city(pickup_location) -> Optional[str]:
+    return _location(pickup_location).get("city") or None
+
+
+def ride_distance(pickup_location, dropoff_location) -> Optional[float]:
+    """Straight-line km between the stored pickup and dropoff, None if unknown"""
+    p, d = _location(pickup_location), _location(dropoff_location)
+    try:
+        return round(calculate_distance(float(p["lat"]), float(p["lng"]), float(d["lat"]), float(d["lng"])), 3)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def latency_bucket(seconds: float) -> int:
+    return bisect_left(LATENCY_BUCKETS, seconds)
+
+
+def latency_percentiles(counts: Dict[int, int],
+                        quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict[str, Optional[float]]:
+    """Percentiles (seconds) from bucket counts, interpolated inside the bucket.
+
+    Values in the overflow bucket are reported as its lower bound.
+    """
+    total = sum(counts.values())
+    result: Dict[str, Optional[float]] = {}
+    for q in quantiles:
+        name = f"p{round(q * 100)}"
+        if not total:
+            result[name] = None
+            continue
+        target = q * total
+        seen = 0
+        for bucket in sorted(counts):
+            count = counts[bucket]
+            if not count or seen + count < target:
+                seen += count
+                continue
+            lower = LATENCY_BUCKETS[bucket - 1] if bucket else 0
+            if bucket >= len(LATENCY_BUCKETS):
+                result[name] = float(lower)
+            else:
+                upper = LATENCY_BUCKETS[bucket]
+                result[name] = round(lower + (target - seen) / count * (upper - lower), 1)
+            break
+    return result
+
+
+def _latency_spans(created_at, accepted_at, arrived_at, started_at, completed_at):
+    """(metric, start, end) for every lifecycle span of a ride"""
+    return (
+        ("accept", created_at, accepted_at),
+        ("pickup", accepted_at, arrived_at or started_at),
+        ("trip", started_at, completed_at),
+    )
+
+
+class RollupService:
+    """Incremental daily_stats / driver_totals upserts plus the rebuild/read helpers"""
+
+    def _upsert(self, db: Session, model, key: dict, deltas: dict) -> None:
+        """UPDATE counters += deltas for the key row, INSERT it if missing"""
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        where = [getattr(model, k) == v for k, v in key.items()]
+        values = {getattr(model, k): getattr(model, k) + v for k, v in deltas.items()}
+
+        if db.query(model).filter(*where).update(values, synchronize_session=False):
+            return
+        # First event for this key; a concurrent request may insert it first
+        try:
+            with db.begin_nested():
+                db.add(model(**key, **deltas))
+        except IntegrityError:
+            db.query(model).filter(*where).update(values, synchronize_session=False)
+
+    def add(self, db: Session, day: date, city: Optional[str], vehicle_type: Optional[str], **deltas) -> None:
+        """Add deltas to one rollup row (no commit; the caller commits its event)"""
+        key = {"day": day, "city": city or "", "vehicle_type": vehicle_type or ""}
+        self._upsert(db, DailyStat, key, deltas)
+
+    def ride_created(self, db: Session, ride: Ride) -> None:
+        self.add(db, ride.created_at.date(), ride.city, ride.vehicle_type, rides_created=1)
+
+    def ride_accepted(self, db: Session, driver_id: int) -> None:
+        self._upsert(db, DriverTotal, {"driver_id": driver_id}, {"rides_accepted": 1})
+
+    def ride_completed(self, db: Session, ride: Ride, commission: float) -> None:
+        deltas = dict(
+            rides_completed=1, revenue=float(ride.fare or 0), commission=commission,
+            distance_km=float(ride.distance_km or 0),
+        )
+        self.add(db, ride.completed_at.date(), ride.city, ride.vehicle_type, **deltas)
+        if ride.driver_id:
+            self._upsert(db, DriverTotal, {"driver_id": ride.driver_id}, deltas)
+
+    def ride_cancelled(self, db: Session, ride: Ride) -> None:
+        day = (ride.created_at or datetime.utcnow()).date()
+        self.add(db, day, ride.city, ride.vehicle_type, rides_cancelled=1)
+
+    def user_registered(self, db: Session, user: User) -> None:
+        self.add(db, (user.created_at or datetime.utcnow()).date(), user.city, "", new_users=1)
+
+    def approval_changed(self, db: Session, user: User, delta: int) -> None:
+        """+1 when a driver is approved, -1 when that approval is withdrawn"""
+        if user.approved_at:
+            self.add(db, user.approved_at.date(), user.city, "", driver_approvals=delta)
+
+    def ride_latency(self, db: Session, ride, metric: str,
+                     start: Optional[datetime], end: Optional[datetime]) -> None:
+        """Count one lifecycle span in the histogram of the ride's created hour.
+
+        ``ride`` only needs ``created_at`` and ``city`` (a Ride or a column row).
+        """
+        if start is None or end is None:
+            return
+        created = ride.created_at or start
+        key = {
+            "day": created.date(), "hour": created.hour, "city": ride.city or "",
+            "metric": metric, "bucket": latency_bucket(max((end - start).total_seconds(), 0)),
+        }
+        self._upsert(db, RideLatencyBucket, key, {"count": 1})
+
+    # ---- reads -------------------------------------------------------------
+
+    def _filtered(self, db: Session, columns, start: date, end: date,
+                  city: Optional[str], vehicle_type: Optional[str]):
+        q = db.query(*columns).filter(DailyStat.day >= start, DailyStat.day <= end)
+        if city is not None:
+            q = q.filter(DailyStat.city == city)
+        if vehicle_type is not None:
+            q = q.filter(DailyStat.vehicle_type == vehicle_type)
+        return q
+
+    def totals(self, db: Session, start: date, end: date,
+               city: Optional[str] = None, vehicle_type: Optional[str] = None) -> Dict[str, float]:
+        """Sum of every counter over [start, end] (inclusive days)"""
+        sums = [func.coalesce(func.sum(getattr(DailyStat, k)), 0) for k in COUNTERS]
+        row = self._filtered(db, sums, start, end, city, vehicle_type).one()
+        return dict(zip(COUNTERS, row))
+
+    def by_day(self, db: Session, start: date, end: date,
+               city: Optional[str] = None, vehicle_type: Optional[str] = None) -> Dict[date, Dict[str, float]]:
+        """Per-day counter sums over [start, end], only days with activity"""
+        sums = [func.sum(getattr(DailyStat, k)) for k in COUNTERS]
+        rows = self._filtered(db, [DailyStat.day, *sums], start, end, city, vehicle_type) \
+            .group_by(DailyStat.day).order_by(DailyStat.day).all()
+        return {_as_date(row[0]): dict(zip(COUNTERS, row[1:])) for row in rows}
+
+    def daily_revenue(self, db: Session) -> Dict[date, float]:
+        """Revenue per day across all cities and vehicle types (one grouped query)"""
+        rows = db.query(DailyStat.day, func.sum(DailyStat.revenue)).group_by(DailyStat.day).all()
+        return {_as_date(day): float(revenue or 0) for day, revenue in rows}
+
+    def driver_totals(self, db: Session, driver_id: int) -> Dict[str, float]:
+        """Running totals for one driver (primary-key lookup)"""
+        row = db.query(*(getattr(DriverTotal, k) for k in DRIVER_COUNTERS)).filter(
+            DriverTotal.driver_id == driver_id
+        ).first()
+        return dict(zip(DRIVER_COUNTERS, row)) if row else dict.fromkeys(DRIVER_COUNTERS, 0)
+
+    def latency_histograms(self, db: Session, start: date, end: date, city: Optional[str] = None,
+                           metric: Optional[str] = None) -> Dict[Tuple[str, str, int], Dict[int, int]]:
+        """Bucket counts per (metric, city, hour) over [start, end] (one grouped query)"""
+        q = db.query(
+            RideLatencyBucket.metric, RideLatencyBucket.city, RideLatencyBucket.hour,
+            RideLatencyBucket.bucket, func.sum(RideLatencyBucket.count)
+        ).filter(RideLatencyBucket.day >= start, RideLatencyBucket.day <= end)
+        if city is not None:
+            q = q.filter(RideLatencyBucket.city == city)
+        if metric is not None:
+            q = q.filter(RideLatencyBucket.metric == metric)
+        histograms: Dict[Tuple[str, str, int], Dict[int, int]] = defaultdict(dict)
+        for m, c, hour, bucket, count in q.group_by(
+            RideLatencyBucket.metric, RideLatencyBucket.city, RideLatencyBucket.hour, RideLatencyBucket.bucket
+        ):
+            histograms[(m, c, hour)][bucket] = int(count or 0)
+        return dict(histograms)
+
+    # ---- rebuild -----------------------------------------------------------
+
+    def backfill_rides(self, db: Session, batch_size: int = 1000) -> int:
+        """Fill rides.city / rides.distance_km for rows written before they existed"""
+        fixed = 0
+        rows = db.query(Ride.id, Ride.pickup_location, Ride.dropoff_location, Ride.city, Ride.distance_km).filter(
+            (Ride.city == None) | (Ride.distance_km == None)  # noqa: E711
+        ).all()
+        updates = []
+        for ride_id, pickup, dropoff, city, distance in rows:
+            update = {"id": ride_id}
+            if city is None:
+                update["city"] = ride_city(pickup)
+            if distance is None:
+                update["distance_km"] = ride_distance(pickup, dropoff)
+            updates.append(update)
+            if len(updates) >= batch_size:
+                db.bulk_update_mappings(Ride, updates)
+                fixed += len(updates)
+                updates = []
+        if updates:
+            db.bulk_update_mappings(Ride, updates)
+            fixed += len(updates)
+        db.commit()
+        return fixed
+
+    def rebuild(self, db: Session, start: date, end: date, commission_rate: float) -> int:
+        """Recompute daily_stats for [start, end] from rides and users (commits).
+
+        Historical commission is not stored per ride, so it is recomputed with
+        the current commission_rate.
+        """
+        lo = datetime.combine(start, datetime.min.time())
+        hi = datetime.combine(end + timedelta(days=1), datetime.min.time())
+        rows: Dict[Tuple[date, str, str], Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+        created_day = func.date(Ride.created_at)
+        for day, city, vt, created, cancelled in db.query(
+            created_day, Ride.city, Ride.vehicle_type, func.count(Ride.id),
+            func.sum(case((Ride.status == "cancelled", 1), else_=0))
+        ).filter(Ride.created_at >= lo, Ride.created_at < hi).group_by(created_day, Ride.city, Ride.vehicle_type):
+            row = rows[(_as_date(day), city or "", vt or "")]
+            row["rides_created"] += created
+            row["rides_cancelled"] += cancelled or 0
+
+        completed_at = func.coalesce(Ride.completed_at, Ride.created_at)
+        completed_day = func.date(completed_at)
+        for day, city, vt, completed, revenue, km in db.query(
+            completed_day, Ride.city, Ride.vehicle_type, func.count(Ride.id),
+            func.sum(Ride.fare), func.sum(Ride.distance_km)
+        ).filter(
+            Ride.status == "completed", completed_at >= lo, completed_at < hi
+        ).group_by(completed_day, Ride.city, Ride.vehicle_type):
+            row = rows[(_as_date(day), city or "", vt or "")]
+            row["rides_completed"] += completed
+            row["revenue"] += float(revenue or 0)
+            row["commission"] += round(float(revenue or 0) * commission_rate, 2)
+            row["distance_km"] += float(km or 0)
+
+        joined_day = func.date(User.created_at)
+        for day, city, count in db.query(joined_day, User.city, func.count(User.id)).filter(
+            User.created_at >= lo, User.created_at < hi
+        ).group_by(joined_day, User.city):
+            rows[(_as_date(day), city or "", "")]["new_users"] += count
+
+        approved_day = func.date(User.approved_at)
+        for day, city, count in db.query(approved_day, User.city, func.count(User.id)).filter(
+            User.is_approved == True, User.approved_at >= lo, User.approved_at < hi  # noqa: E712
+        ).group_by(approved_day, User.city):
+            rows[(_as_date(day), city or "", "")]["driver_approvals"] += count
+
+        db.query(DailyStat).filter(and_(DailyStat.day >= start, DailyStat.day <= end)) \
+            .delete(synchronize_session=False)
+        db.bulk_insert_mappings(DailyStat, [
+            {"day": day, "city": city, "vehicle_type": vt, **counters}
+            for (day, city, vt), counters in rows.items()
+        ])
+        db.commit()
+        logger.info(f"Rebuilt daily_stats {start}..{end}: {len(rows)} rows")
+        return len(rows)
+
+    def rebuild_driver_totals(self, db: Session, commission_rate: float) -> int:
+        """Recompute driver_totals for every driver with one grouped INSERT ... SELECT (commits)"""
+        completed = Ride.status == "completed"
+        revenue = func.coalesce(func.sum(case((completed, Ride.fare), else_=0)), 0)
+        totals = select(
+            Ride.driver_id,
+            func.count(Ride.id),
+            func.sum(case((completed, 1), else_=0)),
+            revenue,
+            func.round(cast(revenue * commission_rate, Numeric), 2),
+            func.coalesce(func.sum(case((completed, Ride.distance_km), else_=0)), 0),
+            literal(datetime.utcnow()),
+        ).where(Ride.driver_id != None).group_by(Ride.driver_id)  # noqa: E711
+
+        db.query(DriverTotal).delete(synchronize_session=False)
+        count = db.execute(insert(DriverTotal).from_select([
+            DriverTotal.driver_id, DriverTotal.rides_accepted, DriverTotal.rides_completed, DriverTotal.revenue,
+            DriverTotal.commission, DriverTotal.distance_km, DriverTotal.updated_at,
+        ], totals)).rowcount
+        db.commit()
+        logger.info(f"Rebuilt driver_totals: {count} drivers")
+        return count
+
+    def rebuild_latency(self, db: Session, start: date, end: date, batch_size: int = 1000) -> int:
+        """Recompute ride_latency_buckets for rides created in [start, end] (commits)"""
+        lo = datetime.combine(start, datetime.min.time())
+        hi = datetime.combine(end + timedelta(days=1), datetime.min.time())
+        counts: Dict[Tuple[date, int, str, str, int], int] = defaultdict(int)
+
+        rows = db.query(
+            Ride.created_at, Ride.city, Ride.accepted_at, Ride.arrived_at, Ride.started_at, Ride.completed_at
+        ).filter(Ride.created_at >= lo, Ride.created_at < hi).yield_per(batch_size)
+        for created, city, accepted, arrived, started, completed in rows:
+            for metric, span_start, span_end in _latency_spans(created, accepted, arrived, started, completed):
+                if span_start is None or span_end is None:
+                    continue
+                bucket = latency_bucket(max((span_end - span_start).total_seconds(), 0))
+                counts[(created.date(), created.hour, city or "", metric, bucket)] += 1
+
+        db.query(RideLatencyBucket).filter(
+            RideLatencyBucket.day >= start, RideLatencyBucket.day <= end
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(RideLatencyBucket, [
+            {"day": day, "hour": hour, "city": city, "metric": metric, "bucket": bucket, "count": count}
+            for (day, hour, city, metric, bucket), count in counts.items()
+        ])
+        db.commit()
+        logger.info(f"Rebuilt ride_latency_buckets {start}..{end}: {len(counts)} rows")
+        return len(counts)
+
+
+# Global rollup service instance
+rollups = RollupService()
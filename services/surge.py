@@ -0,0 +1,116 @@
+"""
+Surge multiplier lookup by place and time
+
+Active SurgePricing windows are compiled into a time-sorted list of
+boundaries. Every segment between two boundaries stores the multipliers that
+are in force for the whole segment, so finding the segment for a timestamp is
+a single bisect. SurgeArea circles are bucketed into a fixed-size lat/lng
+grid; a point only checks the few areas registered in its own cell.
+
+The index is immutable and is rebuilt by services.pricing_engine whenever
+the config version changes (admin surge endpoints bump it).
+"""
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.helpers import calculate_distance
+
+# Grid cell size in degrees (0.01 ~ 1.1 km north-south)
+GRID_CELL_DEG = 0.01
+KM_PER_DEG_LAT = 111.0
+
+
+@dataclass(frozen=True)
+class SurgeRule:
+    """Active SurgePricing window; ``area_name`` None means city-wide"""
+    multiplier: float
+    area_name: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class SurgeZone:
+    """Active SurgeArea circle"""
+    name: str
+    center_lat: float
+    center_lng: float
+    radius_km: float
+
+
+@dataclass(frozen=True)
+class _Segment:
+    citywide: float
+    areas: Dict[str, float]
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / GRID_CELL_DEG), math.floor(lng / GRID_CELL_DEG)
+
+
+class SpatialGrid:
+    """Buckets circles into GRID_CELL_DEG cells covering their bounding box"""
+
+    def __init__(self, zones: Iterable[SurgeZone]):
+        cells: Dict[Tuple[int, int], List[SurgeZone]] = defaultdict(list)
+        for zone in zones:
+            dlat = zone.radius_km / KM_PER_DEG_LAT
+            dlng = zone.radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(zone.center_lat)), 0.01))
+            lat0, lng0 = _cell(zone.center_lat - dlat, zone.center_lng - dlng)
+            lat1, lng1 = _cell(zone.center_lat + dlat, zone.center_lng + dlng)
+            for i in range(lat0, lat1 + 1):
+                for j in range(lng0, lng1 + 1):
+                    cells[(i, j)].append(zone)
+        self._cells = {cell: tuple(zones) for cell, zones in cells.items()}
+
+    def zones_at(self, lat: float, lng: float) -> Iterable[SurgeZone]:
+        """Zones whose circle contains the point"""
+        for zone in self._cells.get(_cell(lat, lng), ()):
+            if calculate_distance(lat, lng, zone.center_lat, zone.center_lng) <= zone.radius_km:
+                yield zone
+
+
+class SurgeIndex:
+    """Immutable (lat, lng, t) -> multiplier index over manual surge rules"""
+
+    def __init__(self, rules: Iterable[SurgeRule] = (), zones: Iterable[SurgeZone] = ()):
+        zones = list(zones)
+        zone_names = {zone.name for zone in zones}
+        # A rule for an unknown or disabled area must not turn into a city-wide surge
+        rules = [r for r in rules if r.area_name is None or r.area_name in zone_names]
+        self.rule_count = len(rules)
+        self.grid = SpatialGrid(z for z in zones if any(r.area_name == z.name for r in rules))
+
+        self._boundaries: List[datetime] = sorted(
+            {t for r in rules for t in (r.start_time, r.end_time) if t is not None}
+        )
+        # Segment k covers [boundaries[k-1], boundaries[k]); segment 0 starts at -inf
+        self._segments: List[_Segment] = []
+        for k in range(len(self._boundaries) + 1):
+            lo = self._boundaries[k - 1] if k else None
+            citywide = 1.0
+            areas: Dict[str, float] = {}
+            for rule in rules:
+                if rule.start_time is not None and (lo is None or lo < rule.start_time):
+                    continue
+                if rule.end_time is not None and lo is not None and lo >= rule.end_time:
+                    continue
+                if rule.area_name is None:
+                    citywide = max(citywide, rule.multiplier)
+                else:
+                    areas[rule.area_name] = max(areas.get(rule.area_name, 1.0), rule.multiplier)
+            self._segments.append(_Segment(citywide, areas))
+
+    def multiplier(self, lat: Optional[float] = None, lng: Optional[float] = None,
+                   at: Optional[datetime] = None) -> float:
+        """Highest manual multiplier at the point and time (1.0 when none applies)"""
+        segment = self._segments[bisect_right(self._boundaries, at or datetime.utcnow())]
+        multiplier = segment.citywide
+        if segment.areas and lat is not None and lng is not None:
+            for zone in self.grid.zones_at(lat, lng):
+                multiplier = max(multiplier, segment.areas.get(zone.name, 1.0))
+        return multiplier
@@ -0,0 +1,62 @@
+"""
+Background analytics job tests (services.analytics_jobs)
+"""
+import asyncio
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.analytics_jobs import AnalyticsJobs
+
+
+class _Session:
+    def close(self):
+        pass
+
+
+def _jobs():
+    jobs = AnalyticsJobs(session_factory=_Session)
+    state = {"runs": 0, "day": "2026-10-19"}
+
+    @jobs.register("daily")
+    def daily(db):
+        state["runs"] += 1
+        return {"date": state["day"], "runs": state["runs"]}
+
+    return jobs, state
+
+
+def test_snapshot_is_served_until_next_run():
+    jobs, state = _jobs()
+    first = jobs.serve("daily", db=_Session())
+    assert first["runs"] == 1 and first["snapshot_version"] == 1 and first["as_of"]
+    assert jobs.serve("daily", db=_Session())["runs"] == 1
+
+    assert jobs.run_all() == 1
+    assert jobs.serve("daily", db=_Session())["snapshot_version"] == 2
+
+
+def test_stale_period_is_recomputed_inline():
+    jobs, state = _jobs()
+    jobs.serve("daily", db=_Session())
+    state["day"] = "2026-10-20"
+    body = jobs.serve("daily", db=_Session(), expect=("date", "2026-10-20"))
+    assert body["date"] == "2026-10-20" and state["runs"] == 2
+
+
+def test_fresh_requests_coalesce_into_one_background_run():
+    jobs, state = _jobs()
+    jobs.serve("daily", db=_Session())
+
+    async def burst():
+        flags = [jobs.serve("daily", db=_Session(), fresh=True)["refreshing"] for _ in range(5)]
+        while jobs.stats()["running"]:
+            await asyncio.sleep(0.01)
+        return flags
+
+    flags = asyncio.run(burst())
+    assert flags == [True, False, False, False, False]
+    assert state["runs"] == 2
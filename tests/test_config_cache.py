@@ -0,0 +1,57 @@
+"""
+Versioned SystemConfig cache tests (services.config_cache)
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.config_cache import ConfigCache, DEFAULT_VEHICLE_PRICING
+
+
+def test_defaults_without_rows(session_factory):
+    db = session_factory()
+    snapshot = ConfigCache(check_interval=60).get(db)
+    assert snapshot.version == 0
+    assert snapshot.pricing_for("comfort") == DEFAULT_VEHICLE_PRICING["comfort"]
+    assert snapshot.pricing_for("unknown") == DEFAULT_VEHICLE_PRICING["economy"]
+
+
+def test_reads_are_served_from_memory_between_checks(session_factory):
+    db = session_factory()
+    cache = ConfigCache(check_interval=60)
+    first = cache.get(db)
+    db.close()
+    # No session needed while the snapshot is fresh
+    assert cache.get(None) is first
+
+
+def test_write_in_one_worker_reaches_another(session_factory):
+    writer, reader = ConfigCache(check_interval=0), ConfigCache(check_interval=0)
+    db_a, db_b = session_factory(), session_factory()
+    assert reader.get(db_b).commission_rate != 0.25
+
+    writer.set_value(db_a, "commission_rate", "0.25")
+    writer.set_value(db_a, "pricing_business", '{"base_fare": 1, "per_km_rate": 2, "per_minute_rate": 3}')
+
+    snapshot = reader.get(db_b)
+    assert snapshot.version == 2
+    assert snapshot.commission_rate == 0.25
+    assert snapshot.pricing_for("business")["base_fare"] == 1
+    # Defaults stay untouched by overrides
+    assert DEFAULT_VEHICLE_PRICING["business"]["base_fare"] != 1
+
+
+def test_snapshot_cannot_be_changed_by_callers(session_factory):
+    snapshot = ConfigCache(check_interval=60).get(session_factory())
+    tariff = snapshot.pricing_for("economy")
+    tariff["base_fare"] = 1
+    assert snapshot.pricing_for("economy")["base_fare"] == DEFAULT_VEHICLE_PRICING["economy"]["base_fare"]
+    with pytest.raises(TypeError):
+        snapshot.vehicle_pricing["economy"]["base_fare"] = 1
+    with pytest.raises(TypeError):
+        snapshot.values["commission_rate"] = "0.5"
@@ -0,0 +1,70 @@
+"""
+Demand forecast tests (services.demand_forecast)
+"""
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Customer, Ride
+from services.demand_forecast import DemandForecast
+
+CENTER = (40.7821, 72.3442)
+SUBURB = (40.7400, 72.4100)
+FIRST_DAY = date(2026, 9, 28)  # Monday
+
+
+@pytest.fixture
+def factory(session_factory):
+    db = session_factory()
+    customer = Customer(phone="+998901112233")
+    db.add(customer)
+    db.commit()
+    # Three weeks: 4 pickups in the center every Monday 08:00, 1 in the suburb every day 20:00
+    for offset in range(21):
+        day = datetime.combine(FIRST_DAY + timedelta(days=offset), datetime.min.time())
+        spots = [(SUBURB, 20)] + ([(CENTER, 8)] * 4 if offset % 7 == 0 else [])
+        for (lat, lng), hour in spots:
+            db.add(Ride(customer_id=customer.id, status="completed", created_at=day + timedelta(hours=hour),
+                        pickup_location=json.dumps({"lat": lat, "lng": lng, "address": "x"})))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def test_incremental_training_learns_weekly_profile(factory):
+    forecast = DemandForecast(size_km=1.0, alpha=0.2)
+    db = factory()
+    assert forecast.train(db, FIRST_DAY + timedelta(days=13)) == 14
+    assert forecast.train(db, FIRST_DAY + timedelta(days=20)) == 7
+    assert forecast.train(db, FIRST_DAY + timedelta(days=20)) == 0
+
+    monday_morning = forecast.forecast(hours=2, limit=10, at=datetime(2026, 10, 19, 8, 30))
+    assert monday_morning["trained_through"] == "2026-10-18"
+    assert len(monday_morning["zones"]) == 1
+    assert monday_morning["zones"][0]["expected"] == [4.0, 0.0]
+
+    evening = forecast.forecast(hours=1, limit=10, at=datetime(2026, 10, 21, 20, 0))
+    assert [z["total"] for z in evening["zones"]] == [1.0]
+    db.close()
+
+
+def test_workers_share_trained_days_through_the_database(factory):
+    first, second = DemandForecast(1.0, 0.2), DemandForecast(1.0, 0.2)
+    db1, db2 = factory(), factory()
+    until = FIRST_DAY + timedelta(days=20)
+    assert first.train(db1, until) == 21
+    assert second.train(db2, until) == 0  # already trained: loads the stored profile
+
+    assert second.zones == first.zones
+    assert np.allclose(second.expected, first.expected)
+    assert np.array_equal(second.samples, first.samples)
+    db1.close()
+    db2.close()
@@ -0,0 +1,94 @@
+"""
+Automatic supply/demand surge tests (services.demand_surge)
+"""
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Customer, DriverStatus, Ride
+from services.demand_surge import DemandSurge, hex_cell, hex_center
+from utils.helpers import calculate_distance
+
+LAT, LNG = 40.7821, 72.3442  # Andijon bazaar
+
+
+def _surge(**kwargs):
+    options = dict(enabled=True, size_km=0.5, alpha=0.5, threshold=1.0, sensitivity=0.5, max_multiplier=2.5)
+    options.update(kwargs)
+    return DemandSurge(**options)
+
+
+def test_hex_center_maps_back_to_its_cell():
+    cell = hex_cell(LAT, LNG, 0.5)
+    lat, lng = hex_center(cell, 0.5)
+    assert hex_cell(lat, lng, 0.5) == cell
+    # A point is never further from its cell center than the circumradius
+    assert calculate_distance(LAT, LNG, lat, lng) <= 0.5 + 1e-6
+
+
+def test_excess_demand_raises_multiplier_gradually():
+    surge = _surge()
+    surge.driver_update(1, True, LAT, LNG)
+    for ride_id in range(5):
+        surge.ride_opened(ride_id, LAT, LNG)
+
+    values = []
+    for _ in range(4):
+        surge.tick()
+        values.append(surge.multiplier(LAT, LNG))
+    assert values == sorted(values) and values[-1] > values[0] > 1.0
+    assert values[-1] <= 2.5
+    assert surge.multiplier(41.31, 69.24) == 1.0
+
+
+def test_surge_decays_once_demand_is_served():
+    surge = _surge()
+    surge.driver_update(1, True, LAT, LNG)
+    for ride_id in range(5):
+        surge.ride_opened(ride_id, LAT, LNG)
+    surge.tick()
+    for ride_id in range(5):
+        surge.ride_closed(ride_id)
+    for _ in range(20):
+        surge.tick()
+    assert surge.multiplier(LAT, LNG) == 1.0
+    assert surge.stats()["active_cells"] == 0
+
+
+def test_disabled_tracker_keeps_positions_but_publishes_no_multipliers():
+    surge = _surge(enabled=False)
+    for ride_id in range(5):
+        surge.ride_opened(ride_id, LAT, LNG)
+    assert surge.tick() == {}
+    assert surge.multiplier(LAT, LNG) == 1.0
+    assert surge.positions() == ([], [(LAT, LNG)] * 5)
+
+
+def test_workers_share_one_set_of_multipliers(session_factory):
+    db = session_factory()
+    customer = Customer(phone="+998911234567")
+    db.add(customer)
+    db.flush()
+    db.add(DriverStatus(driver_id=1, is_on_duty=True, last_lat=LAT, last_lng=LNG))
+    for _ in range(5):
+        db.add(Ride(customer_id=customer.id, status="pending", pickup_location=json.dumps({"lat": LAT, "lng": LNG})))
+    db.commit()
+
+    # Worker A publishes slot 1 from the database; B saw none of the events
+    a, b = _surge(), _surge()
+    published = a.sync(db, 1)
+    assert published and a.multiplier(LAT, LNG) > 1.0
+    assert b.sync(db, 1) == published
+    assert b.multiplier(LAT, LNG) == a.multiplier(LAT, LNG)
+    assert b.ticks == 0
+
+    # The next slot goes to whoever claims it first and continues the stored EWMA
+    assert b.sync(db, 2)[hex_cell(LAT, LNG, 0.5)] > published[hex_cell(LAT, LNG, 0.5)]
+    a.sync(db, 2)
+    assert a.multiplier(LAT, LNG) == b.multiplier(LAT, LNG)
+    assert (a.ticks, b.ticks) == (1, 1)
+    db.close()
@@ -0,0 +1,61 @@
+"""
+Streaming export tests (services.exports)
+"""
+import csv
+import io
+import os
+import sys
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import services.exports as exports
+from models import Customer, Ride, Transaction
+from services.exports import ExportFilters, ExportService
+
+
+@pytest.fixture
+def service(session_factory):
+    db = session_factory()
+    customer = Customer(phone="+998901112233")
+    db.add(customer)
+    db.commit()
+    for i in range(10):
+        db.add(Ride(customer_id=customer.id, driver_id=7 if i % 2 else None, status="completed",
+                    fare=1000 + i, city="Andijon", created_at=datetime(2026, 10, 1) + timedelta(days=i)))
+    db.add(Transaction(user_id=7, amount=-100.0, transaction_type="commission",
+                       description='=HYPERLINK("http://example.com","komissiya")'))
+    db.add(Transaction(user_id=7, amount=-100.0, transaction_type="commission", description="@SUM(1+1)"))
+    db.commit()
+    db.close()
+    return ExportService(session_factory, batch_size=3)
+
+
+def test_csv_streams_filtered_rows_in_chunks(service):
+    filters = ExportFilters(date_from=datetime(2026, 10, 2), date_to=datetime(2026, 10, 9), driver_id=7)
+    chunks = list(service.csv("rides", filters))
+    assert len(chunks) > 1
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert rows[0] == service.headers("rides")
+    assert [row[0] for row in rows[1:]] == ["2", "4", "6", "8"]
+
+
+def test_xlsx_continues_on_new_sheet_past_row_limit(service, monkeypatch):
+    monkeypatch.setattr(exports, "XLSX_SHEET_ROWS", 4)
+    workbook = zipfile.ZipFile(io.BytesIO(b"".join(service.xlsx("rides", ExportFilters()))))
+    sheets = sorted(n for n in workbook.namelist() if n.startswith("xl/worksheets/sheet"))
+    assert len(sheets) == 3  # 10 rows, 4 per sheet
+
+
+def test_csv_neutralises_formula_cells(service):
+    rows = list(csv.reader(io.StringIO(b"".join(service.csv("transactions", ExportFilters())).decode("utf-8-sig"))))
+    descriptions = [row[rows[0].index("description")] for row in rows[1:]]
+    assert descriptions == ['\'=HYPERLINK("http://example.com","komissiya")', "'@SUM(1+1)"]
+    # Numbers stay numbers, negative or not
+    assert {row[rows[0].index("amount")] for row in rows[1:]} == {"-100.0"}
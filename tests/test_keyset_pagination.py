@@ -0,0 +1,102 @@
+"""
+Keyset pagination helper tests (utils.helpers.keyset_paginate)
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Customer, Notification, Ride, User
+from utils.helpers import keyset_paginate, decode_cursor, encode_id_cursor, decode_id_cursor
+
+
+@pytest.fixture
+def session(db):
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    # Pairs of rows share a timestamp so the id tie-breaker is exercised
+    for i in range(25):
+        db.add(Notification(user_id=1, title=f"n{i}", body="", created_at=base + timedelta(minutes=i // 2)))
+    db.add(Notification(user_id=2, title="other", body="", created_at=base))
+    db.commit()
+    return db
+
+
+def test_pages_cover_every_row_once_newest_first(session):
+    query = session.query(Notification).filter(Notification.user_id == 1)
+    expected = [n.id for n in query.order_by(Notification.created_at.desc(), Notification.id.desc())]
+
+    seen, cursor = [], ""
+    while True:
+        rows, cursor = keyset_paginate(query, Notification, cursor, 7)
+        seen.extend(n.id for n in rows)
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(seen) == 25
+
+
+def test_last_page_has_no_cursor(session):
+    query = session.query(Notification).filter(Notification.user_id == 2)
+    rows, cursor = keyset_paginate(query, Notification, "", 20)
+    assert len(rows) == 1
+    assert cursor is None
+
+
+def test_tampered_cursor_is_rejected():
+    with pytest.raises(HTTPException) as err:
+        decode_cursor("not-a-cursor")
+    assert err.value.status_code == 400
+
+
+def test_id_cursor_round_trip():
+    assert decode_id_cursor(encode_id_cursor(12345)) == 12345
+    with pytest.raises(HTTPException) as err:
+        decode_id_cursor("WyJ4Il0")  # ["x"]
+    assert err.value.status_code == 400
+
+
+@pytest.fixture
+def driver_with_history(session_factory):
+    db = session_factory()
+    driver = User(phone="+998900000001", password="x", full_name="Driver", is_driver=True, is_approved=True)
+    customer = Customer(phone="+998900000002", first_name="Customer")
+    db.add_all([driver, customer])
+    db.flush()
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(5):
+        db.add(Ride(driver_id=driver.id, customer_id=customer.id, status="completed", fare=20000 + i,
+                    pickup_location='{"lat": 40.78, "lng": 72.34}', created_at=base + timedelta(minutes=i)))
+    db.commit()
+    db.refresh(driver)
+    db.close()
+    return driver
+
+
+def test_history_endpoint_offset_mode(api_client, login, driver_with_history):
+    login(driver_with_history)
+    response = api_client.get("/api/v1/driver/rides/history", params={"limit": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total"], data["pages"]) == (5, 3)
+    assert [r["fare"] for r in data["rides"]] == [20004, 20003]
+    assert data["rides"][0]["pickup_location"] == {"lat": 40.78, "lng": 72.34}
+    assert data["next_cursor"]
+
+
+def test_history_endpoint_cursor_mode(api_client, login, driver_with_history):
+    login(driver_with_history)
+    fares, cursor = [], ""
+    while cursor is not None:
+        response = api_client.get("/api/v1/driver/rides/history", params={"limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        data = response.json()
+        fares.extend(r["fare"] for r in data["rides"])
+        cursor = data["next_cursor"]
+    assert fares == [20004, 20003, 20002, 20001, 20000]
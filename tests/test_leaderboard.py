@@ -0,0 +1,79 @@
+"""
+Driver leaderboard tests (services.leaderboard)
+"""
+import os
+import random
+import sys
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.leaderboard import Leaderboard, SortedScores, period_bounds
+
+AT = datetime(2026, 10, 19, 12, 0)  # Monday
+
+
+def test_sorted_scores_match_full_sort():
+    rng = random.Random(7)
+    board = SortedScores()
+    scores = {}
+    for _ in range(2000):
+        member = rng.randrange(300)
+        delta = rng.choice([1, 2, 5, 10])
+        board.incr(member, delta)
+        scores[member] = scores.get(member, 0) + delta
+
+    expected = sorted(scores, key=lambda m: (-scores[m], m))
+    assert [m for m, _ in board.top(50)] == expected[:50]
+    for member in rng.sample(sorted(scores), 25):
+        assert board.rank(member) == expected.index(member) + 1
+    assert SortedScores.from_scores(scores).top(50) == board.top(50)
+
+
+def test_completion_updates_every_period_board():
+    lb = Leaderboard()
+    lb.ride_completed(1, fare=20000, km=5, rating=4.9, at=AT)
+    lb.ride_completed(2, fare=50000, km=12, rating=4.5, at=AT)
+    lb.ride_completed(1, fare=15000, km=4, rating=4.9, at=AT)
+
+    rides = lb.top("weekly", "rides", 10, at=AT)
+    assert rides["period_key"] == "2026-W43"
+    assert [(e["driver_id"], e["score"]) for e in rides["top"]] == [(1, 2), (2, 1)]
+    assert lb.top("monthly", "revenue", 1, at=AT)["top"][0]["driver_id"] == 2
+    assert lb.rank("daily", "rating", 2, at=AT)["rank"] == 2
+    assert lb.rank("daily", "km", 3, at=AT)["rank"] is None
+
+
+def test_only_current_and_previous_periods_are_kept():
+    lb = Leaderboard()
+    for day in (17, 18, 19):
+        lb.ride_completed(1, fare=1000, km=1, rating=5.0, at=datetime(2026, 10, day, 9))
+    assert lb.top("daily", "rides", 5, at=datetime(2026, 10, 17, 9))["top"] == []
+    assert lb.top("daily", "rides", 5, at=datetime(2026, 10, 18, 9))["total_drivers"] == 1
+    assert period_bounds("monthly", AT)[1:] == (datetime(2026, 10, 1), datetime(2026, 11, 1))
+
+
+def test_seed_rebuilds_boards_from_completed_rides(db):
+    from models import Customer, Ride, User
+
+    customer = Customer(phone="+998901112233")
+    drivers = [User(phone=f"+99890000000{i}", password="x", full_name=f"Driver {i}",
+                    rating=4.0 + i / 10) for i in range(3)]
+    db.add_all([customer, *drivers])
+    db.commit()
+    for i, driver in enumerate(drivers):
+        for _ in range(i + 1):
+            db.add(Ride(customer_id=customer.id, driver_id=driver.id, status="completed",
+                        fare=10000, distance_km=3, completed_at=AT))
+    db.add(Ride(customer_id=customer.id, driver_id=drivers[0].id, status="cancelled",
+                fare=10000, completed_at=AT))
+    db.commit()
+
+    lb = Leaderboard()
+    lb.seed(db, at=AT)
+    top = lb.top("daily", "rides", 10, at=AT)["top"]
+    assert [(e["driver_id"], e["score"]) for e in top] == [(drivers[2].id, 3), (drivers[1].id, 2), (drivers[0].id, 1)]
+    assert lb.rank("monthly", "km", drivers[0].id, at=AT)["score"] == 3
+    assert Leaderboard.with_names(db, lb.top("weekly", "revenue", 1, at=AT))["top"][0]["full_name"] == "Driver 2"
@@ -0,0 +1,61 @@
+"""
+Dispatcher heatmap tests (services.live_map)
+"""
+import os
+import sys
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.demand_surge import DemandSurge
+from services.live_map import LiveMap, tile_center, tile_xy
+
+
+def _live_map():
+    # Automatic surge off: positions are still tracked for the heatmap
+    surge = DemandSurge(enabled=False, size_km=0.5, alpha=0.3, threshold=1.0, sensitivity=0.5, max_multiplier=2.5)
+    return surge, LiveMap(surge, tick_seconds=3600)
+
+
+def test_tile_xy_matches_slippy_map_formula():
+    x, y = tile_xy(np.array([40.7821]), np.array([72.3442]), 12)
+    assert (int(x[0]), int(y[0])) == (2871, 1538)
+    lat, lng = tile_center(int(x[0]), int(y[0]), 12)
+    assert abs(lat - 40.7821) < 0.05 and abs(lng - 72.3442) < 0.05
+
+
+def test_heatmap_counts_frozen_positions_and_caches_per_tick():
+    surge, live = _live_map()
+    for driver_id in range(5):
+        surge.driver_update(driver_id, True, 40.7821, 72.3442)
+    surge.driver_update(9, False, 40.7821, 72.3442)
+    surge.ride_opened(100, 40.7821, 72.3442)
+    surge.ride_opened(101, 41.3111, 69.2797)  # Tashkent
+
+    first = live.heatmap(12)
+    assert (first["drivers"], first["pickups"]) == (5, 2)
+    assert sorted(row[4:] for row in first["cells"]) == [[0, 1], [5, 1]]
+    assert live.heatmap(12) is first
+
+    andijon = live.heatmap(12, (72.0, 40.5, 72.6, 41.0))
+    assert (andijon["drivers"], andijon["pickups"]) == (5, 1)
+
+    surge.ride_closed(100)
+    surge.driver_update(0, False, None, None)
+    assert live.heatmap(12) is first  # unchanged until the next tick
+    live.tick()
+    second = live.heatmap(12)
+    assert (second["drivers"], second["pickups"]) == (4, 1)
+
+
+def test_stale_snapshot_is_refrozen_on_request():
+    surge, live = _live_map()
+    live.tick_seconds = 0
+    surge.ride_opened(1, 40.7821, 72.3442)
+    assert live.heatmap(12)["pickups"] == 1
+    surge.ride_closed(1)
+    assert live.heatmap(12)["pickups"] == 0
+    assert live.stats()["ticks"] == 2
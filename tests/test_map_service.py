@@ -0,0 +1,84 @@
+"""
+MapService HTTP session tests: shared pooled session, timeouts, fallback
+"""
+import asyncio
+import os
+import sys
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import settings
+from services.map_service import MapService
+
+ROUTE = {"code": "Ok", "routes": [{"distance": 8000, "duration": 900, "geometry": {"type": "LineString"}}]}
+
+
+async def _serve(monkeypatch, peers, delay=0.0):
+    async def route(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(delay)
+        return web.json_response(ROUTE)
+
+    app = web.Application()
+    app.router.add_get("/route/v1/driving/{coords}", route)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(MapService, "OSRM_BASE_URL", str(server.make_url("/route/v1/driving/")))
+    return server
+
+
+def test_shared_session_reuses_connections(monkeypatch):
+    async def scenario():
+        peers = set()
+        server = await _serve(monkeypatch, peers)
+        await MapService.startup()
+        try:
+            for _ in range(5):
+                route = await MapService.get_route(72.34, 40.78, 72.36, 40.75)
+                assert route["distance"] == 8000
+        finally:
+            await MapService.shutdown()
+            await server.close()
+        return peers
+
+    assert len(asyncio.run(scenario())) == 1  # one keep-alive connection for all calls
+
+
+def test_read_timeout_and_fallback_without_startup(monkeypatch):
+    monkeypatch.setattr(settings, "map_http_read_timeout", 0.2)
+
+    async def scenario():
+        server = await _serve(monkeypatch, set(), delay=1.0)
+        try:
+            return await MapService.get_route(72.34, 40.78, 72.36, 40.75)
+        finally:
+            await server.close()
+
+    assert MapService._session is None
+    assert "error" in asyncio.run(scenario())
+
+
+def test_waiting_for_a_slot_is_bounded_by_total_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "map_http_concurrency", 1)
+    monkeypatch.setattr(settings, "map_http_total_timeout", 0.2)
+
+    async def scenario():
+        server = await _serve(monkeypatch, set())
+        await MapService.startup()
+        try:
+            await MapService._semaphore.acquire()  # the only slot is taken
+            route = await MapService.get_route(72.34, 40.78, 72.36, 40.75)
+            MapService._semaphore.release()
+            return route, await MapService.get_route(72.34, 40.78, 72.36, 40.75)
+        finally:
+            await MapService.shutdown()
+            await server.close()
+
+    blocked, after = asyncio.run(scenario())
+    assert "error" in blocked
+    assert after["distance"] == 8000
@@ -0,0 +1,49 @@
+"""
+/metrics/* access tests (routers.metrics): admins or the configured scraper token only
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import settings
+from models import User
+from routers.metrics import router as metrics_router
+from utils.helpers import create_access_token
+
+PATHS = [route.path for route in metrics_router.routes]
+ADMIN_PHONE, DRIVER_PHONE = "+998900000001", "+998900000002"
+
+
+@pytest.fixture
+def client(api_client, session_factory, monkeypatch):
+    db = session_factory()
+    db.add_all([
+        User(phone=ADMIN_PHONE, password="x", full_name="Admin", is_admin=True, is_approved=True),
+        User(phone=DRIVER_PHONE, password="x", full_name="Driver", is_approved=True),
+    ])
+    db.commit()
+    db.close()
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+    return api_client
+
+
+def bearer(phone: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': phone})}"}
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_anonymous_and_non_admin_are_rejected(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"X-Metrics-Token": "wrong"}).status_code == 401
+    assert client.get(path, headers=bearer(DRIVER_PHONE)).status_code == 403
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_admin_and_token_are_allowed(client, path):
+    assert client.get(path, headers=bearer(ADMIN_PHONE)).status_code == 200
+    assert client.get(path, headers={"X-Metrics-Token": "scrape-secret"}).status_code == 200
@@ -0,0 +1,85 @@
+"""
+Compiled pricing snapshot tests (services.pricing_engine)
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import AdditionalService, SurgeArea, SurgePricing
+from services.config_cache import ConfigCache
+from services.pricing_engine import compile_snapshot
+from utils.helpers import calculate_distance, estimate_duration
+
+NOW = datetime(2026, 5, 1, 18, 0, 0)
+
+
+@pytest.fixture
+def tariffs(db):
+    db.add(SurgeArea(name="bazaar", center_lat=40.78, center_lng=72.34, radius_km=1.0))
+    db.add(SurgePricing(area_name="bazaar", multiplier=1.5, is_active=True,
+                        start_time=NOW - timedelta(hours=1), end_time=NOW + timedelta(hours=1)))
+    # Points at a missing area: must be ignored rather than applied city-wide
+    db.add(SurgePricing(area_name="nowhere", multiplier=3.0, is_active=True))
+    db.add(AdditionalService(name="ac", name_uz="Konditsioner", price=3000, is_active=True))
+    db.add(AdditionalService(name="cargo", name_uz="Yukxona", price=5000, is_active=False))
+    db.commit()
+    return db
+
+
+def _snapshot(db):
+    return compile_snapshot(ConfigCache(check_interval=60).get(db), db)
+
+
+def test_quote_matches_tariff_formula(tariffs):
+    quote = _snapshot(tariffs).quote(10, 20, "economy")
+    assert quote.total_fare == 10000 + 10 * 2000 + 20 * 500
+    assert quote.commission_amount == round(quote.total_fare * quote.commission_rate, 2)
+    assert quote.driver_earnings == quote.total_fare - quote.commission_amount
+
+
+def test_surge_applies_inside_area_and_window_only(tariffs):
+    snapshot = _snapshot(tariffs)
+    assert snapshot.surge_multiplier(40.78, 72.34, NOW) == 1.5
+    assert snapshot.surge_multiplier(41.31, 69.24, NOW) == 1.0
+    assert snapshot.surge_multiplier(40.78, 72.34, NOW + timedelta(hours=2)) == 1.0
+    assert snapshot.quote(10, 20, lat=40.78, lng=72.34, at=NOW).total_fare == 60000
+
+
+def test_only_active_services_are_priced(tariffs):
+    snapshot = _snapshot(tariffs)
+    ids = [service_id for service_id in snapshot.service_prices]
+    assert snapshot.services_cost(ids + [999]) == 3000
+
+
+def test_batch_quotes_match_scalar_quotes(tariffs):
+    snapshot = _snapshot(tariffs)
+    trips = np.array([
+        [40.78, 72.34, 40.75, 72.37],   # starts inside the surge area
+        [41.31, 69.24, 41.35, 69.30],
+        [41.31, 69.24, 41.31, 69.24],   # zero distance still costs the 15 minute minimum
+    ])
+    result = snapshot.quote_batch(trips, ["economy", "business"], at=NOW)
+
+    for i, trip in enumerate(trips.tolist()):
+        distance = calculate_distance(*trip)
+        for j, vehicle_type in enumerate(["economy", "business"]):
+            expected = snapshot.quote(distance, estimate_duration(distance), vehicle_type,
+                                      lat=trip[0], lng=trip[1], at=NOW)
+            assert result["fares"][i, j] == pytest.approx(expected.total_fare, abs=0.01)
+    assert result["surge_multiplier"].tolist() == [1.5, 1.0, 1.0]
+
+
+def test_batch_endpoint_rejects_ragged_trips(api_client, login, dispatcher_user):
+    login(dispatcher_user)
+    response = api_client.post(
+        "/api/v1/pricing/quotes",
+        json={"trips": [[40.78, 72.34, 40.75, 72.36], [40.78, 72.34, 40.75]]},
+    )
+    assert response.status_code == 400
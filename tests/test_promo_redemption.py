@@ -0,0 +1,158 @@
+"""
+Promo redemption tests (services.promo): a burst of concurrent redemptions
+must never sell more uses than max_uses
+"""
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Customer, PromoCode, PromoCodeUsage
+from services.map_service import MapService
+from services.promo import PromoService, Redemption
+
+THREADS = 16
+ATTEMPTS_PER_THREAD = 10
+MAX_USES = 40
+
+
+@pytest.fixture
+def promo_code(session_factory):
+    db = session_factory()
+    db.add(PromoCode(code="BAYRAM", discount_type="fixed", discount_value=5000, max_uses=MAX_USES,
+                     used_count=0, is_active=True))
+    db.commit()
+    db.close()
+
+
+def test_burst_never_oversells(session_factory, promo_code):
+    service = PromoService(ttl_seconds=60, batch_size=25)
+    barrier = threading.Barrier(THREADS)
+    wins, losses = [], []
+    lock = threading.Lock()
+
+    def redeem(user_id):
+        db = session_factory()
+        try:
+            barrier.wait()
+            for _ in range(ATTEMPTS_PER_THREAD):
+                try:
+                    redemption = service.redeem(db, "bayram", user_id, fare=30000)
+                except HTTPException:
+                    with lock:
+                        losses.append(user_id)
+                    continue
+                service.record_usage(db, redemption)
+                with lock:
+                    wins.append(redemption.discount)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=redeem, args=(i + 1,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    db = session_factory()
+    service.flush(db)
+    assert len(wins) == MAX_USES
+    assert len(losses) == THREADS * ATTEMPTS_PER_THREAD - MAX_USES
+    assert set(wins) == {5000}
+    assert db.query(PromoCode.used_count).scalar() == MAX_USES
+    assert db.query(PromoCodeUsage).count() == MAX_USES
+    db.close()
+
+
+def test_discount_never_exceeds_fare(session_factory, promo_code):
+    service = PromoService(ttl_seconds=60, batch_size=25)
+    db = session_factory()
+    assert service.redeem(db, "BAYRAM", 1, fare=3000).discount == 3000
+    with pytest.raises(HTTPException) as err:
+        service.validate(db, "UNKNOWN")
+    assert err.value.status_code == 404
+    db.close()
+
+
+def test_release_drops_the_queued_usage_row(session_factory, promo_code):
+    service = PromoService(ttl_seconds=60, batch_size=25)
+    db = session_factory()
+    redemption = service.redeem(db, "BAYRAM", 1, fare=30000)
+    service.record_usage(db, redemption, ride_id=7)
+    service.record_usage(db, Redemption(redemption.promo_code_id, "BAYRAM", 2, 5000), ride_id=8)
+
+    service.release(db, redemption.promo_code_id, ride_id=7)
+    db.commit()
+    assert service.pending == 1
+    assert service.flush(db) == 1
+    assert db.query(PromoCodeUsage.ride_id).scalar() == 8
+    db.close()
+
+
+@pytest.fixture
+def order_promo(promo_code, monkeypatch):
+    """Fresh promo service (usage rows written at once) and an offline map for dispatcher orders"""
+    import routers.dispatcher as dispatcher
+    import routers.rider as rider
+
+    async def no_route(*args, **kwargs):
+        return {"error": "offline"}
+
+    service = PromoService(ttl_seconds=60, batch_size=1)
+    monkeypatch.setattr(dispatcher, "promo_service", service)
+    monkeypatch.setattr(rider, "promo_service", service)
+    monkeypatch.setattr(MapService, "get_route", no_route)
+    return service
+
+
+ORDER = {"order": {
+    "customer_phone": "+998901112233",
+    "pickup_location": {"lat": 40.7821, "lng": 72.3442, "address": "A"},
+    "dropoff_location": {"lat": 40.7589, "lng": 72.3667, "address": "B"},
+    "promo_code": "bayram",
+}}
+
+
+def test_cancelled_promo_ride_gives_the_use_back(api_client, login, dispatcher_user, order_promo, session_factory):
+    login(dispatcher_user)
+    response = api_client.post("/api/v1/dispatcher/order", json=ORDER)
+    assert response.status_code == 200
+    ride_id = response.json()["ride"]["id"]
+
+    db = session_factory()
+    assert db.query(PromoCode.used_count).scalar() == 1
+    usage = db.query(PromoCodeUsage).one()
+    customer_id = db.query(Customer.id).filter(Customer.phone == "+998901112233").scalar()
+    assert (usage.customer_id, usage.ride_id, usage.user_id) == (customer_id, ride_id, None)
+
+    assert api_client.post(f"/api/v1/dispatcher/cancel/{ride_id}").status_code == 200
+    # Cancelling twice must not give back a second use
+    assert api_client.post(f"/api/v1/dispatcher/cancel/{ride_id}").status_code == 200
+    db.expire_all()
+    assert db.query(PromoCode.used_count).scalar() == 0
+    assert db.query(PromoCodeUsage).count() == 0
+    db.close()
+
+
+def test_failed_order_gives_the_use_back(api_client, login, dispatcher_user, order_promo, session_factory,
+                                         monkeypatch):
+    import routers.dispatcher as dispatcher
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("ride could not be stored")
+
+    monkeypatch.setattr(dispatcher, "Ride", broken)
+    login(dispatcher_user)
+    response = api_client.post("/api/v1/dispatcher/order", json=ORDER)
+    assert response.status_code == 500
+
+    db = session_factory()
+    assert db.query(PromoCode.used_count).scalar() == 0
+    assert db.query(PromoCodeUsage).count() == 0
+    db.close()
@@ -0,0 +1,125 @@
+"""
+Query plan regression tests for the hot router queries
+
+Each query below mirrors a filter used by the routers. The test runs
+EXPLAIN QUERY PLAN on SQLite and fails if any table is read with a full
+scan instead of an index search.
+"""
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Ride, Payment, Notification, OTPVerification, DriverStatus, User
+from routers.admin import _user_search
+
+# "SCAN rides" is a full table scan; "SCAN rides USING INDEX ..." walks an index in order
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING (COVERING )?INDEX)")
+
+
+def _plan(db, query):
+    bind = db.get_bind()
+    compiled = query.statement.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def _queries(db):
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    return {
+        # driver.get_available_rides
+        "available_rides": db.query(Ride).filter(
+            Ride.status == "pending", Ride.pickup_location.isnot(None)
+        ),
+        # driver.update_status: active rides of the driver
+        "driver_active_rides": db.query(Ride).filter(
+            Ride.driver_id == 1, Ride.status.in_(["accepted", "in_progress"])
+        ),
+        # rider.get_current_ride
+        "rider_current_ride": db.query(Ride).filter(
+            Ride.rider_id == 1, Ride.status.in_(["pending", "accepted", "in_progress"])
+        ),
+        # driver.get_driver_ride_history
+        "driver_history": db.query(Ride).filter(Ride.driver_id == 1).order_by(
+            Ride.created_at.desc()
+        ).limit(20),
+        # rider.get_ride_history
+        "rider_history": db.query(Ride).filter(Ride.rider_id == 1).order_by(
+            Ride.created_at.desc()
+        ).limit(20),
+        # admin.get_weekly_analytics
+        "weekly_rides": db.query(Ride).filter(Ride.created_at >= week_ago),
+        # driver.driver_stats: completed payments of a driver
+        "driver_payments": db.query(Payment).join(Ride, Payment.ride_id == Ride.id).filter(
+            Ride.driver_id == 1, Payment.status == "completed"
+        ),
+        # admin.get_income_stats: 30-day revenue trend
+        "income_trend": db.query(
+            func.date(Payment.created_at), func.sum(Payment.amount)
+        ).filter(
+            Payment.status == "completed", Payment.created_at >= thirty_days_ago
+        ).group_by(func.date(Payment.created_at)),
+        # driver.get_driver_notifications
+        "driver_notifications": db.query(Notification).filter(
+            Notification.user_id == 1
+        ).order_by(Notification.created_at.desc()).limit(20),
+        # auth.verify_otp
+        "latest_otp": db.query(OTPVerification).filter(
+            OTPVerification.phone == "+998901234567", OTPVerification.is_verified == False
+        ).order_by(OTPVerification.created_at.desc()),
+        # dispatcher._broadcast_to_nearby_drivers
+        "on_duty_drivers": db.query(DriverStatus).filter(DriverStatus.is_on_duty == True),
+        # admin.get_all_users: phone / name prefix search
+        "admin_user_phone_search": db.query(User.id).filter(_user_search("+99890")),
+        "admin_user_name_search": db.query(User.id).filter(_user_search("ali")),
+    }
+
+
+def _keyset_queries(db):
+    """History pages as built by utils.helpers.keyset_paginate (second page)"""
+    cursor_at = datetime.utcnow()
+
+    def page(query, model):
+        return query.filter(
+            (model.created_at < cursor_at) | ((model.created_at == cursor_at) & (model.id < 100))
+        ).order_by(model.created_at.desc(), model.id.desc()).limit(21)
+
+    return {
+        "driver_history_keyset": page(db.query(Ride).filter(Ride.driver_id == 1), Ride),
+        "rider_history_keyset": page(db.query(Ride).filter(Ride.rider_id == 1), Ride),
+        "notifications_keyset": page(db.query(Notification).filter(Notification.user_id == 1), Notification),
+        # dispatcher.list_drivers: city filter, id cursor
+        "dispatcher_drivers_city_keyset": db.query(User.id, User.full_name, DriverStatus.is_on_duty).outerjoin(
+            DriverStatus, DriverStatus.driver_id == User.id
+        ).filter(User.is_driver == True, User.city == "Andijon", User.id > 100).order_by(User.id).limit(101),
+    }
+
+
+# Building the queries needs no database, only a session to hang them on
+QUERY_NAMES = sorted(_queries(Session()).keys())
+KEYSET_NAMES = sorted(_keyset_queries(Session()).keys())
+
+
+@pytest.mark.parametrize("name", QUERY_NAMES)
+def test_hot_query_uses_index(db, name):
+    plan = _plan(db, _queries(db)[name])
+    scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not scans, f"{name} falls back to a full table scan: {plan}"
+
+
+@pytest.mark.parametrize("name", KEYSET_NAMES)
+def test_keyset_page_reads_index_in_order(db, name):
+    plan = _plan(db, _keyset_queries(db)[name])
+    assert not [step for step in plan if FULL_SCAN.match(step)], f"{name}: {plan}"
+    # A sort step would make every page cost O(rows of the user)
+    assert not [step for step in plan if "TEMP B-TREE" in step], f"{name} sorts instead of walking an index: {plan}"
@@ -0,0 +1,90 @@
+"""
+Dispatcher quote cache tests (services.quote_cache)
+"""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.map_service import MapService
+from services.quote_cache import CachedQuote, QuoteCache
+
+QUOTE = CachedQuote(distance_km=8.0, duration_min=15, fare=33500.0)
+
+
+def test_nearby_points_share_a_key():
+    cache = QuoteCache(maxsize=10, ttl_seconds=60, precision=3)
+    a = cache.key(40.78211, 72.34421, 40.7589, 72.3667, "economy", 1)
+    b = cache.key(40.78214, 72.34418, 40.7589, 72.3667, "economy", 1)
+    assert a == b
+    assert a != cache.key(40.78211, 72.34421, 40.7589, 72.3667, "comfort", 1)
+    assert a != cache.key(40.78211, 72.34421, 40.7589, 72.3667, "economy", 1, surge_multiplier=1.5)
+
+
+def test_hit_and_miss_counters():
+    cache = QuoteCache(maxsize=10, ttl_seconds=60, precision=3)
+    key = cache.key(40.78, 72.34, 40.75, 72.36, "economy", 1)
+    assert cache.get(key, 1) is None
+    cache.put(key, 1, QUOTE)
+    assert cache.get(key, 1) == QUOTE
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_new_pricing_version_drops_cached_quotes():
+    cache = QuoteCache(maxsize=10, ttl_seconds=60, precision=3)
+    key = cache.key(40.78, 72.34, 40.75, 72.36, "economy", 1)
+    cache.put(key, 1, QUOTE)
+    assert cache.get(key, 2) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuoteCache(maxsize=2, ttl_seconds=60, precision=3)
+    keys = [cache.key(40.78 + i, 72.34, 40.75, 72.36, "economy", 1) for i in range(3)]
+    cache.put(keys[0], 1, QUOTE)
+    cache.put(keys[1], 1, QUOTE)
+    cache.get(keys[0], 1)
+    cache.put(keys[2], 1, QUOTE)
+    assert cache.get(keys[1], 1) is None
+    assert cache.get(keys[0], 1) == QUOTE
+
+
+@pytest.fixture
+def order_cache(monkeypatch):
+    import routers.dispatcher as dispatcher
+
+    async def no_address(*args, **kwargs):
+        return None
+
+    cache = QuoteCache(maxsize=10, ttl_seconds=600, precision=3)
+    monkeypatch.setattr(dispatcher, "quote_cache", cache)
+    monkeypatch.setattr(MapService, "reverse_geocode", no_address)
+    return cache
+
+
+def test_failed_route_is_not_cached(api_client, login, dispatcher_user, order_cache, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        return {"error": "Xarita xizmati javob bermadi"}
+
+    monkeypatch.setattr(MapService, "get_route", unreachable)
+    login(dispatcher_user)
+    body = {"order": {
+        "customer_phone": "+998901112233",
+        "pickup_location": {"lat": 40.7821, "lng": 72.3442, "address": "A"},
+        "dropoff_location": {"lat": 40.7589, "lng": 72.3667, "address": "B"},
+    }}
+    for _ in range(2):
+        response = api_client.post("/api/v1/dispatcher/order", json=body)
+        assert response.status_code == 200
+        ride = response.json()["ride"]
+        # Straight-line fallback, not a 0 km minimum fare
+        assert ride["distance"] > 2
+        assert ride["duration"] > 0
+    stats = order_cache.stats()
+    assert (stats["size"], stats["hits"]) == (0, 0)
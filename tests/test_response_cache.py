@@ -0,0 +1,44 @@
+"""
+Conditional GET cache tests (services.response_cache)
+"""
+import os
+import sys
+
+from starlette.requests import Request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.response_cache import ResponseCache
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_body_is_built_once_per_version_and_revalidates_with_304():
+    cache = ResponseCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"price": 5000}
+
+    first = cache.respond(_request(), "services", 3, build)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.body == b'{"price":5000}'
+
+    again = cache.respond(_request(etag), "services", 3, build)
+    assert again.status_code == 304 and again.body == b""
+    assert again.headers["etag"] == etag
+    assert len(builds) == 1
+
+
+def test_new_version_changes_etag():
+    cache = ResponseCache()
+    etag = cache.respond(_request(), "pricing", 1, lambda: {"rate": 0.1}).headers["etag"]
+    response = cache.respond(_request(etag), "pricing", 2, lambda: {"rate": 0.2})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
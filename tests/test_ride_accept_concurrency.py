@@ -0,0 +1,83 @@
+"""
+Concurrency stress test for atomic ride acceptance (routers.driver.claim_ride)
+
+Many drivers hammer the same pending ride from separate threads and sessions;
+exactly one of them may win and the ride must end up assigned to the winner.
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import User, Customer, Ride
+from routers.driver import claim_ride
+
+DRIVERS = 24
+RIDES = 10
+
+
+def _seed(factory):
+    db = factory()
+    drivers = [
+        User(phone=f"+99890{i:07d}", password="x", full_name=f"Driver {i}", is_driver=True, is_approved=True)
+        for i in range(DRIVERS)
+    ]
+    customer = Customer(phone="+998911234567")
+    db.add_all(drivers + [customer])
+    db.flush()
+    rides = [Ride(customer_id=customer.id, status="pending") for _ in range(RIDES)]
+    db.add_all(rides)
+    db.commit()
+    ids = [d.id for d in drivers], [r.id for r in rides]
+    db.close()
+    return ids
+
+
+def test_one_winner_per_ride_under_contention(session_factory):
+    driver_ids, ride_ids = _seed(session_factory)
+
+    for ride_id in ride_ids:
+        barrier = threading.Barrier(DRIVERS)
+        winners, errors = [], []
+
+        def accept(driver_id):
+            db = session_factory()
+            try:
+                barrier.wait()
+                if claim_ride(db, ride_id, driver_id):
+                    winners.append(driver_id)
+            except Exception as e:  # pragma: no cover - surfaced by the assertion below
+                errors.append(e)
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=accept, args=(d,)) for d in driver_ids]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert not errors, errors
+        assert len(winners) == 1, f"ride {ride_id} accepted by {winners}"
+
+        db = session_factory()
+        ride = db.query(Ride).filter(Ride.id == ride_id).one()
+        db.close()
+        assert ride.status == "accepted"
+        assert ride.driver_id == winners[0]
+
+
+def test_accepting_non_pending_ride_is_rejected(session_factory):
+    driver_ids, ride_ids = _seed(session_factory)
+    db = session_factory()
+    try:
+        assert claim_ride(db, ride_ids[0], driver_ids[0]) is True
+        assert claim_ride(db, ride_ids[0], driver_ids[1]) is False
+        assert claim_ride(db, 999999, driver_ids[1]) is False
+    finally:
+        db.close()
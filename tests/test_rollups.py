@@ -0,0 +1,146 @@
+"""
+Daily rollup tests (services.rollups): incremental counters must match a rebuild
+"""
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from models import Customer, DailyStat, Ride, RideLatencyBucket, User
+from services.rollups import COUNTERS, LATENCY_BUCKETS, RollupService, latency_percentiles
+
+RATE = 0.1
+
+
+def _snapshot(db):
+    return sorted(
+        (row.day, row.city, row.vehicle_type, *(round(getattr(row, k), 2) for k in COUNTERS))
+        for row in db.query(DailyStat).all()
+    )
+
+
+def test_incremental_counters_match_rebuild(db):
+    rollups = RollupService()
+    customer = Customer(phone="+998901112233", first_name="Mijoz")
+    db.add(customer)
+    db.commit()
+
+    base = datetime(2026, 10, 18, 22, 0)
+    for i in range(12):
+        city = ["Andijon", "Namangan", None][i % 3]
+        pickup = {"lat": 40.78, "lng": 72.34, "address": "A", "city": city}
+        dropoff = {"lat": 40.80, "lng": 72.36, "address": "B"}
+        ride = Ride(
+            customer_id=customer.id, pickup_location=json.dumps(pickup), dropoff_location=json.dumps(dropoff),
+            fare=10000 + i * 1000, vehicle_type=["economy", "comfort"][i % 2], status="pending",
+            city=city, distance_km=3.0 + i, created_at=base + timedelta(minutes=30 * i),
+        )
+        db.add(ride)
+        rollups.ride_created(db, ride)
+        db.commit()
+        if i % 4 == 3:
+            ride.status = "cancelled"
+            rollups.ride_cancelled(db, ride)
+        elif i % 4 != 2:
+            # Completions after midnight land on the next day
+            ride.status = "completed"
+            ride.completed_at = ride.created_at + timedelta(minutes=45)
+            rollups.ride_completed(db, ride, round(ride.fare * RATE, 2))
+        db.commit()
+
+    for i in range(3):
+        user = User(phone=f"+99890000100{i}", password="x", full_name="Haydovchi", city="Andijon",
+                    created_at=base + timedelta(hours=i))
+        db.add(user)
+        rollups.user_registered(db, user)
+        db.commit()
+        user.is_approved = True
+        user.approved_at = user.created_at + timedelta(hours=3)
+        rollups.approval_changed(db, user, 1)
+        db.commit()
+    user.is_approved = False
+    rollups.approval_changed(db, user, -1)
+    db.commit()
+
+    incremental = _snapshot(db)
+    day_totals = rollups.totals(db, base.date(), base.date() + timedelta(days=1))
+    assert day_totals["rides_created"] == 12
+    assert day_totals["rides_cancelled"] == 3
+    assert day_totals["rides_completed"] == 6
+    assert day_totals["new_users"] == 3 and day_totals["driver_approvals"] == 2
+
+    rollups.rebuild(db, base.date(), base.date() + timedelta(days=1), commission_rate=RATE)
+    assert _snapshot(db) == incremental
+    assert set(rollups.by_day(db, base.date(), base.date() + timedelta(days=1))) == {
+        base.date(), base.date() + timedelta(days=1)
+    }
+
+
+def test_driver_totals_follow_accept_and_complete(db):
+    rollups = RollupService()
+    customer = Customer(phone="+998901112244", first_name="Mijoz")
+    driver = User(phone="+998900000200", password="x", full_name="Haydovchi")
+    db.add_all([customer, driver])
+    db.commit()
+
+    for i in range(4):
+        ride = Ride(customer_id=customer.id, driver_id=driver.id, status="accepted", fare=20000,
+                    vehicle_type="economy", distance_km=5.0, created_at=datetime(2026, 10, 19, 9, i))
+        db.add(ride)
+        rollups.ride_accepted(db, driver.id)
+        db.commit()
+        if i < 3:
+            ride.status = "completed"
+            ride.completed_at = ride.created_at + timedelta(minutes=20)
+            rollups.ride_completed(db, ride, commission=2000)
+            db.commit()
+
+    expected = {"rides_accepted": 4, "rides_completed": 3, "revenue": 60000, "commission": 6000, "distance_km": 15}
+    assert rollups.driver_totals(db, driver.id) == expected
+    assert rollups.driver_totals(db, driver.id + 1)["rides_completed"] == 0
+
+    rollups.rebuild_driver_totals(db, commission_rate=RATE)
+    assert rollups.driver_totals(db, driver.id) == expected
+
+
+def test_latency_percentiles_interpolate_within_buckets():
+    # 100 samples: 50 in (0, 5], 40 in (5, 10], 10 in the overflow bucket
+    counts = {0: 50, 1: 40, len(LATENCY_BUCKETS): 10}
+    assert latency_percentiles(counts) == {"p50": 5.0, "p90": 10.0, "p99": float(LATENCY_BUCKETS[-1])}
+    assert latency_percentiles({}) == {"p50": None, "p90": None, "p99": None}
+
+
+def test_latency_histograms_match_rebuild(db):
+    rollups = RollupService()
+    customer = Customer(phone="+998901112233", first_name="Mijoz")
+    db.add(customer)
+    db.commit()
+
+    base = datetime(2026, 10, 19, 8, 0)
+    for i in range(20):
+        created = base + timedelta(minutes=10 * i)
+        ride = Ride(customer_id=customer.id, status="completed", city=["Andijon", "Namangan"][i % 2],
+                    created_at=created, accepted_at=created + timedelta(seconds=20 + i),
+                    started_at=created + timedelta(minutes=5 + i % 4), completed_at=created + timedelta(minutes=25))
+        if i % 3:
+            ride.arrived_at = created + timedelta(minutes=4)
+        db.add(ride)
+        rollups.ride_latency(db, ride, "accept", ride.created_at, ride.accepted_at)
+        rollups.ride_latency(db, ride, "pickup", ride.accepted_at, ride.arrived_at or ride.started_at)
+        rollups.ride_latency(db, ride, "trip", ride.started_at, ride.completed_at)
+        db.commit()
+
+    def snapshot():
+        return sorted((b.day, b.hour, b.city, b.metric, b.bucket, b.count) for b in db.query(RideLatencyBucket))
+
+    incremental = snapshot()
+    rollups.rebuild_latency(db, base.date(), base.date())
+    assert snapshot() == incremental
+
+    histograms = rollups.latency_histograms(db, base.date(), base.date(), city="Andijon", metric="accept")
+    assert sorted(histograms) == [("accept", "Andijon", hour) for hour in (8, 9, 10, 11)]
+    assert sum(sum(c.values()) for c in histograms.values()) == 10
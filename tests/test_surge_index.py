@@ -0,0 +1,66 @@
+"""
+Surge index tests (services.surge): indexed lookup must agree with a full scan
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from services.surge import SurgeIndex, SurgeRule, SurgeZone
+from utils.helpers import calculate_distance
+
+BASE = datetime(2026, 3, 1, 0, 0, 0)
+
+
+def _brute_force(rules, zones, lat, lng, at):
+    multiplier = 1.0
+    for rule in rules:
+        if rule.start_time and at < rule.start_time:
+            continue
+        if rule.end_time and at >= rule.end_time:
+            continue
+        if rule.area_name is None:
+            multiplier = max(multiplier, rule.multiplier)
+            continue
+        for zone in zones:
+            if zone.name == rule.area_name and \
+                    calculate_distance(lat, lng, zone.center_lat, zone.center_lng) <= zone.radius_km:
+                multiplier = max(multiplier, rule.multiplier)
+    return multiplier
+
+
+def test_index_matches_full_scan():
+    rng = random.Random(7)
+    zones = [
+        SurgeZone(f"zone{i}", 40.70 + rng.random() * 0.2, 72.25 + rng.random() * 0.2, rng.uniform(0.3, 3.0))
+        for i in range(15)
+    ]
+    rules = []
+    for _ in range(60):
+        start = BASE + timedelta(minutes=rng.randint(0, 1440)) if rng.random() < 0.8 else None
+        end = (start or BASE) + timedelta(minutes=rng.randint(10, 300)) if rng.random() < 0.8 else None
+        area = rng.choice(zones).name if rng.random() < 0.9 else None
+        rules.append(SurgeRule(round(rng.uniform(1.0, 3.0), 2), area, start, end))
+    index = SurgeIndex(rules, zones)
+
+    for _ in range(2000):
+        lat, lng = 40.68 + rng.random() * 0.24, 72.23 + rng.random() * 0.24
+        at = BASE + timedelta(minutes=rng.randint(-60, 1800))
+        assert index.multiplier(lat, lng, at) == _brute_force(rules, zones, lat, lng, at)
+
+
+def test_window_is_half_open_and_unknown_area_is_ignored():
+    start, end = BASE, BASE + timedelta(hours=1)
+    index = SurgeIndex(
+        [SurgeRule(1.5, "bazaar", start, end), SurgeRule(4.0, "missing")],
+        [SurgeZone("bazaar", 40.78, 72.34, 1.0)],
+    )
+    assert index.multiplier(40.78, 72.34, start) == 1.5
+    assert index.multiplier(40.78, 72.34, end) == 1.0
+    assert index.multiplier(40.78, 72.34, start - timedelta(seconds=1)) == 1.0
+    assert index.multiplier(41.30, 69.24, start) == 1.0
+    assert index.rule_count == 1
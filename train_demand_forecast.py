@@ -0,0 +1,45 @@
+"""
+Train the per-zone demand forecast from historical rides
+
+Trains every day after the last trained one (or from the first ride), one day
+at a time, exactly as the background loop does. --reset drops the stored
+profile first, e.g. after changing FORECAST_ZONE_KM or FORECAST_ALPHA.
+
+Usage:
+    python train_demand_forecast.py                  # up to yesterday (UTC)
+    python train_demand_forecast.py --until 2026-10-01
+    python train_demand_forecast.py --reset
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+
+def _day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--until", type=_day, help="last day to train, YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--reset", action="store_true", help="forget the stored profile and retrain from the first ride")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+    from models import DemandProfile, SystemConfig
+    from services.demand_forecast import TRAINED_THROUGH_KEY, demand_forecast
+
+    db = SessionLocal()
+    try:
+        if args.reset:
+            db.query(DemandProfile).delete(synchronize_session=False)
+            db.query(SystemConfig).filter(SystemConfig.key == TRAINED_THROUGH_KEY).delete(synchronize_session=False)
+            db.commit()
+        until = args.until or datetime.utcnow().date() - timedelta(days=1)
+        days = demand_forecast.train(db, until)
+        print(f"Trained {days} day(s); {demand_forecast.stats()}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
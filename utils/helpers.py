@@ -2,18 +2,22 @@
 Utility functions for Royal Taxi backend
 """
 import json
+import base64
 import random
 import string
 import math
 import os
+import threading
 import requests
 import aiofiles
+from cachetools import TTLCache
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Tuple, BinaryIO
 from pathlib import Path
 from jose import jwt
 from passlib.context import CryptContext
 from fastapi import UploadFile, HTTPException
+from sqlalchemy import and_, or_
 from config import settings
 
 # Password hashing
@@ -47,6 +51,9 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 def calculate_fare(distance: float, duration: int, vehicle_type: str = "economy") -> float:
     """
     Calculate ride fare based on distance, duration and vehicle type
+
+    Uses the default tariffs in settings; request handlers price through
+    services.pricing_engine, which applies admin-managed tariffs and surge.
     """
     vehicle_config = settings.vehicle_types.get(vehicle_type, settings.vehicle_types["economy"])
 
@@ -237,6 +244,72 @@ def paginate_query(query, page: int = 1, size: int = 20):
     return query.offset(offset).limit(size)
 
 
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque URL-safe cursor"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor; raises 400 on tampered input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_id_cursor(row_id: int) -> str:
+    """Encode an id keyset position (listings ordered by primary key)"""
+    return base64.urlsafe_b64encode(json.dumps([row_id]).encode()).decode().rstrip("=")
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_id_cursor; raises 400 on tampered input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        (row_id,) = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_paginate(query, model, cursor: Optional[str], limit: int):
+    """Newest-first keyset pagination over (created_at, id).
+
+    Returns (rows, next_cursor). An empty cursor means the first page. One extra
+    row is fetched to know whether another page exists, so no count() is needed.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+# Short-lived totals for paginated listings (cursor mode never needs an exact count)
+_count_cache = TTLCache(maxsize=10000, ttl=60)
+_count_cache_lock = threading.Lock()
+
+
+def cached_count(key: str, query) -> int:
+    """Return query.count(), reusing the value for up to a minute per key"""
+    with _count_cache_lock:
+        value = _count_cache.get(key)
+    if value is None:
+        value = query.count()
+        with _count_cache_lock:
+            _count_cache[key] = value
+    return value
+
+
 def format_datetime(dt: datetime) -> str:
     """Format datetime to ISO string"""
     return dt.isoformat()